@@ -1,8 +1,9 @@
-from typing import Dict, Any
+from typing import Dict, Any, Callable
 from app.db.session_db import get_session, update_session
 
 from app.services.query_service import recommend_products
 from app.services.pdf_service import PdfService
+from app.models.prompts.messages import MESSAGES, render
 
 SURVEY_STEPS = [
     "welcome",
@@ -17,27 +18,31 @@ SURVEY_STEPS = [
 
 def get_step_prompt(step: str) -> str:
     """Returns the question prompt for a given step."""
-    if step == "ask_name":
-        return "To begin, may I please know your **full name**?"
-    elif step == "ask_gender":
-        return "To better understand your profile, may I know your **Gender**? (e.g., Male, Female, Other)"
-    elif step == "ask_age":
-        return "Could you please share your **Age**? (e.g., 35)"
-    elif step == "ask_occupation":
-        return "What is your **main source of income**? (e.g., Farming, Small Business, Daily Wage, Service)"
-    elif step == "ask_family":
-        return "How many **family members** depend on you?"
-    elif step == "ask_worry":
-        return "What is your **biggest financial worry**? (e.g., Bad harvest, Hospital costs, Children's education)"
-    elif step == "welcome":
-        return "Namaste! I am 'Suraksha Sahayak'. How can I help you today?"
-    return "How can I assist you?"
-
-def process_survey(user_id: str, message_text: str, current_session: Dict[str, Any] = None) -> Dict[str, Any]:
+    return render(step_prompt_key(step))
+
+def step_prompt_key(step: str) -> str:
+    """Returns the message catalog key of the prompt for a given step."""
+    key = f"prompt.{step}"
+    return key if key in MESSAGES else "prompt.default"
+
+def _reply(key: str, next_step: str, data: Dict[str, Any], **fields) -> Dict[str, Any]:
+    # `response` is the English text; message_key/message_fields let the caller
+    # pick the pre-translated version instead of translating it live.
+    return {"response": render(key, **fields), "next_step": next_step, "data": data,
+            "message_key": key, "message_fields": fields}
+
+def survey_profile(session_data: Dict[str, Any], worry: str) -> str:
+    """Profile string the recommendation is generated from."""
+    return f"Name: {session_data.get('name')}, Age: {session_data.get('age')}, Job: {session_data.get('occupation')}, Family: {session_data.get('family')}, Main Worry: {worry}"
+
+def process_survey(user_id: str, message_text: str, current_session: Dict[str, Any] = None,
+                   recommend: Callable[[str], str] = recommend_products) -> Dict[str, Any]:
     """
     Processes the user's message and calculates the next survey state.
-    Returns: { "response": str, "next_step": str, "data": dict }
+    Returns: { "response": str, "next_step": str, "data": dict, "message_key": str, "message_fields": dict }
     Does NOT update the DB directly.
+    `recommend` maps the profile string to a recommendation (async callers pass
+    in one they already fetched with arecommend_products).
     """
     # Use passed session or load (fallback)
     if current_session:
@@ -48,7 +53,8 @@ def process_survey(user_id: str, message_text: str, current_session: Dict[str, A
     current_step = session["step"]
     session_data = session["data"]
     
-    response_text = None
+    message_key = None
+    message_fields = {}
     next_step = current_step
     
     # --- Global Reset Handler ---
@@ -56,27 +62,23 @@ def process_survey(user_id: str, message_text: str, current_session: Dict[str, A
         # Reset to welcome state
         session_data = {} # Clear data
         next_step = "welcome"
-        response_text = "🔄 *Survey Reset*\n\nNamaste! Let's start over. \n\nTo begin, may I know your **full name**?"
-        return {"response": response_text, "next_step": next_step, "data": session_data}
+        return _reply("survey.reset", next_step, session_data)
 
     # --- Logic ---
     if current_step == "welcome":
         next_step = "ask_name"
-        response_text = (
-            "🙏 *Namaste! I am 'Suraksha Sahayak', your personal Insurance Advisor.*\n\n"
-            "My goal is to find the perfect safety net for you and your family.\n\n"
-            "To get started, may I please know your **full name**?"
-        )
+        message_key = "survey.welcome"
 
     elif current_step == "ask_name":
         session_data["name"] = message_text
         next_step = "ask_gender"
-        response_text = f"It is a pleasure to meet you, *{message_text}*. 🤝\n\nTo better understand your profile, may I know your **Gender**? (e.g., Male, Female, Other)"
+        message_key = "survey.name_ack"
+        message_fields = {"name": message_text}
 
     elif current_step == "ask_gender":
         session_data["gender"] = message_text
         next_step = "ask_age"
-        response_text = "Thank you. \n\nTo recommend the best plan for your life stage, could you please share your **Age**? (e.g., 35)"
+        message_key = "survey.gender_ack"
 
     elif current_step == "ask_age":
         # Extract number from text (simple robust method for "I am 45" etc)
@@ -84,43 +86,34 @@ def process_survey(user_id: str, message_text: str, current_session: Dict[str, A
         age_match = re.search(r'\d+', message_text)
         
         if not age_match:
-            response_text = "🙏 Apologies, I did not catch that.\n\nPlease reply with just the **number** of your age. \n\n*Example:* 45"
+            message_key = "survey.age_retry"
             next_step = "ask_age" 
         else:
-            session_data["age"] = age_match.group()
+            # int() also normalises Devanagari/Tamil digits when the reply wasn't translated
+            session_data["age"] = str(int(age_match.group()))
             next_step = "ask_occupation"
-            response_text = (
-                "✅ Got it.\n\n"
-                "Your occupation helps us understand your risks. What is your **main source of income**?\n"
-                "_(e.g., Farming, Small Business, Daily Wage, Service)_"
-            )
+            message_key = "survey.age_ack"
 
     elif current_step == "ask_occupation":
         session_data["occupation"] = message_text
         next_step = "ask_family"
-        response_text = "That is hard work! 💪\n\nNow, who do we need to protect? How many **family members** depend on you?"
+        message_key = "survey.occupation_ack"
 
     elif current_step == "ask_family":
         session_data["family"] = message_text
         next_step = "ask_worry"
-        response_text = (
-            "Understood.\n\n"
-            "Finally, what keeps you up at night? What is your **biggest financial worry**?\n"
-            "_(e.g., Bad harvest, Hospital costs, Children's education, Accidents)_"
-        )
+        message_key = "survey.family_ack"
 
     elif current_step == "ask_worry":
         session_data["worry"] = message_text
         next_step = "completed"
         
         # unique profile string
-        profile_str = f"Name: {session_data.get('name')}, Age: {session_data.get('age')}, Job: {session_data.get('occupation')}, Family: {session_data.get('family')}, Main Worry: {message_text}"
-        
-        response_text = "🙏 Thank you for sharing. Give me a moment to analyze the best protection plan for your specific situation..."
+        profile_str = survey_profile(session_data, message_text)
         
         # Generate Recommendation immediately
         try:
-           recommendation = recommend_products(profile_str)
+           recommendation = recommend(profile_str)
            session_data["recommendation"] = recommendation # SAVE TO DB
            # Generate PDF Report
            try:
@@ -129,34 +122,27 @@ def process_survey(user_id: str, message_text: str, current_session: Dict[str, A
                # Assuming static files are served at /static/
                pdf_link = f"http://localhost:8000/static/{pdf_filename}"
                
-               response_text = (
-                   f"💡 **My Expert Recommendation**:\n\n"
-                   f"{recommendation}\n\n"
-                   f"📄 **Download Your Personalized Report:**\n[Click here to download PDF]({pdf_link})\n\n"
-                   "-----------------------------\n"
-                   "Feel free to ask me questions like *'How do I claim?'* or *'What is the premium?'*"
-               )
+               message_key = "survey.recommendation_report"
+               message_fields = {"recommendation": recommendation, "pdf_link": pdf_link}
            except Exception as pdf_error:
                import traceback
                print(f"❌ PDF Generation Error: {pdf_error}")
                traceback.print_exc()
-               response_text = (
-                   f"💡 **My Expert Recommendation**:\n\n"
-                   f"{recommendation}\n\n"
-                   "-----------------------------\n"
-                   "Feel free to ask me questions like *'How do I claim?'* or *'What is the premium?'*"
-               )
+               message_key = "survey.recommendation"
+               message_fields = {"recommendation": recommendation}
         except Exception as e:
-           response_text = "🙏 Thank you. Our experts will review your profile and get back to you shortly."
+           message_key = "survey.recommendation_pending"
 
     elif current_step == "completed":
         if "reset" in message_text.lower():
             next_step = "welcome"
-            response_text = "🔄 Survey reset. What is your name?"
+            message_key = "survey.completed_reset"
         else:
              return None # Return None to indicate we should fall back to RAG/Query Agent
 
-    if response_text is None and next_step != current_step:
-         return {"response": "🙏 Apologies, something went wrong. Type 'reset' to start over.", "next_step": current_step, "data": session_data}
+    if message_key is None:
+         if next_step != current_step:
+             return _reply("survey.error", current_step, session_data)
+         return {"response": None, "next_step": next_step, "data": session_data}
 
-    return {"response": response_text, "next_step": next_step, "data": session_data}
+    return _reply(message_key, next_step, session_data, **message_fields)
@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from twilio.twiml.messaging_response import MessagingResponse
 from twilio.rest import Client
 import os
+import json
 import shutil
 import uuid
 import tempfile
@@ -12,8 +13,23 @@ from pydantic import BaseModel
 # Import services
 from app.services.agent_service import AgentService
 from app.services.voice_service import text_to_speech
-from app.db.session_db import init_db
-from fastapi.responses import FileResponse
+from app.db.session_db import init_db, close_sessions, get_session_db_stats
+from app.rag import registry
+from app.services.semantic_cache import get_cache_stats
+from app.services.chain_registry import chain_registry
+from app.services.translation_service import get_detection_stats
+from app.services.language_detector import get_detector
+from app.services.message_catalog import get_catalog
+from app.services.translation_memory import get_memory_stats
+from app.utils.executor import run_blocking, get_executor_stats
+from app.workflows.pipeline import get_pipeline_stats
+from app.utils.singleflight import get_singleflight_stats
+from app.utils.tokens import estimate_tokens
+from app.services.llm_scheduler import get_scheduler_stats
+from app.rag.context_packing import get_packing_stats
+from app.services import stand_ins
+from app.services.provider_router import get_router_stats
+from fastapi.responses import FileResponse, StreamingResponse
 
 load_dotenv()
 
@@ -48,9 +64,37 @@ def startup_event():
     init_db()
     print("✅ Database initialized.")
 
+    # Load the embedding model + vector store once, so the first chat turn
+    # doesn't pay for model initialisation.
+    if os.getenv("PRELOAD_MODELS", "true").lower() != "false":
+        try:
+            registry.preload()
+            print("✅ RAG models preloaded.")
+        except Exception as e:
+            print(f"⚠️ RAG preload failed (will load lazily): {e}")
+
+    # Train the n-gram language model (a few ms) before the first message
+    get_detector()
+    # Pre-translated survey/disclaimer/error strings
+    print(f"✅ Message catalog loaded: {get_catalog().stats()['languages']}")
+    # Load the tokenizer used for rate-limit budgets (may download its encoding once)
+    estimate_tokens("warm up")
+    if stand_ins.ENABLED:
+        print(f"🧪 Provider stand-ins active: {', '.join(sorted(stand_ins.ENABLED))}")
+
+@app.on_event("shutdown")
+def shutdown_event():
+    # Write back session updates still held by the write-behind cache
+    close_sessions()
+    print("✅ Session cache flushed.")
+
 # --- Twilio Client for Async Responses ---
 def send_whatsapp_message(to_number: str, body_text: str, media_url: str = None):
     try:
+        if stand_ins.stand_in_enabled("twilio"):
+            sid = stand_ins.send_message(to_number, body_text, media_url)
+            print(f"📤 Sent Async Message SID: {sid} (stand-in)")
+            return
         account_sid = os.getenv("TWILIO_ACCOUNT_SID")
         auth_token = os.getenv("TWILIO_AUTH_TOKEN")
         client = Client(account_sid, auth_token)
@@ -85,7 +129,8 @@ async def process_twilio_background(sender_id: str, text: str, media_url: str, m
     response_text = result.get("response_text", "")
     response_media = result.get("media_url") or result.get("audio_url")
     
-    send_whatsapp_message(sender_id, response_text, media_url=response_media)
+    # The Twilio SDK is blocking
+    await run_blocking(send_whatsapp_message, sender_id, response_text, media_url=response_media)
 
 # --- REST API for Web App ---
 
@@ -130,15 +175,46 @@ async def chat_endpoint(request: ChatRequest):
     )
     return result
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+def _sse_response(events) -> StreamingResponse:
+    async def event_source():
+        async for event, data in events:
+            yield _sse(event, data)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Server-Sent Events variant of /api/chat for progressive rendering.
+    Emits stage events (language, retrieving, retrieved, answering, token, translating,
+    answer, audio_ready, report_ready) and finally `done` with the same payload /api/chat returns.
+    """
+    return _sse_response(agent_service.stream_message(
+        session_id=request.session_id,
+        text=request.message,
+        tts_enabled=request.tts_enabled
+    ))
+
+def _save_upload(file: UploadFile) -> str:
+    file_path = os.path.join(static_dir, f"upload_{uuid.uuid4()}.wav")
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
+    return file_path
+
 @app.post("/api/audio")
 async def audio_endpoint(session_id: str = Form(...), file: UploadFile = File(...)):
     """
     REST API for Audio Uploads (Web Frontend).
     """
     # Save uploaded file
-    file_path = os.path.join(static_dir, f"upload_{uuid.uuid4()}.wav")
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    file_path = await run_blocking(_save_upload, file)
         
     result = await agent_service.process_message(
         session_id=session_id,
@@ -152,6 +228,20 @@ async def audio_endpoint(session_id: str = Form(...), file: UploadFile = File(..
     
     return result
 
+@app.post("/api/audio/stream")
+async def audio_stream_endpoint(session_id: str = Form(...), file: UploadFile = File(...)):
+    """
+    Server-Sent Events variant of /api/audio: the same events as /api/chat/stream,
+    starting with `transcribed` once the voice note has been transcribed.
+    """
+    file_path = await run_blocking(_save_upload, file)
+    return _sse_response(agent_service.stream_message(
+        session_id=session_id,
+        text=None,
+        audio_url=file_path,
+        audio_type="audio/wav"
+    ))
+
 # --- Twilio Webhook ---
 
 @app.post("/webhook")
@@ -179,6 +269,28 @@ async def whatsapp_webhook(
     
     return Response(content=str(MessagingResponse()), media_type="application/xml")
 
+@app.get("/api/metrics")
+def metrics_endpoint():
+    """
+    Runtime figures for tuning (model load times, memory, cache hit rates).
+    """
+    return {
+        "rag": registry.get_load_stats(),
+        "semantic_cache": get_cache_stats(),
+        "chains": chain_registry.stats(),
+        "language_detection": get_detection_stats(),
+        "message_catalog": get_catalog().stats(),
+        "translation_memory": get_memory_stats(),
+        "blocking_executor": get_executor_stats(),
+        "pipeline": get_pipeline_stats(),
+        "singleflight": get_singleflight_stats(),
+        "llm_scheduler": get_scheduler_stats(),
+        "context_packing": get_packing_stats(),
+        "provider_router": get_router_stats(),
+        "session_db": get_session_db_stats(),
+        "stand_ins": stand_ins.get_stand_in_stats()
+    }
+
 @app.get("/")
 def health_check():
     return {"status": "running", "service": "Insurance Agent API (Web + WhatsApp)"}
@@ -0,0 +1,188 @@
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from app.utils.metrics import summarize_latencies
+
+# Write-behind cache in front of the session table.
+# Every message reads its session at the start of the turn and rewrites the
+# whole JSON blob at the end. Hot sessions are kept in an LRU; an update is
+# acknowledged once it is in memory and marked dirty, and a background thread
+# writes all dirty sessions in one transaction every `flush_interval` seconds
+# (sooner if `max_dirty` pile up). A user who sends several messages inside one
+# interval costs one row write. close() - called on shutdown and at exit - stops
+# the thread and flushes whatever is left, so a graceful restart loses nothing
+# that update_session returned for; a crash loses at most one interval.
+#
+# Entries are (step, JSON payload): update_session serialises the data anyway,
+# and a payload snapshot means later mutations of the caller's dict (or of a
+# dict handed out by get) never reach the cache. Dirty entries also carry the
+# time of the update, which is what gets written as updated_at.
+
+Entry = Tuple[str, str]
+Row = Tuple[str, str, str, float]
+STATS_WINDOW = 1000
+
+class SessionCache:
+    """
+    LRU of sessions with dirty tracking and batched write-behind.
+    `load(user_id)` reads one (step, payload) or None; `store(rows)` writes
+    [(user_id, step, payload, updated_at), ...] in a single transaction.
+    """
+    def __init__(self, path: str, load: Callable[[str], Optional[Entry]],
+                 store: Callable[[Iterable[Row]], None],
+                 max_entries: int, flush_interval: float, max_dirty: int):
+        self.path = path
+        self._load = load
+        self._store = store
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.max_dirty = max_dirty
+        self._lock = threading.Lock()
+        # One flush at a time, so an older snapshot can never commit after a newer one
+        self._flush_lock = threading.Lock()
+        self._entries: "OrderedDict[str, Entry]" = OrderedDict()
+        # Acknowledged but not yet written; kept apart from the LRU so eviction never drops them
+        self._dirty: Dict[str, Tuple[str, str, float]] = {}
+        # Taken by the flush in progress; still served to readers until committed
+        self._flushing: Dict[str, Tuple[str, str, float]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+        self.evictions = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.flush_errors = 0
+        self.flush_latencies = deque(maxlen=STATS_WINDOW)
+        self.batch_sizes = deque(maxlen=STATS_WINDOW)
+        self.closed = False
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="session-cache-flush", daemon=True)
+        self._thread.start()
+
+    def _remember(self, user_id: str, entry: Entry):
+        self._entries[user_id] = entry
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, user_id: str) -> Optional[Entry]:
+        with self._lock:
+            pending = self._dirty.get(user_id) or self._flushing.get(user_id)
+            entry = pending[:2] if pending else None
+            if entry is None:
+                entry = self._entries.get(user_id)
+                if entry is not None:
+                    self._entries.move_to_end(user_id)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        entry = self._load(user_id)
+        if entry is not None:
+            with self._lock:
+                # An update that landed while we were reading wins over the row we read
+                pending = self._dirty.get(user_id) or self._flushing.get(user_id)
+                if pending:
+                    return pending[:2]
+                if user_id in self._entries:
+                    return self._entries[user_id]
+                self._remember(user_id, entry)
+        return entry
+
+    def put(self, user_id: str, step: str, payload: str):
+        updated_at = time.time()
+        with self._lock:
+            closed = self.closed
+            if not closed:
+                # Re-queued at the end, so a batch is written in update order
+                self._dirty.pop(user_id, None)
+                self._dirty[user_id] = (step, payload, updated_at)
+                self._remember(user_id, (step, payload))
+                self.updates += 1
+                backlog = len(self._dirty)
+        if closed:
+            # Late writers after shutdown go straight to the database
+            self._store([(user_id, step, payload, updated_at)])
+        elif backlog >= self.max_dirty:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """
+        Writes every dirty session in one transaction. Returns the number written.
+        On failure the batch is put back (behind any newer update) and retried next interval.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return 0
+                self._flushing, self._dirty = self._dirty, {}
+                batch = [(user_id, *pending) for user_id, pending in self._flushing.items()]
+            start = time.perf_counter()
+            try:
+                self._store(batch)
+            except Exception:
+                with self._lock:
+                    for user_id, entry in self._flushing.items():
+                        self._dirty.setdefault(user_id, entry)
+                    self._flushing = {}
+                    self.flush_errors += 1
+                raise
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._flushing = {}
+                self.flushes += 1
+                self.flushed_rows += len(batch)
+                self.flush_latencies.append(elapsed)
+                self.batch_sizes.append(len(batch))
+            return len(batch)
+
+    def _run(self):
+        while not self.closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self.closed:
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Session cache flush failed (will retry): {e}")
+
+    def close(self):
+        """
+        Stops the flush thread and writes everything still dirty.
+        """
+        with self._lock:
+            if self.closed:
+                return
+            # Set under the lock: a put either lands before it (and is flushed below) or writes through
+            self.closed = True
+        self._wake.set()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "dirty": len(self._dirty) + len(self._flushing),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "updates": self.updates,
+                "evictions": self.evictions,
+                "flushes": self.flushes,
+                "flushed_rows": self.flushed_rows,
+                # Updates absorbed by a later update to the same session before it was written
+                "coalesced": max(0, self.updates - self.flushed_rows - len(self._dirty) - len(self._flushing)),
+                "flush_errors": self.flush_errors,
+                "flush_interval_s": self.flush_interval,
+                "flush_latency": summarize_latencies(self.flush_latencies),
+                "avg_batch": round(sum(self.batch_sizes) / len(self.batch_sizes), 1) if self.batch_sizes else 0.0,
+            }
@@ -1,38 +1,445 @@
 import sqlite3
 import json
 import os
-from typing import Dict, Any
+import time
+import queue
+import hashlib
+import atexit
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
+
+from app.db.session_cache import SessionCache
+from app.utils.metrics import summarize_latencies
 
 DB_PATH = os.path.join(os.path.dirname(__file__), "../../sessions.db")
 
-def get_connection():
-    return sqlite3.connect(DB_PATH)
+# Users are spread over SESSION_SHARDS SQLite files by a hash of user_id, so
+# writes for different shards never wait on each other's write lock. With one
+# shard the store is DB_PATH itself; with N it is sessions.0-of-N.db ...
+# sessions.(N-1)-of-N.db next to it. Changing N needs scripts/reshard_sessions.py.
+SESSION_SHARDS = int(os.getenv("SESSION_SHARDS", "1"))
 
-def init_db():
+# Connections are opened once and shared through a bounded pool instead of one
+# connect/close per call. The database runs in WAL mode, so readers never block
+# the writer (or each other) and a write is an append to the log rather than a
+# rewrite of the rollback journal; a writer that finds another one active waits
+# up to busy_timeout instead of failing with "database is locked".
+POOL_SIZE = int(os.getenv("SESSION_DB_POOL_SIZE", "8"))
+# How long a caller waits for a free pooled connection
+POOL_TIMEOUT = float(os.getenv("SESSION_DB_POOL_TIMEOUT", "10"))
+BUSY_TIMEOUT_MS = int(os.getenv("SESSION_DB_BUSY_TIMEOUT_MS", "5000"))
+MMAP_SIZE = int(os.getenv("SESSION_DB_MMAP_SIZE", str(64 * 1024 * 1024)))
+# NORMAL (default) or FULL to fsync every commit
+SYNCHRONOUS = os.getenv("SESSION_DB_SYNCHRONOUS", "NORMAL").upper()
+# Prepared statements kept per connection (sqlite3 re-uses them by SQL text)
+CACHED_STATEMENTS = 32
+STATS_WINDOW = 1000
+
+# get_session/update_session go through a write-behind cache (see session_cache.py):
+# updates are batched into one transaction every SESSION_CACHE_FLUSH_INTERVAL seconds
+# and flushed on shutdown.
+SESSION_CACHE = os.getenv("SESSION_CACHE", "true").lower() != "false"
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+SESSION_CACHE_FLUSH_INTERVAL = float(os.getenv("SESSION_CACHE_FLUSH_INTERVAL", "0.2"))
+# Flush early once this many sessions are waiting
+SESSION_CACHE_MAX_DIRTY = int(os.getenv("SESSION_CACHE_MAX_DIRTY", "1000"))
+
+SELECT_SESSION = "SELECT step, data FROM sessions WHERE user_id = ?"
+UPSERT_SESSION = "INSERT OR REPLACE INTO sessions (user_id, step, data, updated_at) VALUES (?, ?, ?, ?)"
+SELECT_ALL_SESSIONS = "SELECT user_id, step, data FROM sessions"
+
+# Schema, tracked in PRAGMA user_version:
+#   0  user_id, step, data
+#   1  + updated_at and the survey answers as generated columns (init_db, instant)
+#   2  + updated_at backfilled and the indexes below built (migrate(), batched)
+SCHEMA_VERSION = 2
+# Generated columns need SQLite 3.31
+MIN_SQLITE_VERSION = (3, 31, 0)
+# Sessions the server migrates by itself at startup; larger files are left to scripts/migrate_sessions_db.py
+INLINE_MIGRATION_ROWS = 50000
+MIGRATION_BATCH = 5000
+
+# The survey answers stay in `data`; these VIRTUAL generated columns expose them
+# as typed, indexable columns. They are computed from `data`, so adding them is a
+# schema-only change and every write keeps them in step; an index on one stores
+# its values.
+SURVEY_COLUMNS = {
+    "name": "TEXT GENERATED ALWAYS AS (json_extract(data, '$.name')) VIRTUAL",
+    "age": "INTEGER GENERATED ALWAYS AS (CAST(json_extract(data, '$.age') AS INTEGER)) VIRTUAL",
+    "occupation": "TEXT GENERATED ALWAYS AS (json_extract(data, '$.occupation')) VIRTUAL",
+    "family": "TEXT GENERATED ALWAYS AS (json_extract(data, '$.family')) VIRTUAL",
+    "worry": "TEXT GENERATED ALWAYS AS (json_extract(data, '$.worry')) VIRTUAL",
+    "recommendation": "TEXT GENERATED ALWAYS AS (json_extract(data, '$.recommendation')) VIRTUAL",
+    "language": "TEXT GENERATED ALWAYS AS (json_extract(data, '$.language')) VIRTUAL",
+}
+# Unix time of the last write; rows from before the column existed read 0 until backfilled
+UPDATED_AT_COLUMN = "REAL NOT NULL DEFAULT 0"
+
+# Admin queries run in SQLite so the dashboard never loads the table.
+# A lead is a session with any survey data.
+SURVEY_STEPS = ("welcome", "ask_name", "ask_gender", "ask_age", "ask_occupation", "ask_family", "ask_worry", "completed")
+LEAD_FIELDS = tuple(SURVEY_COLUMNS)
+IS_LEAD = "data != '{}'"
+# Filter columns lead their index and updated_at follows, so a filtered lead page
+# is a walk down one index; partial on IS_LEAD, which every admin query carries.
+SESSION_INDEXES = {
+    "idx_sessions_updated_at": "sessions(updated_at)",
+    "idx_sessions_step": f"sessions(step, updated_at) WHERE {IS_LEAD}",
+    "idx_sessions_occupation": f"sessions(occupation, updated_at) WHERE {IS_LEAD}",
+    "idx_sessions_language": f"sessions(language, updated_at) WHERE {IS_LEAD}",
+}
+LEADS_BY_STEP = f"SELECT step, COUNT(*) FROM sessions WHERE {IS_LEAD} GROUP BY step"
+TOP_OCCUPATIONS = (
+    "SELECT occupation, COUNT(*) AS n FROM sessions "
+    f"WHERE {IS_LEAD} AND occupation IS NOT NULL GROUP BY occupation ORDER BY n DESC, occupation LIMIT ?"
+)
+# Read off idx_sessions_occupation (partial on IS_LEAD, occupation first) without touching the table
+LEAD_OCCUPATIONS = f"SELECT DISTINCT occupation FROM sessions WHERE {IS_LEAD} AND occupation IS NOT NULL"
+
+def get_connection(path: str = None) -> sqlite3.Connection:
+    """
+    Opens a tuned connection to the sessions database (WAL, synchronous=NORMAL,
+    busy_timeout, mmap). Usable from any thread; the pool hands each to one at a time.
+    """
+    conn = sqlite3.connect(path or DB_PATH, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                           cached_statements=CACHED_STATEMENTS)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # In WAL mode NORMAL (the default) only syncs at checkpoints: a power cut
+    # may drop the last commits but never corrupts the database
+    conn.execute(f"PRAGMA synchronous={SYNCHRONOUS}")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    return conn
+
+class ConnectionPool:
+    """
+    Bounded pool of connections to one SQLite file, opened lazily up to `size`.
+    """
+    def __init__(self, path: str, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._all = []
+        self.checkouts = 0
+        self.waits = deque(maxlen=STATS_WINDOW)
+        self.closed = False
+
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._all) < self.size:
+                conn = get_connection(self.path)
+                self._all.append(conn)
+                return conn
+        start = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No session DB connection free after {self.timeout}s (pool size {self.size})")
+        with self._lock:
+            self.waits.append(time.perf_counter() - start)
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrows a connection; an open transaction is rolled back if the block raises.
+        """
+        conn = self._checkout()
+        with self._lock:
+            self.checkouts += 1
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            if self.closed:
+                conn.close()
+            else:
+                self._idle.put(conn)
+
+    def close(self):
+        """
+        Closes idle connections now and busy ones as they are returned.
+        """
+        self.closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "path": os.path.abspath(self.path),
+                "size": self.size,
+                "open": len(self._all),
+                "idle": self._idle.qsize(),
+                "checkouts": self.checkouts,
+                "waited": len(self.waits),
+                "wait": summarize_latencies(self.waits),
+            }
+
+def shard_paths(path: str = None, shards: int = None) -> List[str]:
+    """
+    The files a store at `path` (DB_PATH) split into `shards` (SESSION_SHARDS) parts lives in.
+    """
+    path = path or DB_PATH
+    shards = shards or SESSION_SHARDS
+    if shards == 1:
+        return [path]
+    root, ext = os.path.splitext(path)
+    return [f"{root}.{i}-of-{shards}{ext}" for i in range(shards)]
+
+def shard_index(user_id: str, shards: int) -> int:
+    # A stable hash (not hash(), which is salted per process)
+    digest = hashlib.blake2b(user_id.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards
+
+def _load_session(pool: ConnectionPool, user_id: str) -> Optional[tuple]:
+    with pool.connection() as conn:
+        return conn.execute(SELECT_SESSION, (user_id,)).fetchone()
+
+def _store_sessions(pool: ConnectionPool, rows) -> None:
+    with pool.connection() as conn:
+        conn.executemany(UPSERT_SESSION, rows)
+        conn.commit()
+
+class Shard:
+    """
+    One file of the session store: its connection pool and write-behind cache.
+    """
+    def __init__(self, index: int, path: str, count: int):
+        self.index = index
+        self.path = path
+        # The cache budget is split between the shards
+        self.cache_size = max(1, SESSION_CACHE_SIZE // count)
+        # The connection budget is split too: more writers per file only queue on its lock
+        self.pool = ConnectionPool(path, size=max(2, POOL_SIZE // count))
+        self.cache: Optional[SessionCache] = None
+        self._lock = threading.Lock()
+        # Writes need at least schema version 1, even from callers that never ran init_db
+        with self.pool.connection() as conn:
+            create_schema(conn)
+
+    def get_cache(self) -> Optional[SessionCache]:
+        if not SESSION_CACHE:
+            return None
+        cache = self.cache
+        if cache is None:
+            with self._lock:
+                if self.cache is None:
+                    pool = self.pool
+                    self.cache = SessionCache(self.path,
+                                              load=lambda user_id: _load_session(pool, user_id),
+                                              store=lambda rows: _store_sessions(pool, rows),
+                                              max_entries=self.cache_size,
+                                              flush_interval=SESSION_CACHE_FLUSH_INTERVAL,
+                                              max_dirty=SESSION_CACHE_MAX_DIRTY)
+                cache = self.cache
+        return cache
+
+    def flush(self) -> int:
+        cache = self.cache
+        return cache.flush() if cache is not None else 0
+
+    def close_cache(self):
+        with self._lock:
+            if self.cache is not None:
+                self.cache.close()
+                self.cache = None
+
+    def stats(self) -> Dict[str, Any]:
+        cache = self.cache
+        return {"pool": self.pool.stats(), "cache": cache.stats() if cache is not None else None}
+
+_shards: List[Shard] = []
+_layout: Optional[tuple] = None
+_shards_lock = threading.Lock()
+
+def get_shards() -> List[Shard]:
+    """
+    The shards of the store at DB_PATH / SESSION_SHARDS (re-created if either is changed, as the load test does).
+    """
+    global _shards, _layout
+    if _layout != (DB_PATH, SESSION_SHARDS):
+        with _shards_lock:
+            if _layout != (DB_PATH, SESSION_SHARDS):
+                for shard in _shards:
+                    # Writes acknowledged for the old files go to the old files
+                    shard.close_cache()
+                    shard.pool.close()
+                paths = shard_paths()
+                _shards = [Shard(i, path, len(paths)) for i, path in enumerate(paths)]
+                _layout = (DB_PATH, SESSION_SHARDS)
+    return _shards
+
+def shard_for(user_id: str) -> Shard:
+    shards = get_shards()
+    return shards[shard_index(user_id, len(shards)) if len(shards) > 1 else 0]
+
+def get_pool(user_id: str = None) -> ConnectionPool:
+    """
+    The pool of the shard holding `user_id`; without one, of the first shard (the only one unless sharded).
+    """
+    return (shard_for(user_id) if user_id is not None else get_shards()[0]).pool
+
+def get_cache(user_id: str = None) -> Optional[SessionCache]:
+    """
+    The write-behind cache of the shard holding `user_id` (as get_pool), or None when SESSION_CACHE is off.
+    """
+    return (shard_for(user_id) if user_id is not None else get_shards()[0]).get_cache()
+
+def flush_sessions() -> int:
+    """
+    Writes every acknowledged update still in the caches. Returns the number of sessions written.
     """
-    Initialize the sessions table if it doesn't exist.
+    return sum(shard.flush() for shard in _shards)
+
+@atexit.register
+def close_sessions():
+    """
+    Stops the session caches after writing everything they hold (server shutdown, and again at exit).
+    """
+    with _shards_lock:
+        for shard in _shards:
+            shard.close_cache()
+
+def _add_columns(conn: sqlite3.Connection):
+    """
+    Schema version 1: adds updated_at and the generated survey columns (no row is rewritten).
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
+    existing = {row[1] for row in conn.execute("PRAGMA table_xinfo(sessions)")}
+    if "updated_at" not in existing:
+        conn.execute(f"ALTER TABLE sessions ADD COLUMN updated_at {UPDATED_AT_COLUMN}")
+    for column, definition in SURVEY_COLUMNS.items():
+        if column not in existing:
+            conn.execute(f"ALTER TABLE sessions ADD COLUMN {column} {definition}")
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def create_schema(conn: sqlite3.Connection):
+    """
+    Creates the sessions table if it doesn't exist and brings an older one to schema version 1.
+    """
+    columns = ",\n".join(f"                {name} {definition}" for name, definition in SURVEY_COLUMNS.items())
+    conn.execute(f"""
         CREATE TABLE IF NOT EXISTS sessions (
             user_id TEXT PRIMARY KEY,
             step TEXT,
-            data TEXT
+            data TEXT,
+            updated_at {UPDATED_AT_COLUMN},
+{columns}
         )
     """)
+    if schema_version(conn) < 1:
+        _add_columns(conn)
+        conn.execute("PRAGMA user_version = 1")
     conn.commit()
-    conn.close()
+
+def init_db():
+    """
+    Initialize the sessions table in every shard if it doesn't exist, and bring an older one up to date.
+    Small tables are fully migrated here; for large ones run scripts/migrate_sessions_db.py
+    (sessions work meanwhile, the admin queries are just not indexed yet).
+    """
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        raise RuntimeError(f"The session store needs SQLite >= 3.31 (found {sqlite3.sqlite_version})")
+    for shard in get_shards():
+        with shard.pool.connection() as conn:
+            create_schema(conn)
+            version = schema_version(conn)
+            pending = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM sessions").fetchone()[0]
+
+        if version < SCHEMA_VERSION:
+            if pending <= INLINE_MIGRATION_ROWS:
+                migrate(shard.path)
+            else:
+                print(f"⚠️ {os.path.basename(shard.path)} (~{pending} rows) is not indexed yet: "
+                      "run scripts/migrate_sessions_db.py")
+
+def migrate(path: str = None, batch_size: int = MIGRATION_BATCH, pause: float = 0.0, progress=None) -> Dict[str, Any]:
+    """
+    Brings a sessions database to SCHEMA_VERSION in place, while it stays in use.
+    Every step is its own short transaction, so the server's writers wait at most
+    one batch or one index build (busy_timeout; the write-behind cache absorbs it)
+    and WAL readers never wait:
+      1. adds the columns (schema-only)
+      2. backfills updated_at in rowid batches of `batch_size`, sleeping `pause`
+         between them. Rows written before the column existed get the oldest
+         known update time, so they stay behind every row written since.
+      3. builds each index (this is where the generated columns' values are computed)
+    Safe to re-run or interrupt. `progress(message)` is called after each step.
+    """
+    report = progress or (lambda message: None)
+    conn = get_connection(path)
+    stats = {"backfilled": 0, "batches": 0, "indexes": [], "seconds": 0.0}
+    start = time.perf_counter()
+    try:
+        if schema_version(conn) < 1:
+            _add_columns(conn)
+            conn.execute("PRAGMA user_version = 1")
+            conn.commit()
+            report("columns added")
+
+        floor = conn.execute("SELECT MIN(updated_at) FROM sessions WHERE updated_at > 0").fetchone()[0] or time.time()
+        # Rows written from here on already carry updated_at (and a rowid above `end`)
+        end = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM sessions").fetchone()[0]
+        last = 0
+        while last < end:
+            bounds = conn.execute("SELECT MIN(rowid), MAX(rowid) FROM (SELECT rowid FROM sessions WHERE rowid > ? "
+                                  "AND rowid <= ? ORDER BY rowid LIMIT ?)", (last, end, batch_size)).fetchone()
+            if bounds[0] is None:
+                break
+            cur = conn.execute("UPDATE sessions SET updated_at = ? WHERE rowid BETWEEN ? AND ? AND updated_at = 0",
+                               (floor, bounds[0], bounds[1]))
+            conn.commit()
+            last = bounds[1]
+            stats["backfilled"] += cur.rowcount
+            stats["batches"] += 1
+            report(f"backfilled updated_at up to rowid {last} ({stats['backfilled']} rows)")
+            if pause:
+                time.sleep(pause)
+
+        for name, target in SESSION_INDEXES.items():
+            exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)).fetchone()
+            if exists:
+                continue
+            index_start = time.perf_counter()
+            conn.execute(f"CREATE INDEX {name} ON {target}")
+            conn.commit()
+            stats["indexes"].append({"name": name, "seconds": round(time.perf_counter() - index_start, 3)})
+            report(f"built {name} in {time.perf_counter() - index_start:.2f}s")
+            if pause:
+                time.sleep(pause)
+
+        # Sampled statistics, so the planner picks the filter indexes
+        conn.execute("PRAGMA analysis_limit = 1000")
+        conn.execute("ANALYZE sessions")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.commit()
+    finally:
+        conn.close()
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    return stats
 
 def get_session(user_id: str) -> Dict[str, Any]:
     """
     Retrieve session data for a user. Returns a default session if not found.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT step, data FROM sessions WHERE user_id = ?", (user_id,))
-    row = cursor.fetchone()
-    conn.close()
+    shard = shard_for(user_id)
+    cache = shard.get_cache()
+    row = cache.get(user_id) if cache is not None else _load_session(shard.pool, user_id)
 
     if row:
         return {
@@ -47,25 +454,24 @@ def update_session(user_id: str, step: str, data: Dict[str, Any]):
     """
     Update or insert session data for a user.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT OR REPLACE INTO sessions (user_id, step, data)
-        VALUES (?, ?, ?)
-    """, (user_id, step, json.dumps(data)))
-    conn.commit()
-    conn.close()
+    payload = json.dumps(data)
+    shard = shard_for(user_id)
+    cache = shard.get_cache()
+    if cache is not None:
+        cache.put(user_id, step, payload)
+    else:
+        _store_sessions(shard.pool, [(user_id, step, payload, time.time())])
 
 def get_all_sessions() -> list[Dict[str, Any]]:
     """
-    Retrieve all sessions for the admin dashboard.
+    Retrieve all sessions (from every shard) for the admin dashboard.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT user_id, step, data FROM sessions")
-    rows = cursor.fetchall()
-    conn.close()
-    
+    flush_sessions()
+    rows = []
+    for shard in get_shards():
+        with shard.pool.connection() as conn:
+            rows.extend(conn.execute(SELECT_ALL_SESSIONS).fetchall())
+
     results = []
     for row in rows:
         results.append({
@@ -74,3 +480,108 @@ def get_all_sessions() -> list[Dict[str, Any]]:
             "data": json.loads(row[2])
         })
     return results
+
+def get_lead_stats(top: int = 5) -> Dict[str, Any]:
+    """
+    Dashboard aggregates: lead counts by step, the most common occupations and
+    the completion funnel (leads that reached each survey step or a later one).
+    Shards are queried in turn and their counts added up.
+    """
+    flush_sessions()
+    shards = get_shards()
+    by_step, occupation_counts = Counter(), Counter()
+    for shard in shards:
+        with shard.pool.connection() as conn:
+            by_step.update(dict(conn.execute(LEADS_BY_STEP).fetchall()))
+            # A shard's top few need not be the overall top few: take all its counts (LIMIT -1)
+            occupation_counts.update(dict(conn.execute(TOP_OCCUPATIONS, (top if len(shards) == 1 else -1,)).fetchall()))
+    by_step = dict(by_step)
+    occupations = sorted(occupation_counts.items(), key=lambda item: (-item[1], item[0]))[:top]
+
+    funnel = []
+    reached = 0
+    for step in reversed(SURVEY_STEPS):
+        reached += by_step.get(step, 0)
+        funnel.append({"step": step, "reached": reached})
+    funnel.reverse()
+    started = funnel[0]["reached"]
+    for stage in funnel:
+        stage["rate"] = round(stage["reached"] / started, 3) if started else 0.0
+
+    return {
+        "total": sum(by_step.values()),
+        "completed": by_step.get("completed", 0),
+        "by_step": by_step,
+        "top_occupations": [{"occupation": o, "count": n} for o, n in occupations],
+        "funnel": funnel,
+    }
+
+def list_occupations() -> List[str]:
+    """
+    Every distinct occupation among the leads of all shards, sorted (for the dashboard filter).
+    """
+    flush_sessions()
+    occupations = set()
+    for shard in get_shards():
+        with shard.pool.connection() as conn:
+            occupations.update(row[0] for row in conn.execute(LEAD_OCCUPATIONS))
+    return sorted(occupations)
+
+def _after_cursor(cursor: tuple, shard: int) -> tuple:
+    """
+    WHERE clause for rows of `shard` that sort after `cursor` in (updated_at, shard, rowid) descending order.
+    """
+    updated_at, cursor_shard, rowid = cursor
+    if shard < cursor_shard:
+        return "updated_at <= ?", (updated_at,)
+    if shard == cursor_shard:
+        return "(updated_at, rowid) < (?, ?)", (updated_at, rowid)
+    return "updated_at < ?", (updated_at,)
+
+def list_leads(limit: int = 50, cursor: Optional[tuple] = None, step: Optional[str] = None,
+               occupation: Optional[str] = None, language: Optional[str] = None) -> Dict[str, Any]:
+    """
+    One page of leads, most recently updated first.
+    Keyset-paginated on (updated_at, shard, rowid): pass the returned `next_cursor`
+    back for the next page (None on the last). Each shard contributes its own
+    first `limit` rows after the cursor and the pages are merged.
+    """
+    filters, filter_params = [], []
+    for column, value in (("step", step), ("occupation", occupation), ("language", language)):
+        if value:
+            filters.append(f"{column} = ?")
+            filter_params.append(value)
+
+    flush_sessions()
+    rows = []
+    for shard in get_shards():
+        where, params = [IS_LEAD] + filters, list(filter_params)
+        if cursor is not None:
+            clause, values = _after_cursor(cursor, shard.index)
+            where.append(clause)
+            params.extend(values)
+        sql = (f"SELECT updated_at, {shard.index}, rowid, user_id, step, {', '.join(LEAD_FIELDS)} FROM sessions "
+               f"WHERE {' AND '.join(where)} ORDER BY updated_at DESC, rowid DESC LIMIT ?")
+        with shard.pool.connection() as conn:
+            rows.extend(conn.execute(sql, (*params, limit + 1)).fetchall())
+    rows.sort(key=lambda row: row[:3], reverse=True)
+
+    leads = [{"user_id": row[3], "step": row[4], "updated_at": row[0], **dict(zip(LEAD_FIELDS, row[5:]))}
+             for row in rows[:limit]]
+    next_cursor = tuple(rows[limit - 1][:3]) if len(rows) > limit else None
+    return {"leads": leads, "next_cursor": next_cursor}
+
+def iter_leads(batch_size: int = 1000, **filters) -> Iterator[Dict[str, Any]]:
+    """
+    Every lead matching `filters` (see list_leads), fetched a page at a time.
+    """
+    cursor = None
+    while True:
+        page = list_leads(limit=batch_size, cursor=cursor, **filters)
+        yield from page["leads"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return
+
+def get_session_db_stats() -> Dict[str, Any]:
+    return {"shards": [shard.stats() for shard in get_shards()]}
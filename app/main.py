@@ -1,6 +1,8 @@
 import streamlit as st
 import os
 import sys
+import io
+import csv
 import time
 
 # Add project root to sys.path to allow importing from 'app' package
@@ -15,7 +17,10 @@ except ImportError as e:
     st.stop()
 
 # Import Admin DB
-from app.db.session_db import get_all_sessions
+from app.db.session_db import get_lead_stats, list_leads, iter_leads, list_occupations
+
+# Seconds the dashboard metrics are cached between reruns
+DASHBOARD_TTL = int(os.getenv("DASHBOARD_TTL", "30"))
 
 def main():
     st.set_page_config(page_title="Insurance Agent", page_icon="🛡️", layout="wide")
@@ -56,59 +61,98 @@ def main():
 def show_admin_dashboard():
     st.title("📊 Admin Dashboard - Rural Leads")
     
-    # metrics
-    sessions = get_all_sessions()
-    
-    # Process Data
-    import pandas as pd
-    
-    data_list = []
-    for s in sessions:
-        user_data = s["data"]
-        # Only interested in people who started the survey
-        if not user_data:
-            continue
-            
-        row = {
-            "User ID": s["user_id"],
-            "Status": s["step"],
-            "Name": user_data.get("name", "N/A"),
-            "Age": user_data.get("age", "N/A"),
-            "Occupation": user_data.get("occupation", "N/A"),
-            "Family": user_data.get("family", "N/A"),
-            "Worry": user_data.get("worry", "N/A"),
-            "Recommendation": user_data.get("recommendation", "Pending")
-        }
-        data_list.append(row)
-        
-    if not data_list:
+    # Metrics are aggregated in SQLite; only the rows on screen are fetched
+    stats = load_lead_stats()
+    if not stats["total"]:
         st.info("No survey data available yet.")
         return
 
-    df = pd.DataFrame(data_list)
-    
-    # Metrics
     col1, col2, col3 = st.columns(3)
-    col1.metric("Total Leads", len(df))
-    col2.metric("Completed Surveys", len(df[df["Status"] == "completed"]))
-    
-    if "Occupation" in df.columns:
-        top_occupation = df["Occupation"].mode()
-        if not top_occupation.empty:
-            col3.metric("Top Occupation", top_occupation[0])
+    col1.metric("Total Leads", stats["total"])
+    col2.metric("Completed Surveys", stats["completed"])
+    if stats["top_occupations"]:
+        col3.metric("Top Occupation", stats["top_occupations"][0]["occupation"])
+
+    st.subheader("🔻 Completion Funnel")
+    st.bar_chart({stage["step"]: stage["reached"] for stage in stats["funnel"]})
 
     st.divider()
     
     st.subheader("📋 Recent Leads")
-    st.dataframe(df, use_container_width=True)
+    col1, col2, col3, col4 = st.columns(4)
+    step = col1.selectbox("Status", ["All"] + sorted(stats["by_step"]))
+    occupation = col2.selectbox("Occupation", ["All"] + load_occupations())
+    language = col3.text_input("Language code")
+    page_size = col4.selectbox("Rows per page", [25, 50, 100], index=1)
+    filters = {
+        "step": None if step == "All" else step,
+        "occupation": None if occupation == "All" else occupation,
+        "language": language.strip() or None,
+    }
+
+    # Keyset pagination: remember the cursor that opened each page we have seen
+    if st.session_state.get("lead_filters") != (filters, page_size):
+        st.session_state.lead_filters = (filters, page_size)
+        st.session_state.lead_cursors = [None]
+        # An export made under the old filters must not be offered for the new ones
+        st.session_state.leads_csv = None
+    cursors = st.session_state.lead_cursors
+    page = list_leads(limit=page_size, cursor=cursors[-1], **filters)
+
+    st.dataframe([lead_row(lead) for lead in page["leads"]], use_container_width=True)
+    col1, col2, col3 = st.columns([1, 1, 4])
+    if col1.button("⬅️ Previous", disabled=len(cursors) == 1):
+        cursors.pop()
+        st.rerun()
+    if col2.button("Next ➡️", disabled=page["next_cursor"] is None):
+        cursors.append(page["next_cursor"])
+        st.rerun()
+    col3.caption(f"Page {len(cursors)}")
     
     st.divider()
-    st.download_button(
-        label="Download Leads CSV",
-        data=df.to_csv(index=False).encode('utf-8'),
-        file_name='rural_leads.csv',
-        mime='text/csv',
-    )
+    if st.button("Prepare Leads CSV"):
+        with st.spinner("Exporting leads..."):
+            st.session_state.leads_csv = export_leads_csv(**filters)
+    if st.session_state.get("leads_csv"):
+        st.download_button(
+            label="Download Leads CSV",
+            data=st.session_state.leads_csv,
+            file_name='rural_leads.csv',
+            mime='text/csv',
+        )
+
+@st.cache_data(ttl=DASHBOARD_TTL)
+def load_lead_stats():
+    return get_lead_stats()
+
+@st.cache_data(ttl=DASHBOARD_TTL)
+def load_occupations():
+    return list_occupations()
+
+def lead_row(lead):
+    return {
+        "User ID": lead["user_id"],
+        "Status": lead["step"],
+        "Name": lead["name"] or "N/A",
+        "Age": lead["age"] or "N/A",
+        "Occupation": lead["occupation"] or "N/A",
+        "Family": lead["family"] or "N/A",
+        "Worry": lead["worry"] or "N/A",
+        "Recommendation": lead["recommendation"] or "Pending",
+        "Last Updated": time.strftime("%Y-%m-%d %H:%M", time.localtime(lead["updated_at"])) if lead["updated_at"] else "N/A"
+    }
+
+def export_leads_csv(**filters) -> bytes:
+    """Builds the CSV of the matching leads, reading them a page at a time; nothing is written to disk."""
+    buffer = io.StringIO()
+    writer = None
+    for lead in iter_leads(**filters):
+        row = lead_row(lead)
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow(row)
+    return buffer.getvalue().encode("utf-8")
 
 def show_chat_interface():
     st.title("Insurance Agent AI 🛡️")
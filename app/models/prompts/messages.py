@@ -0,0 +1,81 @@
+import hashlib
+from typing import Dict
+
+# Every fixed string the bot sends: survey questions and acknowledgements,
+# the IRDAI disclaimer and error messages. `{field}` placeholders are filled
+# at runtime. scripts/build_translations.py pre-translates this catalog into
+# translations.json so these strings never go through the translation LLM.
+
+SUPPORTED_LANGUAGES = ("hi", "mr", "ta")
+
+MESSAGES: Dict[str, str] = {
+    # Step prompts (get_step_prompt)
+    "prompt.welcome": "Namaste! I am 'Suraksha Sahayak'. How can I help you today?",
+    "prompt.ask_name": "To begin, may I please know your **full name**?",
+    "prompt.ask_gender": "To better understand your profile, may I know your **Gender**? (e.g., Male, Female, Other)",
+    "prompt.ask_age": "Could you please share your **Age**? (e.g., 35)",
+    "prompt.ask_occupation": "What is your **main source of income**? (e.g., Farming, Small Business, Daily Wage, Service)",
+    "prompt.ask_family": "How many **family members** depend on you?",
+    "prompt.ask_worry": "What is your **biggest financial worry**? (e.g., Bad harvest, Hospital costs, Children's education)",
+    "prompt.default": "How can I assist you?",
+
+    # Survey turns (process_survey)
+    "survey.reset": "🔄 *Survey Reset*\n\nNamaste! Let's start over. \n\nTo begin, may I know your **full name**?",
+    "survey.welcome": (
+        "🙏 *Namaste! I am 'Suraksha Sahayak', your personal Insurance Advisor.*\n\n"
+        "My goal is to find the perfect safety net for you and your family.\n\n"
+        "To get started, may I please know your **full name**?"
+    ),
+    "survey.name_ack": "It is a pleasure to meet you, *{name}*. 🤝\n\nTo better understand your profile, may I know your **Gender**? (e.g., Male, Female, Other)",
+    "survey.gender_ack": "Thank you. \n\nTo recommend the best plan for your life stage, could you please share your **Age**? (e.g., 35)",
+    "survey.age_retry": "🙏 Apologies, I did not catch that.\n\nPlease reply with just the **number** of your age. \n\n*Example:* 45",
+    "survey.age_ack": (
+        "✅ Got it.\n\n"
+        "Your occupation helps us understand your risks. What is your **main source of income**?\n"
+        "_(e.g., Farming, Small Business, Daily Wage, Service)_"
+    ),
+    "survey.occupation_ack": "That is hard work! 💪\n\nNow, who do we need to protect? How many **family members** depend on you?",
+    "survey.family_ack": (
+        "Understood.\n\n"
+        "Finally, what keeps you up at night? What is your **biggest financial worry**?\n"
+        "_(e.g., Bad harvest, Hospital costs, Children's education, Accidents)_"
+    ),
+    "survey.recommendation_report": (
+        "💡 **My Expert Recommendation**:\n\n"
+        "{recommendation}\n\n"
+        "📄 **Download Your Personalized Report:**\n[Click here to download PDF]({pdf_link})\n\n"
+        "-----------------------------\n"
+        "Feel free to ask me questions like *'How do I claim?'* or *'What is the premium?'*"
+    ),
+    "survey.recommendation": (
+        "💡 **My Expert Recommendation**:\n\n"
+        "{recommendation}\n\n"
+        "-----------------------------\n"
+        "Feel free to ask me questions like *'How do I claim?'* or *'What is the premium?'*"
+    ),
+    "survey.recommendation_pending": "🙏 Thank you. Our experts will review your profile and get back to you shortly.",
+    "survey.completed_reset": "🔄 Survey reset. What is your name?",
+    "survey.error": "🙏 Apologies, something went wrong. Type 'reset' to start over.",
+
+    # Appended to every reply
+    "disclaimer.irdai": "_(IRDAI: Insurance is subject to market risk. Read strictly.)_",
+
+    # Errors (agent_service)
+    "error.audio_download": "Sorry, I couldn't download your voice note.",
+    "error.audio_processing": "Sorry, I had trouble processing your voice message.",
+    "error.no_input": "I didn't receive any text or audio.",
+    "error.rag": "I encountered an error looking that up.",
+}
+
+def source_hash(text: str) -> str:
+    """
+    Identifies the English source a translation was made from; an edited
+    English string invalidates its translations.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+def render(key: str, **fields) -> str:
+    """
+    Returns the English message with its placeholders filled.
+    """
+    return MESSAGES[key].format(**fields)
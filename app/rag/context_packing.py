@@ -0,0 +1,243 @@
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.utils.text import normalise_text
+from app.utils.tokens import estimate_tokens
+
+# Context assembly between retrieval and the stuff-documents chain.
+# Chunks are split with a 200-character overlap and k=3 of them are retrieved,
+# so the prompt used to repeat sentences and had no size limit. Here we:
+#   1. merge chunks of the same page that overlap or touch into one passage,
+#   2. drop sentences that (nearly) repeat one already kept,
+#   3. pack passages best-score-first into a token budget, cutting the last
+#      one at a sentence boundary.
+
+CONTEXT_PACKING_ENABLED = os.getenv("CONTEXT_PACKING", "true").lower() != "false"
+# Prompt budget for the retrieved context (also the rate limiter's estimate)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKENS", "1500"))
+NEAR_DUPLICATE_JACCARD = float(os.getenv("CONTEXT_NEAR_DUPLICATE", "0.8"))
+# Text overlap shorter than this between two chunks is treated as coincidence
+MIN_OVERLAP_CHARS = 20
+# Sentences shorter than this (list markers like "3.", "Yes.") are always kept
+MIN_DEDUP_WORDS = 4
+# Don't bother packing a truncated passage smaller than this
+MIN_FRAGMENT_TOKENS = 40
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?।])\s+|\n+")
+_WORD_RE = re.compile(r"\w+")
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+
+class PackedContext(list):
+    """
+    The packed documents, with the packing report for this request attached
+    (LangChain passes the list through to the chain output's "context").
+    """
+    report: Optional[Dict[str, Any]] = None
+
+def _score(doc: Document, rank: int) -> float:
+    # Hybrid results carry an RRF score; plain dense results are already best-first
+    score = doc.metadata.get("retrieval_score")
+    return float(score) if score is not None else -rank
+
+def _text_overlap(a: str, b: str) -> int:
+    """
+    Length of the longest suffix of `a` that is a prefix of `b` (0 if under MIN_OVERLAP_CHARS).
+    """
+    for k in range(min(len(a), len(b)), MIN_OVERLAP_CHARS - 1, -1):
+        if a.endswith(b[:k]):
+            return k
+    return 0
+
+def _starts_before(a: Document, b: Document) -> bool:
+    start_a, start_b = a.metadata.get("start_index"), b.metadata.get("start_index")
+    if start_a is not None and start_b is not None:
+        return start_a <= start_b
+    return True
+
+def _join(a: Document, b: Document) -> Optional[str]:
+    """
+    Text of `a` followed by `b` if they overlap or touch on the page, else None.
+    """
+    if b.page_content in a.page_content:
+        return a.page_content
+    start_a, start_b = a.metadata.get("start_index"), b.metadata.get("start_index")
+    if start_a is not None and start_b is not None:
+        end_a = start_a + len(a.page_content)
+        if not start_a <= start_b <= end_a + 2:
+            return None
+        skip = max(end_a - start_b, 0)
+        if not skip:
+            return a.page_content + " " + b.page_content
+        # Offsets can be stale (a chunk kept from an older version of the file):
+        # only cut text that really repeats, else fall back to the text itself
+        if a.page_content.endswith(b.page_content[:skip]):
+            return a.page_content + b.page_content[skip:]
+    overlap = _text_overlap(a.page_content, b.page_content)
+    return a.page_content + b.page_content[overlap:] if overlap else None
+
+def merge_chunks(docs: List[Document]) -> List[Tuple[Document, float]]:
+    """
+    Merges chunks of the same source page that overlap or are adjacent.
+    Returns (passage, best score among its chunks) pairs.
+    """
+    passages: List[Tuple[Document, float]] = []
+    for rank, doc in enumerate(docs):
+        doc = Document(page_content=doc.page_content, metadata=dict(doc.metadata))
+        score = _score(doc, rank)
+        merged = True
+        while merged:
+            merged = False
+            for i, (other, other_score) in enumerate(passages):
+                if (other.metadata.get("source"), other.metadata.get("page")) != (doc.metadata.get("source"), doc.metadata.get("page")):
+                    continue
+                first, second = (other, doc) if _starts_before(other, doc) else (doc, other)
+                text = _join(first, second) or _join(second, first)
+                if text is None:
+                    continue
+                metadata = dict(first.metadata)
+                metadata["merged_chunks"] = other.metadata.get("merged_chunks", 1) + doc.metadata.get("merged_chunks", 1)
+                doc = Document(page_content=text, metadata=metadata)
+                score = max(score, other_score)
+                del passages[i]
+                merged = True
+                break
+        passages.append((doc, score))
+    return passages
+
+def _sentences(text: str) -> List[Tuple[str, str]]:
+    """
+    Splits text into (sentence, separator that followed it) pairs, so kept
+    sentences can be re-joined with their original line breaks.
+    """
+    pieces = []
+    position = 0
+    for match in _SENTENCE_RE.finditer(text):
+        pieces.append((text[position:match.start()], match.group()))
+        position = match.end()
+    pieces.append((text[position:], ""))
+    return [(sentence, sep) for sentence, sep in pieces if sentence.strip()]
+
+class _SentenceFilter:
+    """
+    Remembers kept sentences and rejects exact or near (word-set Jaccard) repeats.
+    Sentences quoting different numbers are never near repeats: "premium 1.5%"
+    and "premium 2%" rows of a policy table must both stay.
+    """
+    def __init__(self, threshold: float = NEAR_DUPLICATE_JACCARD):
+        self.threshold = threshold
+        self.exact = set()
+        self.word_sets: List[Tuple[frozenset, Tuple[str, ...]]] = []
+
+    def is_new(self, sentence: str) -> bool:
+        normalised = normalise_text(sentence)
+        words = frozenset(_WORD_RE.findall(normalised))
+        if len(words) < MIN_DEDUP_WORDS:
+            return True
+        if normalised in self.exact:
+            return False
+        numbers = tuple(_NUMBER_RE.findall(normalised))
+        for kept, kept_numbers in self.word_sets:
+            if numbers == kept_numbers and len(words & kept) / len(words | kept) >= self.threshold:
+                return False
+        self.exact.add(normalised)
+        self.word_sets.append((words, numbers))
+        return True
+
+def pack_documents(docs: List[Document], budget: int = None) -> PackedContext:
+    """
+    Merges, de-duplicates and packs retrieved chunks into `budget` tokens
+    (default CONTEXT_TOKEN_BUDGET), highest retrieval_score first.
+    """
+    budget = CONTEXT_TOKEN_BUDGET if budget is None else budget
+    tokens_in = estimate_tokens(*(doc.page_content for doc in docs))
+    if not CONTEXT_PACKING_ENABLED:
+        packed = PackedContext(docs)
+        packed.report = {"chunks_in": len(docs), "chunks_out": len(docs), "tokens_in": tokens_in,
+                         "tokens_out": tokens_in, "tokens_saved": 0, "sentences_dropped": 0, "truncated": False}
+        return packed
+
+    passages = sorted(merge_chunks(docs), key=lambda item: item[1], reverse=True)
+    seen = _SentenceFilter()
+    packed = PackedContext()
+    used = 0
+    dropped = 0
+    truncated = False
+    for doc, score in passages:
+        kept = []
+        for sentence, sep in _sentences(doc.page_content):
+            if seen.is_new(sentence):
+                kept.append((sentence, sep, estimate_tokens(sentence)))
+            else:
+                dropped += 1
+        if not kept:
+            continue
+
+        # Fit what we can of this passage, cutting at a sentence boundary
+        fitted = []
+        passage_tokens = 0
+        for sentence, sep, tokens in kept:
+            if used + passage_tokens + tokens > budget:
+                truncated = True
+                break
+            fitted.append(sentence + sep)
+            passage_tokens += tokens
+        if not fitted or (len(fitted) < len(kept) and passage_tokens < MIN_FRAGMENT_TOKENS):
+            continue
+
+        metadata = dict(doc.metadata)
+        metadata["retrieval_score"] = doc.metadata.get("retrieval_score", score)
+        packed.append(Document(page_content="".join(fitted).strip(), metadata=metadata))
+        used += passage_tokens
+
+    tokens_out = estimate_tokens(*(doc.page_content for doc in packed))
+    packed.report = {
+        "chunks_in": len(docs),
+        "chunks_out": len(packed),
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "tokens_saved": max(tokens_in - tokens_out, 0),
+        "sentences_dropped": dropped,
+        "truncated": truncated,
+    }
+    _stats.record(packed.report)
+    return packed
+
+class PackingStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.sentences_dropped = 0
+        self.truncated = 0
+
+    def record(self, report: Dict[str, Any]):
+        with self._lock:
+            self.requests += 1
+            self.tokens_in += report["tokens_in"]
+            self.tokens_out += report["tokens_out"]
+            self.sentences_dropped += report["sentences_dropped"]
+            self.truncated += int(report["truncated"])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": CONTEXT_PACKING_ENABLED,
+                "budget_tokens": CONTEXT_TOKEN_BUDGET,
+                "requests": self.requests,
+                "tokens_in": self.tokens_in,
+                "tokens_out": self.tokens_out,
+                "tokens_saved": self.tokens_in - self.tokens_out,
+                "saved_ratio": round(1 - self.tokens_out / self.tokens_in, 3) if self.tokens_in else 0.0,
+                "sentences_dropped": self.sentences_dropped,
+                "truncated": self.truncated,
+            }
+
+_stats = PackingStats()
+
+def get_packing_stats() -> Dict[str, Any]:
+    return _stats.stats()
@@ -0,0 +1,208 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Persistent embedding cache. Vectors are stored as raw float32 blobs in SQLite,
+# keyed by sha256(model, kind, text), so re-ingesting identical chunks and
+# re-asking common questions never runs the model twice.
+
+EMBEDDING_CACHE_PATH = os.path.join(os.path.dirname(__file__), "../../embedding_cache.db")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+EMBEDDING_CACHE_MEMORY_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", "2048"))
+# Hits only note last_used in memory; it is written with the next store, before
+# an eviction, or once this many seconds have passed since the last write
+EMBEDDING_CACHE_TOUCH_INTERVAL = float(os.getenv("EMBEDDING_CACHE_TOUCH_INTERVAL", "60"))
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an Embeddings object with an in-memory LRU (for queries) in front of a
+    size-bounded SQLite store. Changing `model_name` invalidates the store.
+    """
+    def __init__(self, inner: Embeddings, model_name: str, db_path: str = EMBEDDING_CACHE_PATH,
+                 max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES, memory_entries: int = EMBEDDING_CACHE_MEMORY_ENTRIES,
+                 touch_interval: float = EMBEDDING_CACHE_TOUCH_INTERVAL):
+        self.inner = inner
+        self.model_name = model_name
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[bytes, List[float]]" = OrderedDict()
+        # key -> last hit time, not yet written: keeps hits read-only on the query path
+        self.touch_interval = touch_interval
+        self._touched: Dict[bytes, float] = {}
+        self._touched_at = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._init_db()
+
+    def _init_db(self):
+        with self._lock:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key BLOB PRIMARY KEY,
+                    vector BLOB,
+                    last_used REAL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'model'").fetchone()
+            if row is None or row[0] != self.model_name:
+                if row is not None:
+                    print(f"♻️ Embedding cache invalidated (model {row[0]} -> {self.model_name})")
+                self._conn.execute("DELETE FROM embeddings")
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('model', ?)", (self.model_name,))
+            self._conn.commit()
+            self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _key(self, kind: str, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model_name}\x00{kind}\x00{text}".encode("utf-8")).digest()
+
+    def _remember(self, key: bytes, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, keys: List[bytes]) -> Dict[bytes, List[float]]:
+        found: Dict[bytes, List[float]] = {}
+        missing = []
+        for key in keys:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                found[key] = self._memory[key]
+            else:
+                missing.append(key)
+
+        # SQLite caps bound parameters; stay well under the limit
+        for start in range(0, len(missing), 500):
+            part = missing[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            rows = self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part
+            ).fetchall()
+            for key, blob in rows:
+                vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                found[key] = vector
+                self._remember(key, vector)
+
+        now = time.time()
+        for key in found:
+            self._touched[key] = now
+        return found
+
+    def _write_touched(self) -> bool:
+        """
+        Writes the batched last_used times. Returns whether anything was written.
+        """
+        self._touched_at = time.monotonic()
+        if not self._touched:
+            return False
+        self._conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                               [(used, key) for key, used in self._touched.items()])
+        self._touched.clear()
+        return True
+
+    def _existing(self, keys: List[bytes]) -> int:
+        # Rows already stored under these keys (e.g. by a concurrent miss for the same text)
+        count = 0
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            count += self._conn.execute(
+                f"SELECT COUNT(*) FROM embeddings WHERE key IN ({placeholders})", part
+            ).fetchone()[0]
+        return count
+
+    def _store(self, items: Dict[bytes, List[float]]):
+        now = time.time()
+        # Same transaction as the insert; also keeps eviction's LRU order current
+        self._write_touched()
+        existing = self._existing(list(items))
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+            [(key, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items.items()]
+        )
+        for key, vector in items.items():
+            self._remember(key, vector)
+        # INSERT OR REPLACE of an existing key replaces a row, it does not add one
+        self._count += len(items) - existing
+        if self._count > self.max_entries:
+            self._evict()
+
+    def _evict(self):
+        """
+        Drops the least recently used rows down to 90% of the cap.
+        """
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = self._count - int(self.max_entries * 0.9)
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self._count -= excess
+            self.evictions += excess
+
+    def _embed(self, kind: str, texts: List[str], compute) -> List[List[float]]:
+        keys = [self._key(kind, text) for text in texts]
+        with self._lock:
+            found = self._lookup(keys)
+            if time.monotonic() - self._touched_at >= self.touch_interval and self._write_touched():
+                self._conn.commit()
+
+        # Compute each distinct missing text once, outside the lock
+        pending: "OrderedDict[bytes, str]" = OrderedDict()
+        for key, text in zip(keys, texts):
+            if key not in found and key not in pending:
+                pending[key] = text
+        if pending:
+            vectors = compute(list(pending.values()))
+            computed = dict(zip(pending.keys(), vectors))
+            with self._lock:
+                self._store(computed)
+                self._conn.commit()
+            found.update(computed)
+
+        with self._lock:
+            self.hits += len(keys) - len(pending)
+            self.misses += len(pending)
+        return [list(found[key]) for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed("doc", list(texts), self.inner.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed("query", [text], lambda texts: [self.inner.embed_query(texts[0])])[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._memory.clear()
+            self._touched.clear()
+            self._count = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+def get_cache_stats(embeddings: Optional[Embeddings]) -> Optional[Dict[str, Any]]:
+    return embeddings.stats() if isinstance(embeddings, CachedEmbeddings) else None
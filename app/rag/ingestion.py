@@ -1,20 +1,38 @@
 import os
+import json
+import hashlib
+import time
 import tempfile
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Dict, Any, List, Iterable, Iterator, Tuple
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
 try:
     from langchain_text_splitters import RecursiveCharacterTextSplitter
 except ImportError:
     from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from app.rag import registry
+from app.rag.numpy_store import NumpyVectorStore
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "../../chroma_db")
+DB_PATH = registry.DB_PATH
+MANIFEST_PATH = os.path.join(DB_PATH, "ingest_manifest.json")
+SUPPORTED_EXTENSIONS = (".txt", ".pdf")
+
+# Streaming pipeline knobs: chunks per embedding call, and embedding workers.
+# At most 2 * EMBED_WORKERS batches are in flight, which bounds memory.
+# One worker by default: torch already spreads a batch over every core, so more
+# workers only help once each gets its own share of torch threads (see
+# _torch_threads) and scripts/bench_embed_workers.py shows a gain on the host.
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "1"))
 
 def get_embeddings():
     """
-    Returns the HuggingFace embeddings model.
+    Returns the shared HuggingFace embeddings model.
     """
-    return HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    return registry.get_embeddings()
 
 def load_document(uploaded_file):
     """
@@ -32,10 +50,27 @@ def load_document(uploaded_file):
             loader = TextLoader(tmp_path)
         
         docs = loader.load()
+        # Keep the real filename as source so re-uploads map to the same chunk ids
+        for doc in docs:
+            doc.metadata["source"] = uploaded_file.name
         return docs
     finally:
         os.remove(tmp_path)
 
+def load_file(filepath: str):
+    """
+    Loads a PDF or text file from disk, tagging every page with its filename as source.
+    """
+    if filepath.endswith(".pdf"):
+        loader = PyPDFLoader(filepath)
+    else:
+        loader = TextLoader(filepath, encoding='utf-8')
+
+    docs = loader.load()
+    for doc in docs:
+        doc.metadata["source"] = os.path.basename(filepath)
+    return docs
+
 def split_documents(docs):
     """
     Splits documents into smaller chunks.
@@ -43,19 +78,306 @@ def split_documents(docs):
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=200,
-        length_function=len
+        length_function=len,
+        # Offsets let context packing merge neighbouring chunks of a page
+        add_start_index=True
     )
     return text_splitter.split_documents(docs)
 
-def index_documents(chunks):
+def chunk_ids(chunks) -> List[str]:
+    """
+    Returns deterministic ids for chunks: source name + hash of the chunk text.
+    Identical text repeated within one source gets an occurrence suffix.
+    """
+    ids = []
+    seen: Dict[str, int] = {}
+    for chunk in chunks:
+        source = os.path.basename(chunk.metadata.get("source", "unknown"))
+        digest = hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()[:24]
+        base_id = f"{source}:{digest}"
+        occurrence = seen.get(base_id, 0)
+        seen[base_id] = occurrence + 1
+        ids.append(base_id if occurrence == 0 else f"{base_id}-{occurrence}")
+    return ids
+
+def _batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+def _upsert_batch(vectorstore, batch, vectors):
+    """
+    Writes pre-computed embeddings for a batch of (id, chunk) pairs,
+    and mirrors the chunks into the BM25 index.
+    """
+    ids = [cid for cid, _ in batch]
+    texts = [chunk.page_content for _, chunk in batch]
+    metadatas = [chunk.metadata for _, chunk in batch]
+    if isinstance(vectorstore, NumpyVectorStore):
+        vectorstore.upsert(ids, vectors, texts, metadatas)
+    else:
+        vectorstore._collection.upsert(ids=ids, embeddings=vectors, documents=texts, metadatas=metadatas)
+    lexical_index = registry.get_lexical_index()
+    for cid, chunk in batch:
+        lexical_index.add(cid, chunk.page_content, chunk.metadata)
+
+@contextmanager
+def _torch_threads(workers: int):
+    """
+    With several embedding workers, splits torch's intra-op threads between them
+    (cpu_count // workers each) so N workers don't run N x cpu_count threads.
+    Restores the previous setting afterwards; a no-op without torch.
+    """
+    if workers <= 1:
+        yield
+        return
+    try:
+        import torch
+    except ImportError:
+        yield
+        return
+    previous = torch.get_num_threads()
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+    try:
+        yield
+    finally:
+        torch.set_num_threads(previous)
+
+def index_stream(chunk_stream: Iterable[Tuple[str, Any]], batch_size: int = None, workers: int = None) -> Dict[str, Any]:
+    """
+    Streaming indexer: consumes (id, chunk) pairs, embeds them in batches on a
+    worker pool and upserts each batch in order as soon as it is ready.
+    Only a bounded number of batches is held in memory, whatever the stream size.
+    Returns throughput figures for the run.
+    """
+    batch_size = batch_size or EMBED_BATCH_SIZE
+    workers = max(1, workers or EMBED_WORKERS)
+    embeddings = registry.get_embeddings()
+    vectorstore = registry.get_vectorstore()
+
+    stats = {"chunks": 0, "batches": 0, "bytes": 0}
+    start = time.perf_counter()
+
+    def drain_one(pending):
+        batch, future = pending.popleft()
+        _upsert_batch(vectorstore, batch, future.result())
+        stats["chunks"] += len(batch)
+        stats["batches"] += 1
+
+    # Model inference releases the GIL, so workers overlap; each gets its share of torch threads
+    with _torch_threads(workers), ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed") as pool:
+        pending = deque()
+        for batch in _batched(chunk_stream, batch_size):
+            texts = [chunk.page_content for _, chunk in batch]
+            stats["bytes"] += sum(len(t.encode("utf-8")) for t in texts)
+            pending.append((batch, pool.submit(embeddings.embed_documents, texts)))
+            if len(pending) >= workers * 2:
+                drain_one(pending)
+        while pending:
+            drain_one(pending)
+
+    elapsed = time.perf_counter() - start
+    stats["seconds"] = round(elapsed, 3)
+    stats["chunks_per_sec"] = round(stats["chunks"] / elapsed, 1) if elapsed else 0.0
+    stats["mb_per_sec"] = round(stats["bytes"] / (1024 * 1024) / elapsed, 3) if elapsed else 0.0
+    stats["workers"] = workers
+    if stats["chunks"]:
+        registry.save_vectorstore()
+        registry.save_lexical_index()
+        registry.bump_index_version()
+        print(f"⚡ Embedded {stats['chunks']} chunks in {stats['seconds']}s "
+              f"({stats['chunks_per_sec']} chunks/s, {stats['mb_per_sec']} MB/s, "
+              f"batch={batch_size}, workers={workers})")
+    return stats
+
+def index_documents(chunks, ids: List[str] = None):
     """
     Indexes document chunks into ChromaDB using HuggingFace embeddings.
+    Chunks are upserted under deterministic ids, so indexing the same content twice is a no-op.
+    Writes through the shared vector store so running retrievers see the new chunks.
     """
-    embeddings = get_embeddings()
-    vectorstore = Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        persist_directory=DB_PATH
-    )
-    vectorstore.persist()
-    return len(chunks)
+    if not chunks:
+        return 0
+    stats = index_stream(zip(ids or chunk_ids(chunks), chunks))
+    return stats["chunks"]
+
+def delete_chunks(ids: List[str], persist: bool = True):
+    """
+    Removes chunks from the vector store and the BM25 index by id.
+    Pass persist=False when the caller saves the vector store and BM25 index itself after a batch of deletes.
+    """
+    if not ids:
+        return 0
+    registry.get_vectorstore().delete(ids=ids)
+    lexical_index = registry.get_lexical_index()
+    for cid in ids:
+        lexical_index.remove(cid)
+    if persist:
+        registry.save_vectorstore()
+        registry.save_lexical_index()
+    registry.bump_index_version()
+    return len(ids)
+
+def _position(chunk) -> List[Any]:
+    # Where a chunk sits in its file; kept in the manifest to spot chunks that moved
+    return [chunk.metadata.get("page"), chunk.metadata.get("start_index")]
+
+def update_chunk_metadata(batch: List[Tuple[str, Any]]):
+    """
+    Rewrites the stored metadata of already-embedded (id, chunk) pairs in the
+    vector store and the BM25 index. Used for chunks whose text is unchanged but
+    whose page / start_index moved because the file was edited around them.
+    Like delete_chunks(persist=False), the caller saves both stores afterwards.
+    """
+    if not batch:
+        return 0
+    ids = [cid for cid, _ in batch]
+    metadatas = [chunk.metadata for _, chunk in batch]
+    vectorstore = registry.get_vectorstore()
+    if isinstance(vectorstore, NumpyVectorStore):
+        vectorstore.update_metadata(ids, metadatas)
+    else:
+        vectorstore._collection.update(ids=ids, metadatas=metadatas)
+    lexical_index = registry.get_lexical_index()
+    for cid, metadata in zip(ids, metadatas):
+        lexical_index.update_metadata(cid, metadata)
+    registry.bump_index_version()
+    return len(ids)
+
+def _delete_source(vectorstore, source: str):
+    if isinstance(vectorstore, NumpyVectorStore):
+        vectorstore.delete(where={"source": source})
+    else:
+        vectorstore._collection.delete(where={"source": source})
+
+def _file_sha256(filepath: str) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest(path: str = MANIFEST_PATH) -> Dict[str, Any]:
+    """
+    Returns the ingestion manifest: per-file content hash, the ids of its chunks
+    and their positions ([page, start_index], in the same order).
+    """
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"embedding_model": registry.EMBEDDING_MODEL, "vector_backend": registry.VECTOR_BACKEND, "files": {}}
+    manifest.setdefault("files", {})
+    return manifest
+
+def save_manifest(manifest: Dict[str, Any], path: str = MANIFEST_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def sync_directory(data_dir: str, manifest_path: str = MANIFEST_PATH) -> Dict[str, Any]:
+    """
+    Brings the vector store in line with the files in `data_dir`.
+    Files are loaded, split and diffed one at a time and their new chunks flow
+    straight into the streaming indexer, so memory stays flat as the library grows.
+    Unchanged files (same size/mtime or same hash) are skipped without being parsed;
+    for changed files only new chunks are embedded, stale chunk ids are deleted and
+    kept chunks that moved get their page / start_index metadata rewritten;
+    chunks of files that disappeared are deleted.
+    Returns a report of what changed.
+    """
+    manifest = load_manifest(manifest_path)
+    previous = manifest["files"]
+    if (manifest.get("embedding_model") != registry.EMBEDDING_MODEL
+            or manifest.get("vector_backend", "chroma") != registry.VECTOR_BACKEND):
+        # Vectors from another model are not comparable, and another backend
+        # holds none of our chunks: re-embed everything
+        print(f"♻️ Embedding model / vector backend changed ({manifest.get('embedding_model')}, "
+              f"{manifest.get('vector_backend', 'chroma')} -> {registry.EMBEDDING_MODEL}, {registry.VECTOR_BACKEND}), rebuilding.")
+        stale_ids = [cid for entry in previous.values() for cid in entry.get("chunks", [])]
+        delete_chunks(stale_ids, persist=False)
+        previous = {}
+
+    report = {
+        "new_files": [], "changed_files": [], "unchanged_files": [], "deleted_files": [],
+        "failed_files": [], "chunks_added": 0, "chunks_removed": 0, "chunks_kept": 0, "chunks_moved": 0,
+    }
+    current: Dict[str, Any] = {}
+
+    report["pipeline"] = index_stream(_diff_files(data_dir, previous, current, report))
+
+    for filename in sorted(set(previous) - set(current)):
+        report["deleted_files"].append(filename)
+        report["chunks_removed"] += delete_chunks(previous[filename].get("chunks", []), persist=False)
+
+    registry.save_vectorstore()
+    registry.save_lexical_index()
+    if report["chunks_added"] or report["chunks_removed"] or report["chunks_moved"] or report["new_files"]:
+        registry.bump_index_version()
+    save_manifest({"embedding_model": registry.EMBEDDING_MODEL, "vector_backend": registry.VECTOR_BACKEND, "files": current}, manifest_path)
+    return report
+
+def _diff_files(data_dir: str, previous: Dict[str, Any], current: Dict[str, Any], report: Dict[str, Any]):
+    """
+    Walks the files one at a time, yielding (id, chunk) only for chunks that need embedding.
+    Stale ids are deleted and `current` / `report` are filled in as each file is diffed.
+    """
+    filenames = sorted(f for f in os.listdir(data_dir) if f.endswith(SUPPORTED_EXTENSIONS))
+    for filename in filenames:
+        filepath = os.path.join(data_dir, filename)
+        stat = os.stat(filepath)
+        old = previous.get(filename)
+
+        if old and old.get("size") == stat.st_size and old.get("mtime") == stat.st_mtime:
+            current[filename] = old
+            report["unchanged_files"].append(filename)
+            report["chunks_kept"] += len(old["chunks"])
+            continue
+
+        file_hash = _file_sha256(filepath)
+        if old and old.get("sha256") == file_hash:
+            current[filename] = dict(old, size=stat.st_size, mtime=stat.st_mtime)
+            report["unchanged_files"].append(filename)
+            report["chunks_kept"] += len(old["chunks"])
+            continue
+
+        try:
+            chunks = split_documents(load_file(filepath))
+        except Exception as e:
+            print(f"❌ Error reading {filename}: {e}")
+            report["failed_files"].append(filename)
+            if old:
+                current[filename] = old
+            continue
+
+        ids = chunk_ids(chunks)
+        old_ids = set(old["chunks"]) if old else set()
+        if not old:
+            # Chunks indexed before the manifest existed carry random ids; clear them by source
+            _delete_source(registry.get_vectorstore(), filename)
+            registry.get_lexical_index().remove_source(filename)
+            report["new_files"].append(filename)
+        else:
+            report["changed_files"].append(filename)
+
+        new_chunks = [(cid, chunk) for cid, chunk in zip(ids, chunks) if cid not in old_ids]
+        removed_ids = sorted(old_ids - set(ids))
+        delete_chunks(removed_ids, persist=False)
+
+        # Same text, new place: the stored page / start_index would cite the wrong spot
+        # (manifests from before positions were recorded refresh every kept chunk)
+        old_positions = dict(zip(old["chunks"], old.get("positions", []))) if old else {}
+        moved = [(cid, chunk) for cid, chunk in zip(ids, chunks)
+                 if cid in old_ids and old_positions.get(cid) != _position(chunk)]
+        update_chunk_metadata(moved)
+
+        report["chunks_added"] += len(new_chunks)
+        report["chunks_removed"] += len(removed_ids)
+        report["chunks_kept"] += len(ids) - len(new_chunks)
+        report["chunks_moved"] += len(moved)
+        current[filename] = {"sha256": file_hash, "size": stat.st_size, "mtime": stat.st_mtime, "chunks": ids,
+                             "positions": [_position(chunk) for chunk in chunks]}
+
+        yield from new_chunks
@@ -0,0 +1,150 @@
+import os
+import re
+import json
+import math
+from collections import Counter
+from typing import Dict, Any, List, Tuple, Optional
+
+# In-memory BM25 inverted index kept next to the Chroma collection.
+# Dense MiniLM retrieval is weak on scheme names and acronyms ("PMFBY",
+# "Jeevan Anand"); exact lexical matching covers exactly those queries.
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# Policy/table codes ("T914", "Plan 915") carry a digit; acronyms ("PMFBY", "LIC") are upper case
+CODE_RE = re.compile(r"\d")
+ACRONYM_RE = re.compile(r"^[A-Z]{2,}$")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+    "how", "i", "in", "is", "it", "me", "my", "of", "on", "or", "the", "to", "what",
+    "when", "where", "which", "who", "why", "will", "with", "you", "your", "about", "tell",
+}
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercases and splits text into word tokens, dropping common English stopwords.
+    """
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+class BM25Index:
+    """
+    Okapi BM25 over chunk ids. Supports incremental add/remove and JSON persistence
+    of the postings themselves, so loading does not re-tokenize the corpus.
+    """
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        """
+        Adds (or replaces) a chunk.
+        """
+        if doc_id in self.docs:
+            self.remove(doc_id)
+        counts = Counter(tokenize(text))
+        length = sum(counts.values())
+        self.docs[doc_id] = {"text": text, "metadata": metadata or {}, "length": length}
+        self.total_length += length
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_id: str):
+        doc = self.docs.pop(doc_id, None)
+        if not doc:
+            return
+        self.total_length -= doc["length"]
+        for term in set(tokenize(doc["text"])):
+            posting = self.postings.get(term)
+            if posting:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+
+    def update_metadata(self, doc_id: str, metadata: Dict[str, Any]):
+        """
+        Replaces a chunk's metadata; its text (and so its postings) is unchanged.
+        """
+        if doc_id in self.docs:
+            self.docs[doc_id]["metadata"] = metadata or {}
+
+    def remove_source(self, source: str):
+        """
+        Removes every chunk whose metadata source matches `source`.
+        """
+        for doc_id in [d for d, doc in self.docs.items() if doc["metadata"].get("source") == source]:
+            self.remove(doc_id)
+
+    def idf(self, term: str) -> float:
+        n = len(self.docs)
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Returns up to k (doc_id, score) pairs, best first.
+        """
+        if not self.docs:
+            return []
+        avg_length = self.total_length / len(self.docs) or 1.0
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = self.idf(term)
+            for doc_id, tf in posting.items():
+                norm = tf + self.k1 * (1 - self.b + self.b * self.docs[doc_id]["length"] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def is_rare(self, term: str, max_df: float = 0.1) -> bool:
+        """
+        True for a term found in at most `max_df` of the chunks (or in a single chunk,
+        for small corpora): scheme names, not "premium" or "claim".
+        """
+        df = len(self.postings.get(term, ()))
+        return 0 < df <= max(1, max_df * len(self.docs))
+
+    def is_exact_term_query(self, query: str, max_terms: int = 3, max_df: float = 0.1) -> bool:
+        """
+        True for short lookups of scheme names, acronyms and policy codes
+        ("PMFBY", "Jeevan Anand", "plan 915"): every term is in the vocabulary and
+        is either a code/acronym or rare in the corpus. These are answered lexically
+        without a dense search; ordinary questions ("what is premium") are not.
+        """
+        # Upper case only marks an acronym when the user isn't typing everything in capitals
+        words = TOKEN_RE.findall(query)
+        shouting = len(words) > 1 and query.isupper()
+        words = [w for w in words if w.lower() not in STOPWORDS]
+        if not 0 < len(words) <= max_terms:
+            return False
+        for word in words:
+            term = word.lower()
+            if term not in self.postings:
+                return False
+            is_code = bool(CODE_RE.search(word)) or (not shouting and bool(ACRONYM_RE.match(word)))
+            if not is_code and not self.is_rare(term, max_df):
+                return False
+        return True
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "docs": self.docs, "postings": self.postings}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+        index = cls(k1=payload.get("k1", 1.5), b=payload.get("b", 0.75))
+        index.docs = payload["docs"]
+        index.postings = payload["postings"]
+        index.total_length = sum(doc["length"] for doc in index.docs.values())
+        return index
@@ -0,0 +1,268 @@
+import os
+import json
+import uuid
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+# Exact-search vector store for small knowledge bases (a few thousand chunks).
+# Normalised float32 embeddings live in a memory-mapped .npy file with a JSON
+# sidecar for ids / texts / metadata; a query is one matrix-vector product.
+# Writes stay in memory (appended rows are stacked lazily) until persist(), so
+# an ingestion run writes the files once instead of once per batch. Another
+# process's persist() is picked up by reload_if_changed().
+
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.json"
+
+def _normalise_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+class NumpyVectorStore(VectorStore):
+    """
+    Drop-in alternative to the Chroma store with the same retriever interface.
+    Scores are cosine similarities (higher is better).
+    """
+    def __init__(self, persist_directory: str, embedding_function: Embeddings):
+        self.persist_directory = persist_directory
+        self._embedding_function = embedding_function
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._matrix: Optional[np.ndarray] = None
+        # Rows appended since the matrix was last stacked
+        self._pending: List[np.ndarray] = []
+        self._dirty = False
+        self._mtime = None
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding_function
+
+    def __len__(self):
+        return len(self._ids)
+
+    # --- Persistence ---
+
+    def _paths(self) -> Tuple[str, str]:
+        return (os.path.join(self.persist_directory, EMBEDDINGS_FILE),
+                os.path.join(self.persist_directory, METADATA_FILE))
+
+    def _file_mtime(self):
+        try:
+            return tuple((st.st_mtime_ns, st.st_size) for st in map(os.stat, self._paths()))
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        matrix_path, metadata_path = self._paths()
+        mtime = self._file_mtime()
+        if mtime is None:
+            return
+        with open(metadata_path, encoding="utf-8") as f:
+            sidecar = json.load(f)
+        self._ids = sidecar["ids"]
+        self._texts = sidecar["texts"]
+        self._metadatas = sidecar["metadatas"]
+        # Memory-mapped: pages are shared with the OS cache instead of copied into the heap
+        self._matrix = np.load(matrix_path, mmap_mode="r")
+        self._pending = []
+        self._mtime = mtime
+
+    def _write(self, matrix: np.ndarray):
+        os.makedirs(self.persist_directory, exist_ok=True)
+        matrix_path, metadata_path = self._paths()
+        with open(f"{matrix_path}.tmp", "wb") as f:
+            np.save(f, matrix.astype(np.float32, copy=False))
+        with open(f"{metadata_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"ids": self._ids, "texts": self._texts, "metadatas": self._metadatas}, f)
+        os.replace(f"{matrix_path}.tmp", matrix_path)
+        os.replace(f"{metadata_path}.tmp", metadata_path)
+        self._matrix = np.load(matrix_path, mmap_mode="r")
+        self._mtime = self._file_mtime()
+
+    def _rows(self) -> Optional[np.ndarray]:
+        """
+        The full matrix, stacking rows appended since the last call (one copy per write burst).
+        """
+        if self._pending:
+            parts = ([self._matrix] if self._matrix is not None else []) + self._pending
+            self._matrix = np.vstack(parts)
+            self._pending = []
+        return self._matrix
+
+    def persist(self) -> bool:
+        """
+        Writes pending changes to disk. Returns whether anything was written.
+        """
+        with self._lock:
+            if not self._dirty:
+                return False
+            matrix = self._rows()
+            if matrix is None:
+                matrix = np.empty((0, 0), dtype=np.float32)
+            self._write(matrix)
+            self._dirty = False
+            return True
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reloads from disk if another process has persisted since we last read or
+        wrote the files. Unpersisted local changes are never dropped.
+        """
+        mtime = self._file_mtime()
+        if mtime == self._mtime:
+            return False
+        with self._lock:
+            if self._dirty or self._file_mtime() == self._mtime:
+                return False
+            self._load()
+            return True
+
+    # --- Writes ---
+
+    def upsert(self, ids: List[str], embeddings: List[List[float]], texts: List[str],
+               metadatas: Optional[List[Dict[str, Any]]] = None):
+        """
+        Inserts or replaces rows with pre-computed embeddings (in memory; see persist).
+        """
+        metadatas = metadatas or [{} for _ in ids]
+        new_rows = _normalise_rows(embeddings)
+        with self._lock:
+            position = {doc_id: i for i, doc_id in enumerate(self._ids)}
+            if any(doc_id in position for doc_id in ids):
+                # Replacing rows needs a writable matrix (the loaded one is memory-mapped)
+                self._matrix = np.array(self._rows())
+            stored, appended = len(self._ids), []
+            for row, doc_id, text, metadata in zip(new_rows, ids, texts, metadatas):
+                if doc_id in position:
+                    i = position[doc_id]
+                    if i < stored:
+                        self._matrix[i] = row
+                    else:
+                        # Repeated id within this batch
+                        appended[i - stored] = row
+                    self._texts[i] = text
+                    self._metadatas[i] = metadata
+                else:
+                    position[doc_id] = len(self._ids)
+                    self._ids.append(doc_id)
+                    self._texts.append(text)
+                    self._metadatas.append(metadata)
+                    appended.append(row)
+            if appended:
+                self._pending.append(np.stack(appended))
+            self._dirty = True
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """
+        Replaces the metadata of existing rows (unknown ids are ignored); vectors are untouched.
+        """
+        with self._lock:
+            position = {doc_id: i for i, doc_id in enumerate(self._ids)}
+            for doc_id, metadata in zip(ids, metadatas):
+                if doc_id in position:
+                    self._metadatas[position[doc_id]] = metadata
+                    self._dirty = True
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        """
+        Embeds and stores texts, persisting at once (like Chroma).
+        """
+        texts = list(texts)
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in texts]
+        self.upsert(ids, self._embedding_function.embed_documents(texts), texts, metadatas)
+        self.persist()
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        """
+        Deletes rows by id, or by exact metadata match (`where={"source": ...}`) like Chroma (in memory; see persist).
+        """
+        with self._lock:
+            drop = set(ids or [])
+            if where:
+                drop.update(
+                    doc_id for doc_id, metadata in zip(self._ids, self._metadatas)
+                    if all(metadata.get(key) == value for key, value in where.items())
+                )
+            keep = [i for i, doc_id in enumerate(self._ids) if doc_id not in drop]
+            if len(keep) == len(self._ids):
+                return
+            matrix = self._rows()
+            self._matrix = matrix[keep] if matrix is not None else None
+            self._ids = [self._ids[i] for i in keep]
+            self._texts = [self._texts[i] for i in keep]
+            self._metadatas = [self._metadatas[i] for i in keep]
+            self._dirty = True
+
+    # --- Reads ---
+
+    def get(self, include: Optional[List[str]] = None, **kwargs: Any) -> Dict[str, Any]:
+        """
+        Returns every stored row in the same shape as Chroma's `get`.
+        """
+        with self._lock:
+            result = {"ids": list(self._ids), "documents": list(self._texts), "metadatas": list(self._metadatas)}
+            if include and "embeddings" in include:
+                matrix = self._rows()
+                result["embeddings"] = np.array(matrix) if matrix is not None else []
+            return result
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        with self._lock:
+            matrix, ids = self._rows(), len(self._ids)
+            if matrix is None or ids == 0:
+                return []
+            scores = matrix @ _normalise_rows(embedding)[0]
+            k = min(k, ids)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                (Document(page_content=self._texts[i], metadata=dict(self._metadatas[i])), float(scores[i]))
+                for i in top
+            ]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embedding_function.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] -> [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, persist_directory: str = None, **kwargs: Any) -> "NumpyVectorStore":
+        store = cls(persist_directory=persist_directory, embedding_function=embedding)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    @classmethod
+    def from_chroma(cls, chroma_store, persist_directory: str, embedding: Embeddings) -> "NumpyVectorStore":
+        """
+        Copies the rows (with their stored vectors) of an existing Chroma store.
+        """
+        stored = chroma_store._collection.get(include=["embeddings", "documents", "metadatas"])
+        store = cls(persist_directory=persist_directory, embedding_function=embedding)
+        if len(stored["ids"]):
+            store.upsert(stored["ids"], stored["embeddings"], stored["documents"], stored["metadatas"])
+            store.persist()
+        return store
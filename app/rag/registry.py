@@ -0,0 +1,203 @@
+import os
+import time
+import threading
+from typing import Dict, Any
+from langchain_community.vectorstores import Chroma
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+from app.rag.embedding_cache import CachedEmbeddings, get_cache_stats
+from app.rag.lexical_index import BM25Index
+from app.rag.numpy_store import NumpyVectorStore
+from app.utils.metrics import current_rss_mb
+
+# Process-wide home of the embedding model and the vector store.
+# Both are expensive to build (model weights, Chroma client + SQLite handle),
+# so they are loaded once and shared by retrieval, ingestion and every request thread.
+
+DB_PATH = os.path.join(os.path.dirname(__file__), "../../chroma_db")
+NUMPY_DB_PATH = os.path.join(os.path.dirname(__file__), "../../numpy_db")
+# "chroma" (default) or "numpy" (in-process exact search, see app.rag.numpy_store)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE", "true").lower() != "false"
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+INDEX_VERSION_FILE = os.path.join(DB_PATH, "index_version")
+LEXICAL_INDEX_PATH = os.path.join(DB_PATH, "bm25_index.json")
+
+_lock = threading.RLock()
+_embeddings = None
+_vectorstore = None
+_lexical_index = None
+_lexical_mtime = None
+_load_stats: Dict[str, Dict[str, float]] = {}
+
+def _timed_load(name: str, factory):
+    """
+    Builds a resource and records how long it took and how much memory it added.
+    """
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    instance = factory()
+    _load_stats[name] = {
+        "load_seconds": round(time.perf_counter() - start, 3),
+        "rss_delta_mb": round(current_rss_mb() - rss_before, 1),
+        "loaded_at": time.time(),
+    }
+    print(f"📦 Loaded {name} in {_load_stats[name]['load_seconds']}s (+{_load_stats[name]['rss_delta_mb']} MB)")
+    return instance
+
+def _build_embeddings():
+    model = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+    if EMBEDDING_CACHE_ENABLED:
+        return CachedEmbeddings(model, EMBEDDING_MODEL)
+    return model
+
+def get_embeddings():
+    """
+    Returns the shared HuggingFace embeddings model (behind the persistent
+    embedding cache unless EMBEDDING_CACHE=false), loading it on first use.
+    """
+    global _embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                _embeddings = _timed_load("embeddings", _build_embeddings)
+    return _embeddings
+
+def _open_vectorstore(embeddings):
+    if VECTOR_BACKEND == "numpy":
+        return NumpyVectorStore(persist_directory=NUMPY_DB_PATH, embedding_function=embeddings)
+    return Chroma(persist_directory=DB_PATH, embedding_function=embeddings)
+
+def get_vectorstore():
+    """
+    Returns the shared vector store (Chroma or NumPy, per VECTOR_BACKEND), opening it on first use.
+    The NumPy store is reloaded when another process (e.g. scripts/ingest_data.py) has persisted it.
+    """
+    global _vectorstore
+    if _vectorstore is None:
+        embeddings = get_embeddings()
+        with _lock:
+            if _vectorstore is None:
+                _vectorstore = _timed_load("vectorstore", lambda: _open_vectorstore(embeddings))
+    elif isinstance(_vectorstore, NumpyVectorStore):
+        _vectorstore.reload_if_changed()
+    return _vectorstore
+
+def save_vectorstore():
+    """
+    Persists the shared vector store after ingestion has written to it.
+    The NumPy store keeps writes in memory until then; Chroma persists as it goes.
+    """
+    with _lock:
+        if isinstance(_vectorstore, NumpyVectorStore):
+            _vectorstore.persist()
+
+def _lexical_file_mtime():
+    try:
+        return os.stat(LEXICAL_INDEX_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def _build_lexical_from_vectorstore() -> BM25Index:
+    """
+    Builds the BM25 index from whatever is already in Chroma
+    (stores created before the lexical index existed).
+    """
+    index = BM25Index()
+    stored = get_vectorstore().get(include=["documents", "metadatas"])
+    for doc_id, text, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"]):
+        index.add(doc_id, text, metadata)
+    if len(index):
+        os.makedirs(DB_PATH, exist_ok=True)
+        index.save(LEXICAL_INDEX_PATH)
+    return index
+
+def get_lexical_index() -> BM25Index:
+    """
+    Returns the shared BM25 index, reloading it when another process
+    (e.g. scripts/ingest_data.py) has rewritten it on disk.
+    """
+    global _lexical_index, _lexical_mtime
+    mtime = _lexical_file_mtime()
+    if _lexical_index is None or mtime != _lexical_mtime:
+        with _lock:
+            mtime = _lexical_file_mtime()
+            if _lexical_index is None or mtime != _lexical_mtime:
+                if mtime is None:
+                    _lexical_index = _timed_load("lexical_index", _build_lexical_from_vectorstore)
+                else:
+                    _lexical_index = _timed_load("lexical_index", lambda: BM25Index.load(LEXICAL_INDEX_PATH))
+                _lexical_mtime = _lexical_file_mtime()
+    return _lexical_index
+
+def save_lexical_index():
+    """
+    Persists the shared BM25 index after ingestion has updated it in place.
+    """
+    global _lexical_mtime
+    with _lock:
+        if _lexical_index is not None:
+            os.makedirs(DB_PATH, exist_ok=True)
+            _lexical_index.save(LEXICAL_INDEX_PATH)
+            _lexical_mtime = _lexical_file_mtime()
+
+def preload():
+    """
+    Loads the embedding model, vector store and BM25 index eagerly (e.g. at API startup)
+    and runs one warm-up embedding so the first user query pays no init cost.
+    """
+    embeddings = get_embeddings()
+    get_vectorstore()
+    get_lexical_index()
+    if "warmup" not in _load_stats:
+        # Warm the model itself, not the cache in front of it
+        model = getattr(embeddings, "inner", embeddings)
+        _timed_load("warmup", lambda: model.embed_query("warm up"))
+
+def reset():
+    """
+    Drops the shared instances so the next call reloads them.
+    Use after the model name or the on-disk index location changes.
+    """
+    global _embeddings, _vectorstore, _lexical_index
+    with _lock:
+        _embeddings = None
+        _vectorstore = None
+        _lexical_index = None
+        _load_stats.clear()
+
+def get_index_version() -> str:
+    """
+    Returns an opaque token that changes whenever the indexed content changes.
+    Caches built on top of retrieval results compare against it.
+    """
+    try:
+        with open(INDEX_VERSION_FILE) as f:
+            return f.read().strip() or "0"
+    except FileNotFoundError:
+        return "0"
+
+def bump_index_version() -> str:
+    """
+    Marks the index as changed. Called by ingestion after every write.
+    """
+    version = str(time.time_ns())
+    os.makedirs(DB_PATH, exist_ok=True)
+    with open(INDEX_VERSION_FILE, "w") as f:
+        f.write(version)
+    return version
+
+def get_load_stats() -> Dict[str, Any]:
+    """
+    Returns load time / memory figures for the shared resources.
+    """
+    return {
+        "embedding_model": EMBEDDING_MODEL,
+        "vector_backend": VECTOR_BACKEND,
+        "embeddings_loaded": _embeddings is not None,
+        "vectorstore_loaded": _vectorstore is not None,
+        "lexical_chunks": len(_lexical_index) if _lexical_index is not None else None,
+        "embedding_cache": get_cache_stats(_embeddings),
+        "resources": dict(_load_stats),
+        "rss_mb": round(current_rss_mb(), 1),
+    }
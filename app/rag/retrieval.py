@@ -1,30 +1,98 @@
 import os
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from typing import Any, List, Dict, Tuple
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from app.rag import registry
 
-DB_PATH = os.path.join(os.path.dirname(__file__), "../../chroma_db")
+DB_PATH = registry.DB_PATH
+
+# "hybrid" fuses BM25 + dense results, "dense" is plain vector search
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+EXACT_MATCH_MAX_TERMS = int(os.getenv("HYBRID_EXACT_MAX_TERMS", "3"))
+# A non-code term only counts as an exact lookup if it is in at most this share of chunks
+EXACT_MATCH_MAX_DF = float(os.getenv("HYBRID_EXACT_MAX_DF", "0.1"))
 
 def get_embeddings():
     """
-    Returns the HuggingFace embeddings model.
+    Returns the shared HuggingFace embeddings model.
     """
-    return HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
+    return registry.get_embeddings()
 
 def get_vectorstore():
     """
-    Returns the ChromaDB vector store instance.
+    Returns the shared ChromaDB vector store instance.
+    The store is opened once per process (see app.rag.registry);
+    if ingestion hasn't run yet it is simply empty.
+    """
+    return registry.get_vectorstore()
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuses several best-first rankings of keys into one: score = sum(1 / (k + rank)).
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retrieves with BM25 and dense search and fuses the two rankings with RRF.
+    Short lookups of scheme names, acronyms and codes (see BM25Index.is_exact_term_query)
+    skip the dense search.
     """
-    embeddings = get_embeddings()
-    if os.path.exists(DB_PATH):
-        return Chroma(persist_directory=DB_PATH, embedding_function=embeddings)
-    else:
-        # If DB doesn't exist, return an empty one or handle gracefully
-        # For now, we assume ingestion happens first
-        return Chroma(persist_directory=DB_PATH, embedding_function=embeddings)
+    vectorstore: Any
+    k: int = 3
+    fetch_k: int = 10
+    rrf_k: int = 60
+    exact_match_max_terms: int = EXACT_MATCH_MAX_TERMS
+    exact_match_max_df: float = EXACT_MATCH_MAX_DF
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        lexical_index = registry.get_lexical_index()
+        lexical_hits = lexical_index.search(query, self.fetch_k)
+
+        if lexical_hits and lexical_index.is_exact_term_query(query, self.exact_match_max_terms,
+                                                                 self.exact_match_max_df):
+            return [self._lexical_document(lexical_index, doc_id, score) for doc_id, score in lexical_hits[:self.k]]
+
+        dense_docs = self.vectorstore.similarity_search(query, k=self.fetch_k)
+
+        # Key both rankings by chunk text: dense results don't carry their Chroma ids
+        by_text: Dict[str, Document] = {}
+        lexical_ranking = []
+        for doc_id, _ in lexical_hits:
+            doc = self._lexical_document(lexical_index, doc_id)
+            by_text.setdefault(doc.page_content, doc)
+            lexical_ranking.append(doc.page_content)
+        dense_ranking = []
+        for doc in dense_docs:
+            by_text.setdefault(doc.page_content, doc)
+            dense_ranking.append(doc.page_content)
+
+        fused = reciprocal_rank_fusion([dense_ranking, lexical_ranking], k=self.rrf_k)
+        results = []
+        for text, score in fused[:self.k]:
+            doc = by_text[text]
+            doc.metadata["retrieval_score"] = round(score, 6)
+            results.append(doc)
+        return results
+
+    @staticmethod
+    def _lexical_document(lexical_index, doc_id: str, score: float = None) -> Document:
+        entry = lexical_index.docs[doc_id]
+        metadata = dict(entry["metadata"])
+        if score is not None:
+            metadata["retrieval_score"] = round(score, 6)
+        return Document(page_content=entry["text"], metadata=metadata)
 
-def get_retriever():
+def get_retriever(k: int = 3):
     """
     Returns a retriever object from the vector store.
     """
     vectorstore = get_vectorstore()
-    return vectorstore.as_retriever(search_kwargs={"k": 3})
+    if RETRIEVAL_MODE == "hybrid":
+        return HybridRetriever(vectorstore=vectorstore, k=k)
+    return vectorstore.as_retriever(search_kwargs={"k": k})
@@ -1,85 +1,154 @@
 import os
+import re
 import uuid
+import asyncio
 import tempfile
-import requests
-from typing import Dict, Any, Optional
+import httpx
+from typing import Dict, Any, Optional, AsyncIterator, Awaitable, Callable, Tuple
 
 # Import services
-from app.services.voice_service import transcribe_audio, text_to_speech
-from app.services.query_service import query_agent
-from app.agents.survey_agent import process_survey, get_session, get_step_prompt
+from app.services.voice_service import atranscribe_audio, text_to_speech, text_to_speech_paragraphs, join_audio
+from app.services.query_service import aquery_agent, astream_query_agent, arecommend_products, aretrieve
+from app.agents.survey_agent import process_survey, get_session, step_prompt_key, survey_profile
 from app.db.session_db import init_db, update_session
-from app.services.translation_service import detect_language, translate_to_english, translate_to_user_lang
+from app.services.translation_service import adetect_language, atranslate_to_english, atranslate_to_user_lang
+from app.services.message_catalog import alocalize
+from app.services.language_detector import script_counts
+from app.services import stand_ins
+from app.utils.executor import run_blocking
+from app.workflows.pipeline import StageGraph
+
+AUDIO_DOWNLOAD_TIMEOUT = float(os.getenv("AUDIO_DOWNLOAD_TIMEOUT", "30"))
+# Start retrieval on the raw text of likely-English RAG turns before translation/detection finish
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "true").lower() != "false"
+
+def needs_input_translation(step: str, text: str) -> bool:
+    """
+    Survey answers that are never read as language skip the translation call:
+    the welcome turn ignores its input, an age is read off the digits, and a
+    name already in Latin script is stored as typed (names in Indic scripts are
+    still translated, the PDF reports only render Latin text).
+    """
+    if step == "welcome":
+        return False
+    if step == "ask_age" and re.search(r"\d", text):
+        return False
+    if step == "ask_name" and set(script_counts(text)) <= {"latin"}:
+        return False
+    return True
+
+async def download_audio(url: str, suffix: str) -> Optional[str]:
+    """
+    Downloads a voice note to a temp file without blocking the event loop.
+    Returns the file path, or None if the download failed.
+    """
+    def write(content: bytes) -> str:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+            tmp_file.write(content)
+            return tmp_file.name
+
+    auth = None
+    if "api.twilio.com" in url:
+        if stand_ins.stand_in_enabled("twilio"):
+            return await run_blocking(write, await stand_ins.fetch_media(url))
+        auth = (os.getenv("TWILIO_ACCOUNT_SID"), os.getenv("TWILIO_AUTH_TOKEN"))
+
+    # Twilio media URLs redirect to the CDN
+    async with httpx.AsyncClient(auth=auth, follow_redirects=True, timeout=AUDIO_DOWNLOAD_TIMEOUT) as client:
+        audio_response = await client.get(url)
+    if audio_response.status_code != 200:
+        return None
+    return await run_blocking(write, audio_response.content)
 
 class AgentService:
     def __init__(self):
         # Ensure DB is initialized
         init_db()
 
-    async def process_message(self, session_id: str, text: str = None, audio_url: str = None, audio_type: str = None, tts_enabled: bool = False) -> Dict[str, Any]:
+    async def _prefetch_recommendation(self, session: Dict[str, Any], english_text: str) -> Callable[[str], str]:
+        """
+        The last survey answer triggers the recommendation LLM call. Run it with
+        ainvoke here and hand the result to the (blocking) survey step, which only
+        has PDF rendering left to do on the executor.
+        """
+        try:
+            recommendation = await arecommend_products(survey_profile(session["data"], english_text))
+        except Exception as e:
+            error = e
+            def recommend(profile: str) -> str:
+                raise error
+            return recommend
+        return lambda profile: recommendation
+
+    async def process_message(self, session_id: str, text: str = None, audio_url: str = None, audio_type: str = None, tts_enabled: bool = False,
+                              emit: Optional[Callable[[str, Dict[str, Any]], Awaitable[None]]] = None) -> Dict[str, Any]:
         """
         Core logic to process a user message (Text or Audio).
         Returns a dict with: 'response_text', 'audio_path' (optional), 'sources' (optional), 'media_url' (optional)
+        and 'stage_timings' (per-stage timings and the critical path, see app.workflows.pipeline).
+        If `emit` is given, stage events (transcribed, language, retrieved, token, answer, audio_ready...)
+        are sent to it as they happen; see stream_message.
         """
         print(f"▶️ Processing message for {session_id}")
+        graph = StageGraph()
+        try:
+            result = await self._run_stages(graph, session_id, text, audio_url, audio_type, tts_enabled, emit)
+        finally:
+            timings = await graph.close()
+        print(f"⏱️ Critical path {timings['critical_path_ms']} ms: {' -> '.join(timings['critical_path'])}")
+        result["stage_timings"] = timings
+        return result
+
+    async def _run_stages(self, graph: StageGraph, session_id: str, text: Optional[str], audio_url: Optional[str],
+                          audio_type: Optional[str], tts_enabled: bool, emit) -> Dict[str, Any]:
+        async def notify(event: str, **data):
+            if emit:
+                await emit(event, data)
         
         final_text = text
+        is_voice_note = bool(audio_url and audio_type and "audio" in audio_type)
+        wants_voice_reply = is_voice_note or tts_enabled
+
+        # Load Session (its language, if known, is used for error replies too),
+        # downloading a remote voice note at the same time
+        graph.add("session", lambda: run_blocking(get_session, session_id))
+        if is_voice_note and not os.path.exists(audio_url):
+            # Web uploads arrive as a local path; Twilio media is fetched here
+            suffix = ".ogg" if "ogg" in audio_type else ".mp3"
+            graph.add("download", lambda: download_audio(audio_url, suffix))
+        session = await graph.result("session")
+        session_data = session["data"]
+        error_lang = session_data.get("language", "en")
 
         # 1. Handle Voice Note
-        if audio_url and audio_type and "audio" in audio_type:
+        if is_voice_note:
             print(f"🎙️ Voice note detected: {audio_url}")
             try:
-                # Determine how to download (Twilio vs generic URL)
-                # For now assuming basic generic download or handling auth if needed specific to endpoint
-                # NOTE: In server.py we used Twilio auth. For web app, this might be a direct file upload or static URL.
-                # We'll adapt to try basic get first, or assume server.py passed a local path or accessible URL.
-                
-                # If it's a Twilio URL requires Auth, this service might need to know that. 
-                # For simplicity, let's assume the caller handles auth-gated downloads OR this is a public/local URL.
-                # BUT, to keep backward compat with the Twilio flow which we will refactor server.py to use this,
-                # we might need to handle the download there or pass the auth'd content.
-                # Let's assume the `audio_url` passed here is ACCESSIBLE. 
-                
-                # Check if it is a local file path (for web app uploads)
-                if os.path.exists(audio_url):
+                if "download" in graph:
+                    tmp_path = await graph.result("download")
+                    if tmp_path is None:
+                        return {"response_text": await alocalize("error.audio_download", error_lang)}
+                    should_delete = True
+                else:
                     tmp_path = audio_url
                     should_delete = False
-                else:
-                    # Download
-                    auth = None
-                    if "api.twilio.com" in audio_url:
-                        auth = (os.getenv("TWILIO_ACCOUNT_SID"), os.getenv("TWILIO_AUTH_TOKEN"))
-                    
-                    audio_response = requests.get(audio_url, auth=auth)
-                    
-                    if audio_response.status_code == 200:
-                        suffix = ".ogg" if "ogg" in audio_type else ".mp3"
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
-                            tmp_file.write(audio_response.content)
-                            tmp_path = tmp_file.name
-                        should_delete = True
-                    else:
-                        return {"response_text": "Sorry, I couldn't download your voice note."}
 
                 # Transcribe
                 print("📝 Transcribing...")
-                transcription = transcribe_audio(tmp_path)
+                transcription = await graph.run("transcribe", lambda: atranscribe_audio(tmp_path))
                 final_text = transcription
                 print(f"📝 Transcribed text: {final_text}")
+                await notify("transcribed", text=final_text)
                 
                 if should_delete and os.path.exists(tmp_path):
                     os.remove(tmp_path)
                     
             except Exception as e:
                 print(f"❌ Error processing audio: {e}")
-                return {"response_text": "Sorry, I had trouble processing your voice message."}
+                return {"response_text": await alocalize("error.audio_processing", error_lang)}
 
         if not final_text:
-            return {"response_text": "I didn't receive any text or audio."}
-
-        # 2. Load Session
-        session = get_session(session_id)
-        session_data = session["data"]
+            return {"response_text": await alocalize("error.no_input", error_lang)}
 
         # 3. Detect Language
         detected_lang = "en" 
@@ -95,6 +164,14 @@ class AgentService:
              explicit_lang = "hi"
         elif "marathi" in text_lower or "मराठी" in text_lower:
              explicit_lang = "mr"
+
+        # A RAG turn in (probably) English will query with the text as typed: start
+        # retrieval now, alongside language detection and the semantic cache lookup.
+        # It is dropped if the English query turns out different.
+        if (SPECULATIVE_RETRIEVAL and session["step"] == "completed" and not explicit_lang
+                and "survey" not in text_lower and session_data.get("language", "en") == "en"
+                and set(script_counts(final_text)) <= {"latin"}):
+            graph.add("retrieve", lambda: aretrieve(final_text), speculative=True)
              
         if explicit_lang:
             user_lang = explicit_lang
@@ -102,14 +179,11 @@ class AgentService:
             print(f"🔄 Explicit Language Switch: {explicit_lang}")
             
             # Don't process this text as an answer. Re-prompt current step.
-            current_prompt_en = get_step_prompt(session["step"])
-            response_text_to_send = translate_to_user_lang(current_prompt_en, user_lang)
-            # Prepend confirmation?
-            # response_text_to_send = f"(Language switched to {user_lang})\n\n{response_text_to_send}"
+            response_text_to_send = await alocalize(step_prompt_key(session["step"]), user_lang)
         else:
             # Fallback to Sticky / Auto-detect
             if "language" not in session_data:
-                detected_lang = detect_language(final_text)
+                detected_lang = await graph.run("detect_language", lambda: adetect_language(final_text))
                 if detected_lang != "en" or len(final_text.split()) > 2:
                      session_data["language"] = detected_lang
                      user_lang = detected_lang
@@ -119,24 +193,48 @@ class AgentService:
                 user_lang = session_data["language"]
 
         print(f"🌐 Language: {user_lang} (Explicit: {explicit_lang}, Detected: {detected_lang})")
+        await notify("language", language=user_lang)
+
+        # The disclaimer (and its voice-over) only depend on the language
+        graph.add("disclaimer", lambda: alocalize("disclaimer.irdai", user_lang))
+        if wants_voice_reply:
+            graph.add("tts_disclaimer", lambda disclaimer: text_to_speech(disclaimer.replace("*", ""), user_lang),
+                      after=("disclaimer",))
 
         # 4. Translate to English
-        english_text = translate_to_english(final_text, user_lang)
+        if user_lang != "en" and needs_input_translation(session["step"], final_text):
+            english_text = await graph.run("translate_in", lambda: atranslate_to_english(final_text, user_lang))
+        else:
+            english_text = final_text
         print(f"🔤 English Input: {english_text}")
 
+        retrieved = None
+        if "retrieve" in graph:
+            if english_text.strip() == final_text.strip():
+                retrieved = lambda: graph.result("retrieve")
+            else:
+                graph.cancel("retrieve")
+
         # 5. Process (Survey or RAG)
-        response_text_to_send = response_text_to_send # Carry over if set
         sources = []
+        context_packing = None
         should_generate_pdf = False
 
         # Only process survey logic if we haven't already handled an explicit command
         if not response_text_to_send:
             # Check Survey State
             if session["step"] != "completed":
-                survey_result = process_survey(session_id, english_text, current_session=session)
+                recommend = None
+                if session["step"] == "ask_worry" and "reset" not in english_text.lower():
+                    recommend = await graph.run("recommend", lambda: self._prefetch_recommendation(session, english_text))
+                # SQLite + PDF rendering: keep them off the event loop
+                survey_result = await graph.run("survey", lambda: run_blocking(
+                    process_survey, session_id, english_text, current_session=session,
+                    **({"recommend": recommend} if recommend else {})))
                 
                 if survey_result:
                     survey_response_en = survey_result.get("response")
+                    message_key = survey_result.get("message_key")
                     if survey_result.get("next_step"):
                         session["step"] = survey_result["next_step"]
                         if session["step"] == "completed":
@@ -146,39 +244,50 @@ class AgentService:
                         session["data"] = survey_result["data"]
                         session_data = session["data"]
                     
-                    if survey_response_en:
-                        response_text_to_send = translate_to_user_lang(survey_response_en, user_lang)
+                    if message_key:
+                        response_text_to_send = await graph.run("localize_reply", lambda: alocalize(
+                            message_key, user_lang, **survey_result["message_fields"]))
+                    elif survey_response_en:
+                        response_text_to_send = await graph.run("translate_reply", lambda: atranslate_to_user_lang(
+                            survey_response_en, user_lang))
 
         # Fallback to RAG
         if not response_text_to_send:
             if "survey" in english_text.lower():
-                survey_result = process_survey(session_id, "reset", current_session=session)
+                survey_result = await graph.run("survey_reset", lambda: run_blocking(
+                    process_survey, session_id, "reset", current_session=session))
                 if survey_result:
                     session["step"] = survey_result["next_step"]
                     session_data = survey_result["data"]
                     session["data"] = session_data
-                    survey_intro_en = survey_result.get("response")
-                    response_text_to_send = translate_to_user_lang(survey_intro_en, user_lang)
+                    response_text_to_send = await alocalize(survey_result["message_key"], user_lang, **survey_result["message_fields"])
             else:
                 print(f"🔍 Querying RAG with: {english_text}") 
                 try:
-                    rag_response = query_agent(english_text)
+                    if emit:
+                        rag_response = await graph.run("rag", lambda: self._stream_rag(english_text, user_lang, notify, retrieved))
+                    else:
+                        rag_response = await graph.run("rag", lambda: aquery_agent(english_text, retrieved=retrieved))
                     
                     if isinstance(rag_response, dict):
                         answer = rag_response.get("answer", "")
                         sources = rag_response.get("sources", [])
-                        answer_translated = translate_to_user_lang(answer, user_lang)
-                        response_text_to_send = answer_translated
+                        context_packing = rag_response.get("context_packing")
+                        if user_lang != "en":
+                            await notify("translating")
+                            answer = await graph.run("translate_out", lambda: atranslate_to_user_lang(answer, user_lang))
+                        response_text_to_send = answer
                     else:
                         response_text_to_send = str(rag_response)
 
                 except Exception as e:
                     print(f"❌ RAG Error: {e}")
-                    response_text_to_send = "I encountered an error looking that up."
+                    response_text_to_send = await alocalize("error.rag", user_lang)
 
         # 6. Response Preparation
-        irda_disclaimer = "\n\n_(IRDAI: Insurance is subject to market risk. Read strictly.)_"
-        full_response_text = (response_text_to_send or "") + irda_disclaimer
+        response_text_to_send = response_text_to_send or ""
+        irda_disclaimer = "\n\n" + await graph.result("disclaimer")
+        full_response_text = response_text_to_send + irda_disclaimer
         
         result = {
             "response_text": full_response_text,
@@ -186,56 +295,121 @@ class AgentService:
             "user_language": user_lang,
             "session_data": session_data
         }
+        if context_packing:
+            result["context_packing"] = context_packing
+        await notify("answer", response_text=full_response_text, sources=sources)
 
+        # PDF report, voice reply and session write are independent: run them together
         # PDF Generation (Enterprise Feature)
         if should_generate_pdf and session_data.get("recommendation"):
-             try:
-                 from app.services.report_service import generate_pdf_report
-                 print("📄 Generating Enterprise PDF Report...")
-                 pdf_filename = f"Roadmap_{session_id}_{uuid.uuid4().hex[:6]}.pdf"
-                 # Ensure reports dir exists
-                 reports_dir = os.path.join(os.path.dirname(__file__), "../static/reports")
-                 os.makedirs(reports_dir, exist_ok=True)
-                 
-                 # Report service likely needs just the filename if it saves to a fixed path, 
-                 # or we need to check its implementation. 
-                 # Checking server.py: generate_pdf_report(session_data, session_data["recommendation"], pdf_filename)
-                 # It seems it handles the path internally or saves it relative to where? 
-                 # We'll assume it behaves as existing server.py expects.
-                 
-                 generate_pdf_report(session_data, session_data["recommendation"], pdf_filename)
-                 
-                 ngrok_url = os.getenv("NGROK_URL")
-                 if ngrok_url:
-                     pdf_url = f"{ngrok_url}/static/reports/{pdf_filename}"
-                     result["media_url"] = pdf_url
-                     result["media_type"] = "application/pdf"
-                     
-             except Exception as e:
-                 print(f"❌ PDF Gen Error: {e}")
+            graph.add("pdf", lambda: self._generate_report(session_id, session_data, result, notify))
 
         # Voice Reply (if input was audio OR tts_enabled is True)
-        if (audio_url and "audio" in audio_type) or tts_enabled:
+        if wants_voice_reply:
             print("🎙️ Generating Audio Reply (EdgeTTS)...")
-            clean_text = full_response_text.replace("*", "")
-            try:
-                audio_path = await text_to_speech(clean_text, user_lang)
-                
-                if audio_path:
-                    filename = os.path.basename(audio_path)
-                    ngrok_url = os.getenv("NGROK_URL")
-                    if ngrok_url:
-                        # Return URL for Twilio/Web
-                        result["audio_url"] = f"{ngrok_url}/static/voice_cache/{filename}"
-                    else:
-                        # Fallback to local path if no ngrok (for local web testing)
-                        # Construct a localhost URL for the frontend
-                        result["audio_url"] = f"http://localhost:8000/static/voice_cache/{filename}"
-                        result["audio_path"] = audio_path 
-            except Exception as e:
-                print(f"❌ TTS Error: {e}") 
+            graph.add("tts", lambda disclaimer_audio: self._voice_reply(
+                response_text_to_send, disclaimer_audio, user_lang, result, notify), after=("tts_disclaimer",))
 
         # 7. Persist Session
-        update_session(session_id, session["step"], session["data"])
+        graph.add("persist", lambda: run_blocking(update_session, session_id, session["step"], session["data"]))
+
+        for stage in ("pdf", "tts"):
+            if stage in graph:
+                try:
+                    await graph.result(stage)
+                except Exception as e:
+                    print(f"❌ {'PDF Gen' if stage == 'pdf' else 'TTS'} Error: {e}")
+        await graph.result("persist")
         
         return result
+
+    async def _generate_report(self, session_id: str, session_data: Dict[str, Any], result: Dict[str, Any], notify):
+        from app.services.report_service import generate_pdf_report
+        print("📄 Generating Enterprise PDF Report...")
+        pdf_filename = f"Roadmap_{session_id}_{uuid.uuid4().hex[:6]}.pdf"
+        # Ensure reports dir exists
+        reports_dir = os.path.join(os.path.dirname(__file__), "../static/reports")
+        os.makedirs(reports_dir, exist_ok=True)
+
+        await run_blocking(generate_pdf_report, session_data, session_data["recommendation"], pdf_filename)
+
+        ngrok_url = os.getenv("NGROK_URL")
+        if ngrok_url:
+            pdf_url = f"{ngrok_url}/static/reports/{pdf_filename}"
+            result["media_url"] = pdf_url
+            result["media_type"] = "application/pdf"
+            await notify("report_ready", media_url=pdf_url)
+
+    async def _voice_reply(self, response_text: str, disclaimer_audio: str, user_lang: str, result: Dict[str, Any], notify):
+        """
+        Voices the reply paragraph by paragraph (concurrently) and appends the
+        disclaimer audio, which was generated while the answer was being prepared.
+        """
+        parts = await text_to_speech_paragraphs(response_text.replace("*", ""), user_lang)
+        audio_path = await run_blocking(join_audio, parts + [disclaimer_audio])
+
+        if audio_path:
+            filename = os.path.basename(audio_path)
+            ngrok_url = os.getenv("NGROK_URL")
+            if ngrok_url:
+                # Return URL for Twilio/Web
+                result["audio_url"] = f"{ngrok_url}/static/voice_cache/{filename}"
+            else:
+                # Fallback to local path if no ngrok (for local web testing)
+                # Construct a localhost URL for the frontend
+                result["audio_url"] = f"http://localhost:8000/static/voice_cache/{filename}"
+                result["audio_path"] = audio_path 
+            await notify("audio_ready", audio_url=result["audio_url"])
+
+    async def _stream_rag(self, english_text: str, user_lang: str, notify,
+                          retrieved: Optional[Callable[[], Awaitable[list]]] = None) -> Dict[str, Any]:
+        """
+        Runs the streaming RAG query, forwarding sources and (for English users) answer tokens.
+        Other languages get the answer only after translation, so tokens are not forwarded.
+        """
+        await notify("retrieving")
+        answering = False
+        result = {"answer": "", "sources": []}
+        async for event in astream_query_agent(english_text, retrieved=retrieved):
+            if event["event"] == "retrieved":
+                await notify("retrieved", sources=event["sources"])
+            elif event["event"] == "token":
+                if not answering:
+                    answering = True
+                    await notify("answering")
+                if user_lang == "en":
+                    await notify("token", text=event["text"])
+            elif event["event"] == "answer":
+                result = {key: value for key, value in event.items() if key != "event"}
+        return result
+
+    async def stream_message(self, session_id: str, text: str = None, audio_url: str = None, audio_type: str = None,
+                             tts_enabled: bool = False) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Streaming variant of process_message.
+        Yields (event, data) pairs as stages complete, ending with ("done", result) or ("error", {...}).
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def emit(event: str, data: Dict[str, Any]):
+            await queue.put((event, data))
+
+        async def run():
+            try:
+                result = await self.process_message(session_id, text=text, audio_url=audio_url, audio_type=audio_type,
+                                                    tts_enabled=tts_enabled, emit=emit)
+                await queue.put(("done", result))
+            except Exception as e:
+                print(f"❌ Streaming Error: {e}")
+                await queue.put(("error", {"message": str(e)}))
+
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                event, data = await queue.get()
+                yield event, data
+                if event in ("done", "error"):
+                    break
+        finally:
+            if not task.done():
+                task.cancel()
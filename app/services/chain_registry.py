@@ -0,0 +1,73 @@
+import time
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+# Process-wide registry of LangChain chains and LLM clients.
+# Building a chat model creates a fresh API client (new TLS connection on the
+# first call), and building prompt + stuff/retrieval chains is pure overhead on
+# every message; here each object is built once and reused across requests.
+
+class ChainRegistry:
+    """
+    Builds named objects lazily and caches them.
+    Each entry has a `config_fn` returning a hashable snapshot of what the object
+    depends on (model name, prompt text...). When that snapshot changes the
+    object is rebuilt on next use, which is the hot-reload hook for prompt/model changes.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._config_fns: Dict[str, Callable[[], Hashable]] = {}
+        self._objects: Dict[str, Any] = {}
+        self._configs: Dict[str, Hashable] = {}
+        self._build_stats: Dict[str, Dict[str, float]] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], config_fn: Callable[[], Hashable] = lambda: None):
+        with self._lock:
+            self._factories[name] = factory
+            self._config_fns[name] = config_fn
+            self._objects.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        config = self._config_fns[name]()
+        obj = self._objects.get(name)
+        if obj is not None and self._configs.get(name) == config:
+            return obj
+
+        with self._lock:
+            obj = self._objects.get(name)
+            if obj is None or self._configs.get(name) != config:
+                if obj is not None:
+                    print(f"♻️ Rebuilding chain '{name}' (config changed)")
+                start = time.perf_counter()
+                obj = self._factories[name]()
+                stats = self._build_stats.setdefault(name, {"builds": 0, "last_build_ms": 0.0})
+                stats["builds"] += 1
+                stats["last_build_ms"] = round((time.perf_counter() - start) * 1000, 3)
+                self._objects[name] = obj
+                self._configs[name] = config
+            return obj
+
+    def reload(self, name: str = None):
+        """
+        Drops cached objects (one, or all) so they are rebuilt on next use.
+        """
+        with self._lock:
+            if name is None:
+                self._objects.clear()
+                self._configs.clear()
+            else:
+                self._objects.pop(name, None)
+                self._configs.pop(name, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: dict(stats) for name, stats in self._build_stats.items()}
+
+chain_registry = ChainRegistry()
+
+def reload_chains(name: str = None):
+    """
+    Hot-reload hook: rebuild chains and LLM clients on next use.
+    Chains also rebuild by themselves when their model name or prompt text changes.
+    """
+    chain_registry.reload(name)
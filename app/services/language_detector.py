@@ -0,0 +1,182 @@
+import os
+import json
+import math
+import re
+from collections import Counter
+from typing import Dict, List, NamedTuple
+
+# Local language detection. The script is read off Unicode ranges; within a
+# script shared by several languages (Devanagari: hi/mr, Latin: en/Hinglish/
+# romanised Marathi) a character n-gram naive Bayes model trained on
+# app/models/language_corpus.json picks the language. Runs in tens of
+# microseconds, so the LLM is only consulted when confidence is low.
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "../models/language_corpus.json")
+
+# (script, first code point, last code point)
+SCRIPT_RANGES = [
+    ("devanagari", 0x0900, 0x097F),
+    ("bengali", 0x0980, 0x09FF),
+    ("gurmukhi", 0x0A00, 0x0A7F),
+    ("gujarati", 0x0A80, 0x0AFF),
+    ("tamil", 0x0B80, 0x0BFF),
+    ("telugu", 0x0C00, 0x0C7F),
+    ("kannada", 0x0C80, 0x0CFF),
+    ("malayalam", 0x0D00, 0x0D7F),
+]
+
+# Scripts written by a single language we support: no model needed
+SCRIPT_LANGUAGE = {
+    "bengali": "bn",
+    "gurmukhi": "pa",
+    "gujarati": "gu",
+    "tamil": "ta",
+    "telugu": "te",
+    "kannada": "kn",
+    "malayalam": "ml",
+}
+
+NGRAM_ORDERS = (1, 2, 3)
+# Indic text routinely carries English loanwords (insurance, premium) in Latin
+# script; an Indic script with at least this share of the letters wins
+INDIC_MIN_SHARE = 0.25
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+class Detection(NamedTuple):
+    language: str
+    confidence: float
+    script: str
+
+def _script_of(char: str) -> str:
+    code = ord(char)
+    if char.isascii():
+        return "latin" if char.isalpha() else None
+    if 0x00C0 <= code <= 0x024F:
+        return "latin" if char.isalpha() else None
+    for script, first, last in SCRIPT_RANGES:
+        if first <= code <= last:
+            return script
+    return None
+
+def script_counts(text: str) -> Counter:
+    """
+    Counts letters per script. Digits, punctuation and emoji are ignored;
+    Indic combining marks (matras, virama) count towards their script.
+    """
+    counts = Counter()
+    for char in text:
+        script = _script_of(char)
+        if script:
+            counts[script] += 1
+    return counts
+
+def char_ngrams(text: str) -> List[str]:
+    """
+    Character n-grams of each word padded with spaces, so word starts and
+    endings (आहे, -hai, -aahe) become features of their own.
+    """
+    grams = []
+    for word in WORD_RE.findall(text.lower()):
+        if word.isdigit():
+            continue
+        padded = f" {word} "
+        for n in NGRAM_ORDERS:
+            grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return grams
+
+class NgramModel:
+    """
+    Multinomial naive Bayes over character n-grams with add-alpha smoothing.
+    """
+    def __init__(self, samples: Dict[str, List[str]], alpha: float = 0.5):
+        self.alpha = alpha
+        self.labels = sorted(samples)
+        self.counts: Dict[str, Counter] = {}
+        for label, sentences in samples.items():
+            counter = Counter()
+            for sentence in sentences:
+                counter.update(char_ngrams(sentence))
+            self.counts[label] = counter
+        vocabulary = set()
+        for counter in self.counts.values():
+            vocabulary.update(counter)
+        self.vocab_size = len(vocabulary)
+        self.totals = {label: sum(counter.values()) for label, counter in self.counts.items()}
+        # Pre-computed log-probabilities; unseen n-grams use the per-label floor
+        self.log_probs = {
+            label: {
+                gram: math.log((count + alpha) / (self.totals[label] + alpha * self.vocab_size))
+                for gram, count in counter.items()
+            }
+            for label, counter in self.counts.items()
+        }
+        self.unseen = {
+            label: math.log(alpha / (self.totals[label] + alpha * self.vocab_size))
+            for label in self.labels
+        }
+
+    def predict(self, text: str) -> Dict[str, float]:
+        """
+        Returns the posterior probability of each label (uniform prior).
+        The 1/2/3-gram features of a word overlap, so the log-likelihoods are
+        divided by the number of orders to keep short inputs from looking certain.
+        """
+        grams = char_ngrams(text)
+        if not grams:
+            return {label: 1.0 / len(self.labels) for label in self.labels}
+        scores = {}
+        for label in self.labels:
+            table = self.log_probs[label]
+            floor = self.unseen[label]
+            scores[label] = sum(table.get(gram, floor) for gram in grams)
+        best = max(scores.values())
+        weights = {label: math.exp((score - best) / len(NGRAM_ORDERS)) for label, score in scores.items()}
+        total = sum(weights.values())
+        return {label: weight / total for label, weight in weights.items()}
+
+class LanguageDetector:
+    def __init__(self, corpus_path: str = CORPUS_PATH):
+        with open(corpus_path, encoding="utf-8") as f:
+            corpus = json.load(f)
+        self.models = {script: NgramModel(samples) for script, samples in corpus.items() if isinstance(samples, dict)}
+
+    def detect(self, text: str) -> Detection:
+        counts = script_counts(text)
+        letters = sum(counts.values())
+        if not letters:
+            # Numbers, emoji, punctuation: nothing to detect, keep the default
+            return Detection("en", 1.0, "none")
+
+        script, count = counts.most_common(1)[0]
+        indic = [(c, s) for s, c in counts.items() if s != "latin"]
+        if indic:
+            indic_count, indic_script = max(indic)
+            if indic_count / letters >= INDIC_MIN_SHARE:
+                script, count = indic_script, indic_count
+        # Full weight once the script holds half the letters
+        script_weight = min(1.0, 2 * count / letters)
+
+        if script in SCRIPT_LANGUAGE:
+            return Detection(SCRIPT_LANGUAGE[script], round(script_weight, 3), script)
+
+        model = self.models.get(script)
+        if model is None:
+            return Detection("en", 0.0, script)
+        posterior = model.predict(text)
+        language = max(posterior, key=posterior.get)
+        return Detection(language, round(posterior[language] * script_weight, 3), script)
+
+_detector = None
+
+def get_detector() -> LanguageDetector:
+    global _detector
+    if _detector is None:
+        _detector = LanguageDetector()
+    return _detector
+
+def detect_local(text: str) -> Detection:
+    """
+    Detects the language without any network call.
+    Returns a Detection(language, confidence in [0, 1], script).
+    """
+    return get_detector().detect(text)
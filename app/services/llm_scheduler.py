@@ -0,0 +1,294 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.utils.metrics import summarize_latencies
+
+# Every Groq/Gemini call goes through here. Each (provider, model) pair has two
+# token buckets, one for requests per minute and one for tokens per minute
+# (both providers meter per model). Calls queue until both buckets can take
+# them, so we wait locally instead of firing requests the provider will
+# answer with 429. Interactive calls (chat and survey turns) are served before
+# background work (recommendations, report text, offline scripts). A call that
+# could not start within its priority's max wait, or that finds the queue full,
+# fails fast with SchedulerBusy, and the caller shows its usual error reply.
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+# (requests/min, tokens/min) per model; defaults are the free-tier limits
+PROVIDER_LIMITS = {
+    "groq": (int(os.getenv("GROQ_RPM", "30")), int(os.getenv("GROQ_TPM", "6000"))),
+    "gemini": (int(os.getenv("GEMINI_RPM", "15")), int(os.getenv("GEMINI_TPM", "1000000"))),
+}
+
+# Models used on each provider (answers on Gemini, translation on Groq; each is the other's fallback).
+# Read on every call so the cached clients notice a change.
+def gemini_model() -> str:
+    return os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+
+def groq_model() -> str:
+    return os.getenv("GROQ_TRANSLATION_MODEL", "llama-3.3-70b-versatile") # Reliable model
+
+MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+MAX_WAIT_SECONDS = {
+    INTERACTIVE: float(os.getenv("LLM_MAX_WAIT", "20")),
+    BACKGROUND: float(os.getenv("LLM_MAX_WAIT_BACKGROUND", "120")),
+}
+STATS_WINDOW = 1000
+
+_priority: contextvars.ContextVar = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+@contextmanager
+def llm_priority(priority: int):
+    """
+    Runs the LLM calls made inside the block (in this thread/task) at `priority`.
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+class SchedulerBusy(Exception):
+    """
+    The call was not sent: the provider's limits would not let it start in time.
+    """
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """
+        Seconds until `amount` can be taken (a request bigger than the bucket waits for a full one).
+        """
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+
+    def drain(self, now: float):
+        self._refill(now)
+        self.level = min(self.level, 0.0)
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "tokens", "enqueued", "granted", "wake")
+
+    def __init__(self, priority: int, seq: int, tokens: int, wake: Callable[[], None]):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.wake = wake
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+class _Limiter:
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.queue = []
+        self.granted = 0
+        self.rejected = 0
+        self.throttled = 0
+        self.max_queue_depth = 0
+        self.waits = {priority: deque(maxlen=STATS_WINDOW) for priority in PRIORITY_NAMES}
+
+    def estimated_wait(self, tokens: int, priority: int, now: float) -> float:
+        """
+        Time until a new waiter would reach the front and fit in both buckets,
+        assuming the waiters ahead of it take what they asked for.
+        """
+        ahead = [w for w in self.queue if w.priority <= priority]
+        requests_needed = len(ahead) + 1
+        tokens_needed = sum(w.tokens for w in ahead) + tokens
+        return max(self.requests.wait_time(requests_needed, now), self.tokens.wait_time(tokens_needed, now))
+
+class LLMScheduler:
+    def __init__(self, limits: Dict[str, Tuple[int, int]] = None):
+        self.limits = limits or PROVIDER_LIMITS
+        self._lock = threading.Lock()
+        self._limiters: Dict[Tuple[str, str], _Limiter] = {}
+        self._seq = itertools.count()
+
+    def _limiter(self, provider: str, model: str) -> _Limiter:
+        key = (provider, model)
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            rpm, tpm = self.limits[provider]
+            limiter = self._limiters[key] = _Limiter(rpm, tpm)
+        return limiter
+
+    def _enqueue(self, provider: str, model: str, tokens: int, priority: int,
+                 wake: Callable[[], None]) -> Tuple[_Limiter, _Waiter]:
+        with self._lock:
+            limiter = self._limiter(provider, model)
+            now = time.monotonic()
+            if len(limiter.queue) >= MAX_QUEUE:
+                limiter.rejected += 1
+                raise SchedulerBusy(f"{provider}/{model}: {len(limiter.queue)} calls already queued")
+            wait = limiter.estimated_wait(tokens, priority, now)
+            if wait > MAX_WAIT_SECONDS[priority]:
+                limiter.rejected += 1
+                raise SchedulerBusy(f"{provider}/{model}: rate limit would delay this call {wait:.1f}s")
+
+            waiter = _Waiter(priority, next(self._seq), tokens, wake)
+            heapq.heappush(limiter.queue, waiter)
+            limiter.max_queue_depth = max(limiter.max_queue_depth, len(limiter.queue))
+            self._dispatch(limiter, now)
+            return limiter, waiter
+
+    def _dispatch(self, limiter: _Limiter, now: float) -> float:
+        """
+        Grants queued calls in priority order while both buckets allow.
+        Returns how long until the head of the queue can go (0 if the queue is empty).
+        Caller holds the lock.
+        """
+        while limiter.queue:
+            head = limiter.queue[0]
+            wait = max(limiter.requests.wait_time(1, now), limiter.tokens.wait_time(head.tokens, now))
+            if wait > 0:
+                return wait
+            heapq.heappop(limiter.queue)
+            limiter.requests.take(1, now)
+            limiter.tokens.take(head.tokens, now)
+            limiter.granted += 1
+            limiter.waits[head.priority].append(now - head.enqueued)
+            head.granted = True
+            head.wake()
+        return 0.0
+
+    def _poll(self, limiter: _Limiter, waiter: _Waiter) -> Optional[float]:
+        """
+        Returns None once `waiter` is granted, otherwise how long to sleep before polling again.
+        """
+        with self._lock:
+            if not waiter.granted:
+                wait = self._dispatch(limiter, time.monotonic())
+            if waiter.granted:
+                return None
+            return max(wait, 0.01)
+
+    def _withdraw(self, limiter: _Limiter, waiter: _Waiter):
+        with self._lock:
+            if not waiter.granted and waiter in limiter.queue:
+                limiter.queue.remove(waiter)
+                heapq.heapify(limiter.queue)
+
+    def acquire(self, provider: str, model: str, tokens: int, priority: Optional[int] = None):
+        """
+        Blocks until a call of ~`tokens` tokens may be sent to provider/model.
+        Raises SchedulerBusy instead of queueing a call that could not start in time.
+        """
+        priority = _priority.get() if priority is None else priority
+        event = threading.Event()
+        limiter, waiter = self._enqueue(provider, model, tokens, priority, event.set)
+        try:
+            while (wait := self._poll(limiter, waiter)) is not None:
+                event.wait(wait)
+        finally:
+            self._withdraw(limiter, waiter)
+
+    async def aacquire(self, provider: str, model: str, tokens: int, priority: Optional[int] = None):
+        """
+        Async variant of acquire: waits without blocking the event loop.
+        """
+        priority = _priority.get() if priority is None else priority
+        loop = asyncio.get_running_loop()
+        granted = asyncio.Event()
+        limiter, waiter = self._enqueue(provider, model, tokens, priority,
+                                        lambda: loop.call_soon_threadsafe(granted.set))
+        try:
+            while (wait := self._poll(limiter, waiter)) is not None:
+                try:
+                    await asyncio.wait_for(granted.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # A cancelled caller gives up its place in the queue
+            self._withdraw(limiter, waiter)
+
+    def throttled(self, provider: str, model: str):
+        """
+        The provider answered 429 anyway (limits lower than configured, or shared
+        with another process): empty the buckets so queued calls back off.
+        """
+        with self._lock:
+            limiter = self._limiter(provider, model)
+            now = time.monotonic()
+            limiter.requests.drain(now)
+            limiter.tokens.drain(now)
+            limiter.throttled += 1
+
+    def call(self, provider: str, model: str, tokens: int, fn: Callable[[], Any], priority: Optional[int] = None) -> Any:
+        """
+        Runs `fn` (one LLM call) once the limits allow it.
+        """
+        self.acquire(provider, model, tokens, priority)
+        try:
+            return fn()
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self.throttled(provider, model)
+            raise
+
+    async def acall(self, provider: str, model: str, tokens: int, fn: Callable[[], Awaitable[Any]],
+                    priority: Optional[int] = None) -> Any:
+        """
+        Async variant of call; `fn` returns a coroutine.
+        """
+        await self.aacquire(provider, model, tokens, priority)
+        try:
+            return await fn()
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self.throttled(provider, model)
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                f"{provider}/{model}": {
+                    "limits_per_minute": {"requests": limiter.requests.capacity, "tokens": limiter.tokens.capacity},
+                    "queue_depth": len(limiter.queue),
+                    "max_queue_depth": limiter.max_queue_depth,
+                    "granted": limiter.granted,
+                    "rejected": limiter.rejected,
+                    "throttled": limiter.throttled,
+                    "wait": {PRIORITY_NAMES[p]: summarize_latencies(waits) for p, waits in limiter.waits.items()},
+                }
+                for (provider, model), limiter in self._limiters.items()
+            }
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    groq.RateLimitError, google.api_core.exceptions.ResourceExhausted, or anything carrying HTTP 429.
+    """
+    name = type(error).__name__
+    return name in ("RateLimitError", "ResourceExhausted", "TooManyRequests") or getattr(error, "status_code", None) == 429
+
+llm_scheduler = LLMScheduler()
+
+def get_scheduler_stats() -> Dict[str, Any]:
+    return llm_scheduler.stats()
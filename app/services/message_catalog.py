@@ -0,0 +1,135 @@
+import os
+import json
+import threading
+from typing import Dict, Optional
+
+from app.models.prompts.messages import MESSAGES, render, source_hash
+
+# Runtime side of the pre-translated message table. The table is built offline
+# by scripts/build_translations.py and loaded once; a lookup is a dict access
+# plus str.format. Strings missing from the table (new language, English text
+# edited since the last build) fall back to the translation LLM.
+
+TRANSLATIONS_PATH = os.path.join(os.path.dirname(__file__), "../models/prompts/translations.json")
+TABLE_SCHEMA_VERSION = 1
+
+# Fields whose values are English text produced at runtime (LLM output) and
+# still need translating; everything else (names, links) is inserted as is.
+TRANSLATED_FIELDS = {"recommendation"}
+
+class MessageCatalog:
+    def __init__(self, path: str = TRANSLATIONS_PATH):
+        self.path = path
+        self.version = None
+        self.templates: Dict[str, Dict[str, str]] = {}
+        self.stale = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            print(f"⚠️ No translation table at {self.path}; survey strings will be translated live.")
+            return
+        with open(self.path, encoding="utf-8") as f:
+            table = json.load(f)
+        if table.get("schema_version") != TABLE_SCHEMA_VERSION:
+            print(f"⚠️ Translation table schema {table.get('schema_version')} != {TABLE_SCHEMA_VERSION}; ignoring it.")
+            return
+
+        self.version = table.get("version")
+        current = {key: source_hash(text) for key, text in MESSAGES.items()}
+        for lang, entries in table.get("languages", {}).items():
+            templates = {}
+            for key, entry in entries.items():
+                # Skip translations of English text that has since been edited
+                if current.get(key) == entry.get("source_hash"):
+                    templates[key] = entry["text"]
+                else:
+                    self.stale += 1
+            self.templates[lang] = templates
+        if self.stale:
+            print(f"⚠️ {self.stale} stale translations ignored; re-run scripts/build_translations.py")
+
+    def lookup(self, key: str, lang: str) -> Optional[str]:
+        """
+        Returns the pre-translated template for `key`, or None if the table has none.
+        """
+        if lang == "en":
+            return MESSAGES[key]
+        return self.templates.get(lang, {}).get(key)
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def localize(self, key: str, lang: str, **fields) -> str:
+        """
+        Returns message `key` in `lang` with its placeholders filled.
+        """
+        if lang == "en":
+            return render(key, **fields)
+
+        template = self.lookup(key, lang)
+        self._count(template is not None)
+        if template is None:
+            from app.services.translation_service import translate_to_user_lang
+            return translate_to_user_lang(render(key, **fields), lang)
+
+        if TRANSLATED_FIELDS & fields.keys():
+            from app.services.translation_service import translate_to_user_lang
+            fields = {
+                name: translate_to_user_lang(value, lang) if name in TRANSLATED_FIELDS else value
+                for name, value in fields.items()
+            }
+        return template.format(**fields)
+
+    async def alocalize(self, key: str, lang: str, **fields) -> str:
+        """
+        Async variant of localize; live translations go through ainvoke.
+        """
+        if lang == "en":
+            return render(key, **fields)
+
+        from app.services.translation_service import atranslate_to_user_lang
+        template = self.lookup(key, lang)
+        self._count(template is not None)
+        if template is None:
+            return await atranslate_to_user_lang(render(key, **fields), lang)
+
+        for name in TRANSLATED_FIELDS & fields.keys():
+            fields[name] = await atranslate_to_user_lang(fields[name], lang)
+        return template.format(**fields)
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "languages": {lang: len(templates) for lang, templates in self.templates.items()},
+            "messages": len(MESSAGES),
+            "stale": self.stale,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_catalog() -> MessageCatalog:
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = MessageCatalog()
+    return _catalog
+
+def localize(key: str, lang: str, **fields) -> str:
+    return get_catalog().localize(key, lang, **fields)
+
+async def alocalize(key: str, lang: str, **fields) -> str:
+    return await get_catalog().alocalize(key, lang, **fields)
@@ -0,0 +1,418 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from app.services.llm_scheduler import SchedulerBusy, is_rate_limit_error, llm_scheduler
+from app.services.stand_ins import stand_in_enabled
+from app.utils.metrics import percentile, summarize_latencies
+
+# Routes each LLM call over an ordered list of candidates (Gemini for answers
+# with Groq as the alternate, the reverse for translation):
+#   - hedging: when the first candidate hasn't answered within the route's
+#     rolling HEDGE_PERCENTILE latency, the same request goes to the alternate;
+#     whichever answers first wins and the other call is cancelled. Hedges are
+#     capped at HEDGE_BUDGET of a route's calls so a slow provider can't double the load.
+#   - fallback: when a candidate fails (or its rate limits won't let the call
+#     start in time), the next one is tried at once.
+#   - circuit breaker: after BREAKER_FAILURES consecutive failures a provider is
+#     skipped for BREAKER_COOLDOWN seconds, then tried again (half-open) by a
+#     single probe call; the others skip it until the probe's outcome closes or
+#     re-opens the circuit.
+# Each call still takes its slot from llm_scheduler, and latencies are measured
+# from when the call is sent, so queueing behind our own rate limits never
+# triggers a hedge. Streamed routes race on the first chunk instead.
+
+HEDGING_ENABLED = os.getenv("PROVIDER_HEDGING", "true").lower() != "false"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+# Until a route has this many samples it hedges after HEDGE_DEFAULT_DELAY
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "4.0"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.3"))
+HEDGE_BUDGET = float(os.getenv("HEDGE_BUDGET", "0.1"))
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))
+LATENCY_WINDOW = 200
+
+# A provider is only routed to when it can be called
+PROVIDER_KEYS = {"gemini": "GOOGLE_API_KEY", "groq": "GROQ_API_KEY"}
+
+def provider_available(provider: str) -> bool:
+    return bool(os.getenv(PROVIDER_KEYS[provider])) or stand_in_enabled(provider)
+
+class Candidate(NamedTuple):
+    """
+    One way of serving a route. `call` makes the request: for acall it returns
+    an awaitable result, for astream an async iterator of chunks.
+    """
+    provider: str
+    model: str
+    call: Callable[[], Any]
+
+    @property
+    def key(self) -> str:
+        return f"{self.provider}/{self.model}"
+
+class NoProviderAvailable(ValueError):
+    """
+    None of the route's providers has an API key (or stand-in) configured.
+    """
+
+class CircuitProbing(RuntimeError):
+    """
+    The provider's circuit is half-open and its one probe call is still in flight.
+    """
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class CircuitBreaker:
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        # Half-open lets exactly one call through until it has an outcome
+        self.probing = False
+
+    def allow(self, now: float) -> bool:
+        if self.state == OPEN and now - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+        return self.state == CLOSED or (self.state == HALF_OPEN and not self.probing)
+
+    def claim(self, now: float) -> bool:
+        """
+        Called as a call starts. Returns whether it is the half-open probe;
+        raises CircuitProbing when another call already is.
+        """
+        self.allow(now)
+        if self.state != HALF_OPEN:
+            return False
+        if self.probing:
+            raise CircuitProbing("circuit half-open, probe call in flight")
+        self.probing = True
+        return True
+
+    def release(self):
+        # The probe ended without an outcome (cancelled, or never sent): let the next call probe
+        self.probing = False
+
+    def success(self):
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.probing = False
+
+    def failure(self, now: float):
+        self.consecutive_failures += 1
+        self.probing = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failures:
+            if self.state != OPEN:
+                self.opened += 1
+            self.state = OPEN
+            self.opened_at = now
+
+class _ProviderHealth:
+    def __init__(self):
+        self.breaker = CircuitBreaker()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.successes = 0
+        self.failures = 0
+        self.cancelled = 0
+        self.last_error = None
+
+class _RouteStats:
+    def __init__(self):
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.fallbacks = 0
+        self.failed = 0
+        self.winners: Dict[str, int] = {}
+        # candidate key -> latencies of this route's calls to it
+        self.latencies: Dict[str, deque] = {}
+
+class ProviderRouter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._health: Dict[str, _ProviderHealth] = {}
+        self._routes: Dict[str, _RouteStats] = {}
+
+    def _provider(self, key: str) -> _ProviderHealth:
+        health = self._health.get(key)
+        if health is None:
+            health = self._health[key] = _ProviderHealth()
+        return health
+
+    def _route(self, route: str) -> _RouteStats:
+        stats = self._routes.get(route)
+        if stats is None:
+            stats = self._routes[route] = _RouteStats()
+        return stats
+
+    def _order(self, candidates: List[Candidate]) -> List[Candidate]:
+        """
+        Available candidates with a closed (or half-open, not yet probed) circuit, in
+        preference order; if every circuit is open, all available ones (failing fast
+        helps nobody). A half-open candidate whose probe is in flight fails fast in _send.
+        """
+        available = [c for c in candidates if provider_available(c.provider)]
+        if not available:
+            names = " or ".join(PROVIDER_KEYS[c.provider] for c in candidates)
+            raise NoProviderAvailable(f"No LLM provider configured: set {names}.")
+        now = time.monotonic()
+        with self._lock:
+            healthy = [c for c in available if self._provider(c.key).breaker.allow(now)]
+        return healthy or available
+
+    def hedge_delay(self, route: str, candidate: Candidate) -> float:
+        """
+        Seconds to wait on `candidate` before hedging: its rolling HEDGE_PERCENTILE latency on this route.
+        """
+        with self._lock:
+            samples = list(self._route(route).latencies.get(candidate.key, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return max(percentile(samples, HEDGE_PERCENTILE), HEDGE_MIN_DELAY)
+
+    def _may_hedge(self, route: str) -> bool:
+        with self._lock:
+            stats = self._route(route)
+            if stats.hedged + 1 > max(1.0, HEDGE_BUDGET * stats.calls):
+                return False
+            stats.hedged += 1
+            return True
+
+    def _claim(self, candidate: Candidate) -> bool:
+        with self._lock:
+            return self._provider(candidate.key).breaker.claim(time.monotonic())
+
+    def _release(self, candidate: Candidate):
+        with self._lock:
+            self._provider(candidate.key).breaker.release()
+
+    def _record(self, route: str, candidate: Candidate, latency: Optional[float] = None,
+                error: Optional[BaseException] = None, cancelled: bool = False, streamed: bool = False):
+        with self._lock:
+            health = self._provider(candidate.key)
+            if error is not None:
+                health.failures += 1
+                health.last_error = f"{type(error).__name__}: {error}"[:200]
+                health.breaker.failure(time.monotonic())
+                return
+            if cancelled:
+                health.cancelled += 1
+            else:
+                health.successes += 1
+                health.breaker.success()
+            # A hedged loser's time is only a lower bound, but leaving it out would
+            # hide exactly the slow calls and pull the percentile (and hedge delay) down.
+            # Per-provider latency is whole calls only (a stream's first chunk says little about it).
+            if not streamed:
+                health.latencies.append(latency)
+            self._route(route).latencies.setdefault(candidate.key, deque(maxlen=LATENCY_WINDOW)).append(latency)
+
+    async def _send(self, route: str, candidate: Candidate, tokens: int, priority: Optional[int],
+                    sent: asyncio.Event, start_call: Callable[[], Awaitable[Any]], streamed: bool = False) -> Any:
+        """
+        Takes a scheduler slot for `candidate`, sets `sent`, then awaits `start_call()`
+        (the whole call, or a stream's first chunk) and records the outcome.
+        SchedulerBusy is the caller's limit and CircuitProbing another call's
+        probe, not the provider failing, so neither is recorded.
+        """
+        probe = self._claim(candidate)
+        try:
+            await llm_scheduler.aacquire(candidate.provider, candidate.model, tokens, priority)
+        except BaseException:
+            if probe:
+                self._release(candidate)
+            raise
+        sent.set()
+        start = time.perf_counter()
+        try:
+            result = await start_call()
+        except asyncio.CancelledError:
+            if probe:
+                self._release(candidate)
+            self._record(route, candidate, latency=time.perf_counter() - start, cancelled=True, streamed=streamed)
+            raise
+        except Exception as e:
+            if is_rate_limit_error(e):
+                llm_scheduler.throttled(candidate.provider, candidate.model)
+            self._record(route, candidate, error=e)
+            raise
+        self._record(route, candidate, latency=time.perf_counter() - start, streamed=streamed)
+        return result
+
+    async def _race(self, route: str, candidates: List[Candidate], tokens: int, priority: Optional[int],
+                    start_call: Callable[[Candidate], Callable[[], Awaitable[Any]]], streamed: bool = False
+                    ) -> Tuple[Candidate, Any, List[Tuple[asyncio.Task, Candidate]]]:
+        """
+        Runs the hedge/fallback race. Returns the winning candidate, its result
+        and the finished losing attempts (whose results the caller may need to release).
+        """
+        ordered = self._order(candidates)
+        with self._lock:
+            stats = self._route(route)
+            stats.calls += 1
+        waiting = list(ordered)
+        tasks: Dict[asyncio.Task, Candidate] = {}
+        finished: List[Tuple[asyncio.Task, Candidate]] = []
+        errors: List[BaseException] = []
+        loop = asyncio.get_running_loop()
+
+        def launch() -> Tuple[asyncio.Task, asyncio.Event]:
+            candidate = waiting.pop(0)
+            sent = asyncio.Event()
+            task = asyncio.create_task(self._send(route, candidate, tokens, priority, sent,
+                                                  start_call(candidate), streamed))
+            tasks[task] = candidate
+            return task, sent
+
+        primary, sent = launch()
+        hedge_at = None
+        hedge_denied = False
+        try:
+            while tasks:
+                if hedge_at is None and sent.is_set():
+                    delay = self.hedge_delay(route, ordered[0])
+                    hedge_at = loop.time() + delay
+                can_hedge = HEDGING_ENABLED and not hedge_denied and waiting and len(tasks) == 1 and primary in tasks
+                if can_hedge and hedge_at is not None:
+                    timeout = max(hedge_at - loop.time(), 0)
+                    done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                elif can_hedge:
+                    # The hedge clock starts once the primary call is actually sent
+                    sent_wait = asyncio.create_task(sent.wait())
+                    done, _ = await asyncio.wait(set(tasks) | {sent_wait}, return_when=asyncio.FIRST_COMPLETED)
+                    sent_wait.cancel()
+                    done.discard(sent_wait)
+                else:
+                    done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    if hedge_at is not None and loop.time() >= hedge_at:
+                        if self._may_hedge(route):
+                            print(f"⏱️ {route}: no reply from {ordered[0].key} in {delay:.2f}s, hedging to {waiting[0].key}")
+                            launch()
+                        else:
+                            hedge_denied = True
+                    continue
+
+                for task in done:
+                    candidate = tasks.pop(task)
+                    if task.exception() is None:
+                        winner = (candidate, task.result())
+                        break
+                    errors.append(task.exception())
+                else:
+                    if not tasks and waiting:
+                        if not isinstance(errors[-1], (SchedulerBusy, CircuitProbing)):
+                            print(f"⚠️ {route}: {candidate.key} failed ({errors[-1]}), falling back to {waiting[0].key}")
+                        with self._lock:
+                            self._route(route).fallbacks += 1
+                        launch()
+                    continue
+
+                with self._lock:
+                    stats.winners[winner[0].key] = stats.winners.get(winner[0].key, 0) + 1
+                    if winner[0] != ordered[0] and len(errors) == 0:
+                        stats.hedge_wins += 1
+                finished.extend((t, c) for t, c in tasks.items() if t.done() and not t.cancelled() and t.exception() is None)
+                return winner[0], winner[1], finished
+            with self._lock:
+                stats.failed += 1
+            raise errors[0] if isinstance(errors[-1], (SchedulerBusy, CircuitProbing)) else errors[-1]
+        finally:
+            for task in tasks:
+                if task.done() and not task.cancelled():
+                    task.exception()  # retrieved: a loser failing too is no news
+                task.cancel()
+
+    async def acall(self, route: str, candidates: List[Candidate], tokens: int, priority: Optional[int] = None) -> Any:
+        """
+        Returns the first successful result of `candidate.call()` across the candidates (see module notes).
+        """
+        _, result = await self.acall_candidate(route, candidates, tokens, priority)
+        return result
+
+    async def acall_candidate(self, route: str, candidates: List[Candidate], tokens: int,
+                              priority: Optional[int] = None) -> Tuple[Candidate, Any]:
+        """
+        Like acall, but also returns the candidate that answered (for callers
+        that cache results per model).
+        """
+        candidate, result, _ = await self._race(route, candidates, tokens, priority, lambda c: c.call)
+        return candidate, result
+
+    async def astream(self, route: str, candidates: List[Candidate], tokens: int,
+                      priority: Optional[int] = None) -> AsyncIterator[Any]:
+        """
+        Streams from whichever candidate yields its first chunk first (hedging
+        on time to first chunk). Once a chunk has been passed on, the stream
+        stays with that candidate; a later error propagates.
+        """
+        def start_call(candidate: Candidate):
+            async def first_chunk():
+                stream = candidate.call().__aiter__()
+                try:
+                    return stream, await stream.__anext__()
+                except StopAsyncIteration:
+                    return stream, None
+                except BaseException:
+                    await stream.aclose()
+                    raise
+            return first_chunk
+
+        candidate, (stream, first), losers = await self._race(route, candidates, tokens, priority, start_call,
+                                                              streamed=True)
+        for task, _ in losers:
+            await task.result()[0].aclose()
+        if first is None:
+            return
+        try:
+            yield first
+            async for chunk in stream:
+                yield chunk
+        except Exception as e:
+            self._record(route, candidate, error=e)
+            raise
+        finally:
+            await stream.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            providers = {}
+            for key, health in self._health.items():
+                health.breaker.allow(now)
+                providers[key] = {
+                    "circuit": health.breaker.state,
+                    "circuit_opened": health.breaker.opened,
+                    "successes": health.successes,
+                    "failures": health.failures,
+                    "cancelled": health.cancelled,
+                    "last_error": health.last_error,
+                    "latency": summarize_latencies(health.latencies),
+                }
+            routes = {
+                route: {
+                    "calls": s.calls,
+                    "hedged": s.hedged,
+                    "hedge_wins": s.hedge_wins,
+                    "fallbacks": s.fallbacks,
+                    "failed": s.failed,
+                    "winners": dict(s.winners),
+                    "latency": {key: summarize_latencies(values) for key, values in s.latencies.items()},
+                }
+                for route, s in self._routes.items()
+            }
+        return {"hedging": HEDGING_ENABLED, "hedge_percentile": HEDGE_PERCENTILE,
+                "providers": providers, "routes": routes}
+
+provider_router = ProviderRouter()
+
+def get_router_stats() -> Dict[str, Any]:
+    return provider_router.stats()
@@ -1,72 +1,184 @@
 import os
+import re
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, List, Optional
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda
+from app.rag import registry
 from app.rag.retrieval import get_retriever
+from app.rag.context_packing import CONTEXT_TOKEN_BUDGET, pack_documents
+from app.services.chain_registry import chain_registry
+from app.services.semantic_cache import get_semantic_cache
+from app.utils.executor import run_blocking
+from app.utils.singleflight import SingleFlight, flight_key
+from app.utils.tokens import estimate_tokens
+from app.services.llm_scheduler import llm_scheduler, gemini_model, groq_model, BACKGROUND
+from app.services.stand_ins import StandInChatModel, stand_in_enabled
+from app.services.provider_router import Candidate, provider_router
+from app.services.translation_service import get_translator_llm
 
 load_dotenv()
 
-def get_llm():
-    """
-    Returns the Google Gemini LLM instance.
-    """
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found in environment variables.")
-    
+THINK_RE = re.compile(r'<think>.*?</think>', flags=re.DOTALL)
+
+# Token budget per call for the rate limiter, where the retrieved context and
+# the answer aren't known before the call (packed context never exceeds its budget)
+RAG_CONTEXT_TOKENS = CONTEXT_TOKEN_BUDGET
+RAG_ANSWER_TOKENS = int(os.getenv("RAG_ANSWER_TOKENS", "600"))
+
+def _build_llm():
+    if stand_in_enabled("gemini"):
+        return StandInChatModel(provider="gemini", model=gemini_model())
     return ChatGoogleGenerativeAI(
-        google_api_key=api_key,
-        model="gemini-1.5-flash",
+        google_api_key=os.getenv("GOOGLE_API_KEY"),
+        model=gemini_model(),
         temperature=0.3
     )
 
-def query_agent(question: str):
+def get_llm():
     """
-    Queries the RAG agent with a question.
+    Returns the shared Google Gemini LLM instance.
+    The client (and its open connection) is reused across requests and rebuilt
+    only when GEMINI_MODEL or GOOGLE_API_KEY change.
     """
-    llm = get_llm()
-    retriever = get_retriever()
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if not api_key and not stand_in_enabled("gemini"):
+        raise ValueError("GOOGLE_API_KEY not found in environment variables.")
     
-    system_prompt = (
-        "You are an expert, warm, and highly intelligent Rural Insurance Advisor named 'Suraksha Sahayak'. "
-        "Your mission is to empower rural families with clear, actionable insurance advice. "
-        "\n\n"
-        "**Core Guidelines:**\n"
-        "1.  **Be Relatable**: Speak like a trusted, wise friend. Use analogies if it helps."
-        "\n2.  **Simplify Ruthlessly**: Never use jargon like 'premium' or 'sum assured' without instantly explaining it in simple words."
-        "\n3.  **Answer Directly**: Start your answer immediately. Do NOT repeat the question or say 'Here is the answer'."
-        "\n4.  **Empathy First**: If the user mentions a problem (crops, illness), acknowledge it before answering."
-        "\n5.  **Context Aware**: Use the provided documents to answer. If the answer isn't there, say you don't know but offer general wisdom."
-        "\n\n"
-        "**Context:**\n"
-        "{context}"
-    )
+    return chain_registry.get("gemini_llm")
+
+QUERY_SYSTEM_PROMPT = (
+    "You are an expert, warm, and highly intelligent Rural Insurance Advisor named 'Suraksha Sahayak'. "
+    "Your mission is to empower rural families with clear, actionable insurance advice. "
+    "\n\n"
+    "**Core Guidelines:**\n"
+    "1.  **Be Relatable**: Speak like a trusted, wise friend. Use analogies if it helps."
+    "\n2.  **Simplify Ruthlessly**: Never use jargon like 'premium' or 'sum assured' without instantly explaining it in simple words."
+    "\n3.  **Answer Directly**: Start your answer immediately. Do NOT repeat the question or say 'Here is the answer'."
+    "\n4.  **Empathy First**: If the user mentions a problem (crops, illness), acknowledge it before answering."
+    "\n5.  **Context Aware**: Use the provided documents to answer. If the answer isn't there, say you don't know but offer general wisdom."
+    "\n\n"
+    "**Context:**\n"
+    "{context}"
+)
+
+RECOMMEND_SYSTEM_PROMPT = (
+    "You are the senior-most Insurance Strategist for rural India. "
+    "Analyze the user's profile deeply and recommend the single best policy from the context. "
+    "\n\n"
+    "**Your Response Logic:**"
+    "\n1.  **Acknowledge the Situation**: 'I see you are a farmer with a family of 4...'"
+    "\n2.  **The Perfect Match**: 'Based on your worry about crop failure, I strongly recommend...'"
+    "\n3.  **Why?**: Explain the specific benefits (low cost, high coverage) that matter to *them*."
+    "\n4.  **Next Steps**: Encouragingly tell them how to proceed."
+    "\n\n"
+    "Make the recommendation feel personalized and confident."
+    "\n\nContext:\n{context}"
+)
 
+def _build_answer_chain(system_prompt: str, human_template: str, llm=None):
     prompt = ChatPromptTemplate.from_messages(
         [
             ("system", system_prompt),
-            ("human", "{input}"),
+            ("human", human_template),
         ]
     )
-    
-    question_answer_chain = create_stuff_documents_chain(llm, prompt)
-    rag_chain = create_retrieval_chain(retriever, question_answer_chain)
-    
-    response = rag_chain.invoke({"input": question})
-    
-    # Extract sources
+    return create_stuff_documents_chain(llm or get_llm(), prompt)
+
+def _build_rag_chain(system_prompt: str, human_template: str):
+    # retrieve -> pack (merge, de-duplicate, fit the token budget) -> stuff into the prompt
+    retrieval = (lambda inputs: inputs["input"]) | get_retriever() | RunnableLambda(pack_documents)
+    question_answer_chain = _build_answer_chain(system_prompt, human_template)
+    return create_retrieval_chain(retrieval, question_answer_chain)
+
+def _chain_config(prompt_name: str):
+    # Rebuild when the model, the prompt text or the vector store instance changes
+    return lambda: (gemini_model(), os.getenv("GOOGLE_API_KEY"), globals()[prompt_name], id(registry.get_vectorstore()))
+
+chain_registry.register(
+    "gemini_llm", _build_llm,
+    lambda: (gemini_model(), os.getenv("GOOGLE_API_KEY"))
+)
+chain_registry.register(
+    "query", lambda: _build_rag_chain(QUERY_SYSTEM_PROMPT, "{input}"),
+    _chain_config("QUERY_SYSTEM_PROMPT")
+)
+chain_registry.register(
+    "recommend", lambda: _build_rag_chain(RECOMMEND_SYSTEM_PROMPT, "User Profile: {input}"),
+    _chain_config("RECOMMEND_SYSTEM_PROMPT")
+)
+
+def _register_answer_chain(name: str, prompt_name: str, human_template: str):
+    # Answer step alone, for callers that already have the context documents.
+    # "<name>@groq" is the same prompt on Groq, the provider router's alternate.
+    chain_registry.register(
+        name, lambda: _build_answer_chain(globals()[prompt_name], human_template),
+        lambda: (gemini_model(), os.getenv("GOOGLE_API_KEY"), globals()[prompt_name])
+    )
+    chain_registry.register(
+        f"{name}@groq", lambda: _build_answer_chain(globals()[prompt_name], human_template, get_translator_llm()),
+        lambda: (groq_model(), os.getenv("GROQ_API_KEY"), globals()[prompt_name])
+    )
+
+_register_answer_chain("query_answer", "QUERY_SYSTEM_PROMPT", "{input}")
+_register_answer_chain("recommend_answer", "RECOMMEND_SYSTEM_PROMPT", "User Profile: {input}")
+
+def _answer_candidates(chain_name: str, inputs: Dict[str, Any], stream: bool = False) -> List[Candidate]:
+    """
+    Gemini first, the same chain on Groq as its hedge/fallback (see app.services.provider_router).
+    """
+    def call(name: str):
+        if stream:
+            async def run():
+                chain = await run_blocking(chain_registry.get, name)
+                async for token in chain.astream(inputs):
+                    yield token
+        else:
+            async def run():
+                chain = await run_blocking(chain_registry.get, name)
+                return await chain.ainvoke(inputs)
+        return run
+
+    return [Candidate("gemini", gemini_model(), call(chain_name)),
+            Candidate("groq", groq_model(), call(f"{chain_name}@groq"))]
+
+def _rag_tokens(system_prompt: str, text: str, docs: Optional[List[Document]] = None) -> int:
+    context = estimate_tokens(*(doc.page_content for doc in docs)) if docs is not None else RAG_CONTEXT_TOKENS
+    return estimate_tokens(system_prompt, text) + context + RAG_ANSWER_TOKENS
+
+def _build_query_chain():
+    get_llm()  # fail fast on a missing API key
+    return chain_registry.get("query")
+
+def _extract_sources(docs) -> list:
     sources = []
-    if "context" in response:
-        for doc in response["context"]:
-            source_name = doc.metadata.get("source", "Unknown")
-            page_num = doc.metadata.get("page", "N/A")
-            sources.append(f"{os.path.basename(source_name)} (Page {page_num})")
-            
-    import re
-    cleaned_answer = re.sub(r'<think>.*?</think>', '', response["answer"], flags=re.DOTALL).strip()
-    
+    for doc in docs:
+        source_name = doc.metadata.get("source", "Unknown")
+        page_num = doc.metadata.get("page", "N/A")
+        sources.append(f"{os.path.basename(source_name)} (Page {page_num})")
+    return list(set(sources)) # Unique sources
+
+def _with_packing_report(result: dict, context) -> dict:
+    """
+    Adds this request's context packing figures to the answer (not to what the semantic cache stores).
+    """
+    report = getattr(context, "report", None)
+    if report is None:
+        return result
+    print(f"📦 Context packed: {report['tokens_in']} -> {report['tokens_out']} tokens "
+          f"({report['chunks_in']} chunks -> {report['chunks_out']} passages)")
+    return {**result, "context_packing": report}
+
+def _finalise_answer(answer: str, sources: list) -> dict:
+    """
+    Strips <think> blocks and handles the [NO_RAG] tag (chit-chat: no sources).
+    """
+    cleaned_answer = THINK_RE.sub('', answer).strip()
+
     # Check for [NO_RAG] tag
     if "[NO_RAG]" in cleaned_answer:
         cleaned_answer = cleaned_answer.replace("[NO_RAG]", "").strip()
@@ -74,9 +186,118 @@ def query_agent(question: str):
 
     return {
         "answer": cleaned_answer,
-        "sources": list(set(sources)) # Unique sources
+        "sources": sources
     }
 
+# Identical questions asked at the same time (a campaign blast) share one answer
+_query_flight = SingleFlight("query_agent")
+
+def query_agent(question: str):
+    """
+    Queries the RAG agent with a question.
+    Semantically repeated questions are answered from the semantic cache, and
+    concurrent identical ones share a single in-flight call.
+    """
+    return _query_flight.do(flight_key(question, gemini_model()), lambda: _query_agent(question))
+
+def _query_agent(question: str):
+    cache = get_semantic_cache()
+    if cache:
+        query_vector = cache.embed(question)
+        cached = cache.get(query_vector)
+        if cached:
+            print(f"⚡ Semantic cache hit ({cached['cache_similarity']})")
+            return cached
+
+    rag_chain = _build_query_chain()
+    response = llm_scheduler.call("gemini", gemini_model(), _rag_tokens(QUERY_SYSTEM_PROMPT, question),
+                                  lambda: rag_chain.invoke({"input": question}))
+
+    result = _finalise_answer(response["answer"], _extract_sources(response.get("context", [])))
+    if cache:
+        cache.put(question, query_vector, result)
+
+    return _with_packing_report(result, response.get("context"))
+
+async def _acache_lookup(question: str):
+    """
+    Semantic cache lookup off the event loop (embedding the question is CPU work).
+    Returns (cache, query_vector, cached_result); all None when the cache is disabled.
+    """
+    cache = get_semantic_cache()
+    if not cache:
+        return None, None, None
+    query_vector = await run_blocking(cache.embed, question)
+    return cache, query_vector, await run_blocking(cache.get, query_vector)
+
+async def aretrieve(question: str) -> List[Document]:
+    """
+    Retrieves the context documents for a question on the blocking executor.
+    Cancelling the awaiting task frees the caller; the search itself runs to completion.
+    """
+    retriever = await run_blocking(get_retriever)
+    return await run_blocking(retriever.invoke, question)
+
+async def aquery_agent(question: str, retrieved: Optional[Callable[[], Awaitable[List[Document]]]] = None):
+    """
+    Async variant of query_agent: the answer goes through ainvoke, so a slow
+    answer doesn't hold up the event loop, and through the provider router, so
+    a stalled or failing Gemini call is hedged to / replaced by Groq.
+    `retrieved`, if given, returns the context documents for this question from a
+    retrieval already under way (see app.workflows.pipeline); it is only awaited
+    on a semantic cache miss.
+    """
+    return await _query_flight.ado(flight_key(question, gemini_model()), lambda: _aquery_agent(question, retrieved))
+
+async def _aquery_agent(question: str, retrieved: Optional[Callable[[], Awaitable[List[Document]]]]):
+    cache, query_vector, cached = await _acache_lookup(question)
+    if cached:
+        print(f"⚡ Semantic cache hit ({cached['cache_similarity']})")
+        return cached
+
+    # Retrieval (unless already under way) then the answer, routed between providers
+    docs = pack_documents(await (retrieved or (lambda: aretrieve(question)))())
+    answer = await provider_router.acall("rag_answer", _answer_candidates("query_answer", {"input": question, "context": docs}),
+                                         _rag_tokens(QUERY_SYSTEM_PROMPT, question, docs))
+
+    result = _finalise_answer(answer, _extract_sources(docs))
+    if cache:
+        await run_blocking(cache.put, question, query_vector, result)
+
+    return _with_packing_report(result, docs)
+
+async def astream_query_agent(question: str,
+                              retrieved: Optional[Callable[[], Awaitable[List[Document]]]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of query_agent. Yields events as they become available:
+      {"event": "retrieved", "sources": [...]}   once the context documents are in
+      {"event": "token", "text": "..."}           for each answer fragment
+      {"event": "answer", "answer": ..., "sources": [...]}   the cleaned final answer
+    `retrieved` is as for aquery_agent.
+    """
+    cache, query_vector, cached = await _acache_lookup(question)
+    if cached:
+        print(f"⚡ Semantic cache hit ({cached['cache_similarity']})")
+        yield {"event": "retrieved", "sources": cached["sources"]}
+        yield {"event": "answer", "answer": cached["answer"], "sources": cached["sources"]}
+        return
+
+    answer_parts = []
+    context = pack_documents(await (retrieved or (lambda: aretrieve(question)))())
+    sources = _extract_sources(context)
+    yield {"event": "retrieved", "sources": sources}
+    candidates = _answer_candidates("query_answer", {"input": question, "context": context}, stream=True)
+    async for token in provider_router.astream("rag_answer_stream", candidates,
+                                               _rag_tokens(QUERY_SYSTEM_PROMPT, question, context)):
+        if token:
+            answer_parts.append(token)
+            yield {"event": "token", "text": token}
+
+    result = _finalise_answer("".join(answer_parts), sources)
+    if cache:
+        await run_blocking(cache.put, question, query_vector, result)
+    yield {"event": "answer", **_with_packing_report(result, context)}
+
 def recommend_products(profile: str):
     """
     Generates insurance product recommendations based on a user profile.
@@ -84,38 +305,24 @@ def recommend_products(profile: str):
     but ideally checking the context if possible. 
     For now, we use a direct prompt with the retriever context to 'find' the best product.
     """
-    llm = get_llm()
-    retriever = get_retriever()
-    
-    system_prompt = (
-        "You are the senior-most Insurance Strategist for rural India. "
-        "Analyze the user's profile deeply and recommend the single best policy from the context. "
-        "\n\n"
-        "**Your Response Logic:**"
-        "\n1.  **Acknowledge the Situation**: 'I see you are a farmer with a family of 4...'"
-        "\n2.  **The Perfect Match**: 'Based on your worry about crop failure, I strongly recommend...'"
-        "\n3.  **Why?**: Explain the specific benefits (low cost, high coverage) that matter to *them*."
-        "\n4.  **Next Steps**: Encouragingly tell them how to proceed."
-        "\n\n"
-        "Make the recommendation feel personalized and confident."
-        "\n\nContext:\n{context}"
-    )
-    
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            ("system", system_prompt),
-            ("human", "User Profile: {input}"),
-        ]
-    )
-    
     # We use the StuffDocumentsChain pattern again but focused on recommendation
-    question_answer_chain = create_stuff_documents_chain(llm, prompt)
-    rag_chain = create_retrieval_chain(retriever, question_answer_chain)
+    get_llm()  # fail fast on a missing API key
+    rag_chain = chain_registry.get("recommend")
     
     # Search for products relevant to the profile keywords
-    response = rag_chain.invoke({"input": profile})
+    # Recommendations are background work: chat turns go first under rate limits
+    response = llm_scheduler.call("gemini", gemini_model(), _rag_tokens(RECOMMEND_SYSTEM_PROMPT, profile),
+                                  lambda: rag_chain.invoke({"input": profile}), priority=BACKGROUND)
     
-    import re
-    cleaned_answer = re.sub(r'<think>.*?</think>', '', response["answer"], flags=re.DOTALL).strip()
+    cleaned_answer = THINK_RE.sub('', response["answer"]).strip()
     
     return cleaned_answer
+
+async def arecommend_products(profile: str):
+    """
+    Async variant of recommend_products (ainvoke, routed like aquery_agent).
+    """
+    docs = pack_documents(await aretrieve(profile))
+    answer = await provider_router.acall("recommend", _answer_candidates("recommend_answer", {"input": profile, "context": docs}),
+                                         _rag_tokens(RECOMMEND_SYSTEM_PROMPT, profile, docs), priority=BACKGROUND)
+    return THINK_RE.sub('', answer).strip()
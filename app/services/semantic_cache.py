@@ -0,0 +1,253 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List
+import numpy as np
+
+from app.rag import registry
+
+# Semantic answer cache in front of query_agent.
+# A question whose embedding is close enough (cosine) to an answered one
+# reuses that answer instead of paying for another Gemini call.
+
+CACHE_DB_PATH = os.path.join(os.path.dirname(__file__), "../../semantic_cache.db")
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "true").lower() != "false"
+SIMILARITY_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL", str(24 * 3600)))
+MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+
+def _normalise(vector) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm else v
+
+class SemanticCache:
+    """
+    Two-tier (memory LRU + SQLite) cache of RAG answers keyed by query embedding.
+    Entries expire after `ttl_seconds` and are dropped wholesale when the
+    vector index version changes.
+    """
+    def __init__(self, db_path: str = CACHE_DB_PATH, threshold: float = SIMILARITY_THRESHOLD,
+                 ttl_seconds: int = TTL_SECONDS, max_entries: int = MAX_ENTRIES,
+                 version_fn=registry.get_index_version, embed_fn=None):
+        self.db_path = db_path
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._version_fn = version_fn
+        self._embed_fn = embed_fn or (lambda text: registry.get_embeddings().embed_query(text))
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._keys: List[str] = []
+        self._index_version = self._version_fn()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._init_db()
+        self._load_from_disk()
+
+    # --- Disk tier ---
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS semantic_cache (
+                key TEXT PRIMARY KEY,
+                question TEXT,
+                vector BLOB,
+                answer TEXT,
+                sources TEXT,
+                created_at REAL,
+                last_hit REAL,
+                index_version TEXT
+            )
+        """)
+        conn.commit()
+        conn.close()
+
+    def _load_from_disk(self):
+        """
+        Warm the memory tier with the most recently used, still valid entries.
+        """
+        cutoff = time.time() - self.ttl_seconds
+        conn = self._connect()
+        conn.execute(
+            "DELETE FROM semantic_cache WHERE index_version != ? OR created_at < ?",
+            (self._index_version, cutoff)
+        )
+        conn.commit()
+        rows = conn.execute(
+            "SELECT key, question, vector, answer, sources, created_at FROM semantic_cache "
+            "ORDER BY last_hit DESC LIMIT ?", (self.max_entries,)
+        ).fetchall()
+        conn.close()
+
+        for key, question, vector, answer, sources, created_at in reversed(rows):
+            self._entries[key] = {
+                "question": question,
+                "vector": np.frombuffer(vector, dtype=np.float32),
+                "answer": answer,
+                "sources": json.loads(sources),
+                "created_at": created_at,
+            }
+        self._matrix = None
+
+    def _write_entry(self, key: str, entry: Dict[str, Any]):
+        conn = self._connect()
+        conn.execute("""
+            INSERT OR REPLACE INTO semantic_cache
+            (key, question, vector, answer, sources, created_at, last_hit, index_version)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, (key, entry["question"], entry["vector"].tobytes(), entry["answer"],
+              json.dumps(entry["sources"]), entry["created_at"], time.time(), self._index_version))
+        conn.commit()
+        conn.close()
+
+    def _delete_keys(self, keys: List[str]):
+        if not keys:
+            return
+        conn = self._connect()
+        conn.executemany("DELETE FROM semantic_cache WHERE key = ?", [(k,) for k in keys])
+        conn.commit()
+        conn.close()
+
+    # --- Memory tier ---
+
+    def _check_index_version(self):
+        version = self._version_fn()
+        if version != self._index_version:
+            self._index_version = version
+            self._entries.clear()
+            self._matrix = None
+            self.invalidations += 1
+            conn = self._connect()
+            conn.execute("DELETE FROM semantic_cache")
+            conn.commit()
+            conn.close()
+            print("♻️ Semantic cache invalidated (index changed)")
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [k for k, e in self._entries.items() if e["created_at"] < cutoff]
+        for k in expired:
+            del self._entries[k]
+        if expired:
+            self._matrix = None
+            self._delete_keys(expired)
+
+    def _similarity_matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            self._keys = list(self._entries.keys())
+            self._matrix = np.stack([self._entries[k]["vector"] for k in self._keys])
+        return self._matrix
+
+    def embed(self, question: str) -> np.ndarray:
+        """
+        Returns the normalised embedding used as the cache key.
+        """
+        return _normalise(self._embed_fn(question))
+
+    def get(self, query_vector: np.ndarray) -> Optional[Dict[str, Any]]:
+        """
+        Returns a cached {"answer", "sources"} for a semantically similar question, or None.
+        """
+        with self._lock:
+            self._check_index_version()
+            self._expire()
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            scores = self._similarity_matrix() @ query_vector
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            key = self._keys[best]
+            entry = self._entries[key]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return {
+                "answer": entry["answer"],
+                "sources": list(entry["sources"]),
+                "cache_similarity": round(float(scores[best]), 4),
+            }
+
+    def put(self, question: str, query_vector: np.ndarray, result: Dict[str, Any]):
+        """
+        Stores an answer for `question` and evicts least recently used entries beyond the cap.
+        """
+        key = hashlib.sha1(question.strip().lower().encode()).hexdigest()
+        entry = {
+            "question": question,
+            "vector": np.asarray(query_vector, dtype=np.float32),
+            "answer": result.get("answer", ""),
+            "sources": list(result.get("sources", [])),
+            "created_at": time.time(),
+        }
+        with self._lock:
+            self._check_index_version()
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                evicted.append(old_key)
+            self.evictions += len(evicted)
+            self._matrix = None
+            self._write_entry(key, entry)
+            self._delete_keys(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            conn = self._connect()
+            conn.execute("DELETE FROM semantic_cache")
+            conn.commit()
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "threshold": self.threshold,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+_cache: Optional[SemanticCache] = None
+_cache_lock = threading.Lock()
+
+def get_semantic_cache() -> Optional[SemanticCache]:
+    """
+    Returns the process-wide semantic cache, or None when disabled via SEMANTIC_CACHE=false.
+    """
+    global _cache
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticCache()
+    return _cache
+
+def get_cache_stats() -> Dict[str, Any]:
+    cache = get_semantic_cache()
+    return cache.stats() if cache else {"enabled": False}
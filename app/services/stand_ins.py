@@ -0,0 +1,330 @@
+import io
+import os
+import math
+import time
+import uuid
+import wave
+import random
+import asyncio
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, quote, urlparse
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from app.utils.metrics import summarize_latencies
+
+# Local stand-ins for the paid/quota-limited providers, for load tests of the
+# API server. PROVIDER_STAND_INS picks which ones replace the real client:
+#   PROVIDER_STAND_INS=all                  every provider below
+#   PROVIDER_STAND_INS=gemini,groq,whisper  just these
+# Providers: gemini (RAG/recommendation LLM), groq (translation LLM),
+# whisper (Groq speech-to-text), edge_tts (voice replies), twilio (WhatsApp
+# send and media download).
+# Each call waits a latency drawn from a lognormal fitted to the configured
+# median and p95 and fails at the configured rates, per provider:
+#   STAND_IN_GEMINI_LATENCY_MS=1200,3500    p50,p95
+#   STAND_IN_GEMINI_ERROR_RATE=0.02         share of calls failing with HTTP 503
+#   STAND_IN_GEMINI_RATE_LIMIT_RATE=0.01    share failing with HTTP 429
+# The replies are shaped like the real ones (translations echo their text,
+# RAG answers quote the packed context) so every downstream stage still runs.
+
+PROVIDERS = ("gemini", "groq", "whisper", "edge_tts", "twilio")
+DEFAULT_LATENCY_MS = {
+    "gemini": (1200, 3500),
+    "groq": (350, 900),
+    "whisper": (700, 1800),
+    "edge_tts": (500, 1400),
+    "twilio": (150, 400),
+}
+# Words in a stand-in RAG answer or recommendation
+ANSWER_WORDS = int(os.getenv("STAND_IN_ANSWER_WORDS", "80"))
+# Outgoing WhatsApp messages are POSTed here (the load generator listens on it)
+TWILIO_CALLBACK_URL = os.getenv("STAND_IN_TWILIO_CALLBACK")
+# Voice notes carry their "spoken" text after this marker (see voice_note_bytes)
+TRANSCRIPT_MARKER = b"STAND-IN-TRANSCRIPT:"
+DEFAULT_TRANSCRIPT = "What does crop insurance cover?"
+STATS_WINDOW = 1000
+
+_Z95 = 1.6449  # standard normal 95th percentile
+
+def _enabled_providers() -> set:
+    names = {name.strip().lower() for name in os.getenv("PROVIDER_STAND_INS", "").split(",") if name.strip()}
+    if "all" in names:
+        return set(PROVIDERS)
+    unknown = names - set(PROVIDERS)
+    if unknown:
+        print(f"⚠️ Unknown PROVIDER_STAND_INS entries ignored: {sorted(unknown)}")
+    return names & set(PROVIDERS)
+
+ENABLED = _enabled_providers()
+
+def stand_in_enabled(provider: str) -> bool:
+    return provider in ENABLED
+
+class StandInError(Exception):
+    """
+    A simulated provider failure; carries status_code like the real SDK errors
+    (429 is recognised by llm_scheduler.is_rate_limit_error).
+    """
+    def __init__(self, provider: str, status_code: int):
+        super().__init__(f"{provider} stand-in: simulated HTTP {status_code}")
+        self.status_code = status_code
+
+class LatencyModel:
+    """
+    Lognormal latency with the given median and 95th percentile (seconds).
+    """
+    def __init__(self, p50: float, p95: float):
+        self.p50 = p50
+        self.p95 = max(p95, p50)
+        self.mu = math.log(max(p50, 1e-6))
+        self.sigma = math.log(self.p95 / p50) / _Z95 if p50 > 0 else 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self.p50 <= 0:
+            return 0.0
+        return rng.lognormvariate(self.mu, self.sigma)
+
+def _env_latency(provider: str) -> LatencyModel:
+    raw = os.getenv(f"STAND_IN_{provider.upper()}_LATENCY_MS")
+    p50, p95 = DEFAULT_LATENCY_MS[provider]
+    if raw:
+        parts = [float(part) for part in raw.split(",")]
+        p50, p95 = parts[0], parts[1] if len(parts) > 1 else parts[0]
+    return LatencyModel(p50 / 1000, p95 / 1000)
+
+class StandInProvider:
+    """
+    Latency/error behaviour and call statistics of one stand-in provider.
+    """
+    def __init__(self, name: str, latency: LatencyModel, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, seed: Optional[int] = None):
+        self.name = name
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.latencies = deque(maxlen=STATS_WINDOW)
+
+    @classmethod
+    def from_env(cls, name: str) -> "StandInProvider":
+        seed = os.getenv("STAND_IN_SEED")
+        return cls(
+            name,
+            _env_latency(name),
+            error_rate=float(os.getenv(f"STAND_IN_{name.upper()}_ERROR_RATE", "0")),
+            rate_limit_rate=float(os.getenv(f"STAND_IN_{name.upper()}_RATE_LIMIT_RATE", "0")),
+            seed=None if seed is None else int(seed) + PROVIDERS.index(name),
+        )
+
+    def plan(self) -> Tuple[float, Optional[StandInError]]:
+        """
+        Draws this call's latency and outcome, and records them.
+        """
+        with self._lock:
+            delay = self.latency.sample(self._rng)
+            roll = self._rng.random()
+            self.calls += 1
+            self.latencies.append(delay)
+            if roll < self.rate_limit_rate:
+                self.rate_limited += 1
+                return delay, StandInError(self.name, 429)
+            if roll < self.rate_limit_rate + self.error_rate:
+                self.errors += 1
+                return delay, StandInError(self.name, 503)
+            return delay, None
+
+    def simulate(self):
+        delay, error = self.plan()
+        time.sleep(delay)
+        if error:
+            raise error
+
+    async def asimulate(self):
+        delay, error = self.plan()
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "configured_ms": {"p50": round(self.latency.p50 * 1000, 1), "p95": round(self.latency.p95 * 1000, 1)},
+                "error_rate": self.error_rate,
+                "rate_limit_rate": self.rate_limit_rate,
+                "calls": self.calls,
+                "errors": self.errors,
+                "rate_limited": self.rate_limited,
+                "latency": summarize_latencies(self.latencies),
+            }
+
+_providers: Dict[str, StandInProvider] = {}
+_providers_lock = threading.Lock()
+
+def get_provider(name: str) -> StandInProvider:
+    provider = _providers.get(name)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(name)
+            if provider is None:
+                provider = _providers[name] = StandInProvider.from_env(name)
+    return provider
+
+def get_stand_in_stats() -> Dict[str, Any]:
+    return {"enabled": sorted(ENABLED), "providers": {name: p.stats() for name, p in list(_providers.items())}}
+
+# --- LLMs (Gemini, Groq) ---
+
+def _message_text(message: BaseMessage) -> str:
+    return message.content if isinstance(message.content, str) else str(message.content)
+
+def _quoted_text(prompt: str) -> str:
+    # The translation/detection prompts end in "Text: {text}"
+    return prompt.rsplit("Text:", 1)[-1].strip() if "Text:" in prompt else prompt.strip()
+
+def _context_answer(system: str, question: str) -> str:
+    context = system.rsplit("Context:**", 1)[-1] if "Context:**" in system else system.rsplit("Context:", 1)[-1]
+    words = context.split()[:ANSWER_WORDS]
+    if len(words) < ANSWER_WORDS:
+        filler = "Premiums are low and claims are settled through the bank.".split()
+        words += (filler * ANSWER_WORDS)[:ANSWER_WORDS - len(words)]
+    return f"About \"{question[:60]}\": " + " ".join(words)
+
+def stand_in_reply(messages: List[BaseMessage]) -> str:
+    """
+    A plausible reply for the prompts this app sends.
+    """
+    system = "\n".join(_message_text(m) for m in messages if m.type == "system")
+    human = "\n".join(_message_text(m) for m in messages if m.type != "system")
+    if "Context" in system:
+        return _context_answer(system, human)
+    if "2-letter ISO code" in human:
+        from app.services.language_detector import detect_local
+        return detect_local(_quoted_text(human)).language
+    return _quoted_text(human)
+
+class StandInChatModel(BaseChatModel):
+    """
+    Chat model with a stand-in provider's latency and errors. Streaming spreads
+    the sampled latency over the answer's words.
+    """
+    provider: str
+    model: str
+
+    @property
+    def _llm_type(self) -> str:
+        return f"stand-in-{self.provider}"
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        get_provider(self.provider).simulate()
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=stand_in_reply(messages)))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await get_provider(self.provider).asimulate()
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=stand_in_reply(messages)))])
+
+    def _chunks(self, messages: List[BaseMessage]) -> List[str]:
+        words = stand_in_reply(messages).split(" ")
+        return [word + (" " if i < len(words) - 1 else "") for i, word in enumerate(words)]
+
+    def _stream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        delay, error = get_provider(self.provider).plan()
+        chunks = self._chunks(messages)
+        # Time to first token is a third of the call, the rest is spread over the words
+        time.sleep(delay / 3)
+        if error:
+            raise error
+        for chunk in chunks:
+            time.sleep(2 * delay / 3 / len(chunks))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+    async def _astream(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        delay, error = get_provider(self.provider).plan()
+        chunks = self._chunks(messages)
+        await asyncio.sleep(delay / 3)
+        if error:
+            raise error
+        for chunk in chunks:
+            await asyncio.sleep(2 * delay / 3 / len(chunks))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+# --- Speech to text (Groq Whisper) ---
+
+def voice_note_bytes(transcript: str, seconds: float = 2.0) -> bytes:
+    """
+    A silent 8 kHz WAV voice note whose stand-in transcription is `transcript`.
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(8000)
+        wav.writeframes(bytes(int(8000 * seconds) * 2))
+    return buffer.getvalue() + TRANSCRIPT_MARKER + transcript.encode("utf-8")
+
+def _transcript(content: bytes) -> str:
+    _, marker, text = content.rpartition(TRANSCRIPT_MARKER)
+    return text.decode("utf-8", errors="replace") if marker else DEFAULT_TRANSCRIPT
+
+def transcribe(file_path: str) -> str:
+    get_provider("whisper").simulate()
+    with open(file_path, "rb") as file:
+        return _transcript(file.read())
+
+async def atranscribe(content: bytes) -> str:
+    await get_provider("whisper").asimulate()
+    return _transcript(content)
+
+# --- Text to speech (Edge TTS) ---
+
+# One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz, ~26 ms)
+_SILENT_MP3_FRAME = b"\xff\xfb\x90\x64" + bytes(413)
+# ~2.5 words per second of speech
+_FRAMES_PER_WORD = 15
+
+async def synthesise(text: str, file_path: str):
+    """
+    Writes a silent mp3 about as long as `text` would take to say.
+    """
+    await get_provider("edge_tts").asimulate()
+    frames = max(len(text.split()), 1) * _FRAMES_PER_WORD
+    with open(file_path, "wb") as out:
+        out.write(_SILENT_MP3_FRAME * frames)
+
+# --- Twilio (WhatsApp send, media download) ---
+
+def media_url(transcript: str) -> str:
+    """
+    A Twilio-style media URL the stand-in serves as a voice note saying `transcript`.
+    """
+    return (f"https://api.twilio.com/2010-04-01/Accounts/ACstandin/Messages/MM{uuid.uuid4().hex}"
+            f"/Media/ME{uuid.uuid4().hex}?transcript={quote(transcript)}")
+
+async def fetch_media(url: str) -> bytes:
+    await get_provider("twilio").asimulate()
+    transcript = parse_qs(urlparse(url).query).get("transcript", [DEFAULT_TRANSCRIPT])[0]
+    return voice_note_bytes(transcript)
+
+def send_message(to_number: str, body_text: str, media_url: str = None) -> str:
+    """
+    Sends a WhatsApp message through the stand-in. Returns a message SID.
+    With STAND_IN_TWILIO_CALLBACK set, the message is POSTed there as JSON.
+    """
+    get_provider("twilio").simulate()
+    sid = f"SM{uuid.uuid4().hex}"
+    if TWILIO_CALLBACK_URL:
+        import httpx
+        try:
+            httpx.post(TWILIO_CALLBACK_URL, json={"sid": sid, "to": to_number, "body": body_text,
+                                                  "media_url": media_url}, timeout=5)
+        except httpx.HTTPError as e:
+            print(f"⚠️ Stand-in Twilio callback failed: {e}")
+    return sid
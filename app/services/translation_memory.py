@@ -0,0 +1,271 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple, Union
+
+from app.utils.executor import run_blocking
+from app.utils.singleflight import SingleFlight
+from app.utils.text import normalise_text
+
+# Translation memory in front of the Groq translation chains.
+# Users repeat the same short replies ("haan", "kheti", "hospital kharcha") and
+# RAG answers repeat too; a translation is stored under
+# (normalised text, source lang, target lang, model) and reused.
+
+TRANSLATION_MEMORY_PATH = os.path.join(os.path.dirname(__file__), "../../translation_memory.db")
+
+TRANSLATION_MEMORY_ENABLED = os.getenv("TRANSLATION_MEMORY", "true").lower() != "false"
+TTL_SECONDS = int(os.getenv("TRANSLATION_MEMORY_TTL", str(30 * 24 * 3600)))
+MAX_ENTRIES = int(os.getenv("TRANSLATION_MEMORY_MAX_ENTRIES", "20000"))
+MEMORY_ENTRIES = int(os.getenv("TRANSLATION_MEMORY_MEMORY_ENTRIES", "2048"))
+# Hits only note last_used in memory; it is written with the next store, before
+# an eviction, or once this many seconds have passed since the last write
+TOUCH_INTERVAL = float(os.getenv("TRANSLATION_MEMORY_TOUCH_INTERVAL", "60"))
+
+class TranslationMemory:
+    """
+    Memory LRU in front of a size- and age-capped SQLite store.
+    Concurrent misses for the same key share one in-flight translation.
+    """
+    def __init__(self, db_path: str = TRANSLATION_MEMORY_PATH, ttl_seconds: int = TTL_SECONDS,
+                 max_entries: int = MAX_ENTRIES, memory_entries: int = MEMORY_ENTRIES,
+                 touch_interval: float = TOUCH_INTERVAL):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._lock = threading.Lock()
+        # key -> (translation, created_at, latency of the original call)
+        self._memory: "OrderedDict[bytes, Tuple[str, float, float]]" = OrderedDict()
+        # key -> last hit time, not yet written: keeps hits read-only on the request path
+        self.touch_interval = touch_interval
+        self._touched: Dict[bytes, float] = {}
+        self._touched_at = time.monotonic()
+        # Misses go upstream through here: identical concurrent misses make one call
+        self._flight = SingleFlight("translation_memory", register=False)
+        self.hits = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._init_db()
+
+    def _init_db(self):
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS translations (
+                    key BLOB PRIMARY KEY,
+                    source_lang TEXT,
+                    target_lang TEXT,
+                    model TEXT,
+                    translation TEXT,
+                    latency REAL,
+                    created_at REAL,
+                    last_used REAL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations(last_used)")
+            self._conn.execute("DELETE FROM translations WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            self._conn.commit()
+            self._count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    @staticmethod
+    def key(text: str, source_lang: str, target_lang: str, model: str) -> bytes:
+        return hashlib.sha256(
+            f"{normalise_text(text)}\x00{source_lang}\x00{target_lang}\x00{model}".encode("utf-8")
+        ).digest()
+
+    def _remember(self, key: bytes, entry: Tuple[str, float, float]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key: bytes) -> Optional[Tuple[str, float, float]]:
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+        else:
+            row = self._conn.execute(
+                "SELECT translation, created_at, latency FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            entry = tuple(row)
+            self._remember(key, entry)
+
+        if entry[1] < now - self.ttl_seconds:
+            self._memory.pop(key, None)
+            self._touched.pop(key, None)
+            self._count -= self._conn.execute("DELETE FROM translations WHERE key = ?", (key,)).rowcount
+            self._conn.commit()
+            return None
+        self._touched[key] = now
+        return entry
+
+    def _write_touched(self) -> bool:
+        """
+        Writes the batched last_used times. Returns whether anything was written.
+        """
+        self._touched_at = time.monotonic()
+        if not self._touched:
+            return False
+        self._conn.executemany("UPDATE translations SET last_used = ? WHERE key = ?",
+                               [(used, key) for key, used in self._touched.items()])
+        self._touched.clear()
+        return True
+
+    def _flush_touched_if_due(self):
+        if time.monotonic() - self._touched_at >= self.touch_interval and self._write_touched():
+            self._conn.commit()
+
+    def _store(self, key: bytes, source_lang: str, target_lang: str, model: str, translation: str, latency: float):
+        now = time.time()
+        with self._lock:
+            # Same transaction as the insert; also keeps eviction's LRU order current
+            self._write_touched()
+            # REPLACE of an existing row (e.g. a concurrent store of the same key) adds nothing
+            exists = self._conn.execute("SELECT 1 FROM translations WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO translations "
+                "(key, source_lang, target_lang, model, translation, latency, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, source_lang, target_lang, model, translation, latency, now, now)
+            )
+            self._remember(key, (translation, now, latency))
+            if exists is None:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """
+        Drops the least recently used rows down to 90% of the cap.
+        """
+        self._count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+        excess = self._count - int(self.max_entries * 0.9)
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM translations WHERE key IN (SELECT key FROM translations ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self._count -= excess
+            self.evictions += excess
+
+    def get(self, text: str, source_lang: str, target_lang: str, model: str) -> Optional[str]:
+        with self._lock:
+            entry = self._lookup(self.key(text, source_lang, target_lang, model))
+            self._flush_touched_if_due()
+        return entry[0] if entry else None
+
+    def _remembered(self, *keys: bytes) -> Optional[str]:
+        # First key that has an entry, in the order given
+        with self._lock:
+            for key in keys:
+                entry = self._lookup(key)
+                if entry is not None:
+                    self.hits += 1
+                    self.saved_seconds += entry[2]
+                    self._flush_touched_if_due()
+                    return entry[0]
+            return None
+
+    def _store_quietly(self, key: bytes, source_lang: str, target_lang: str, model: str, translation: str, latency: float):
+        try:
+            self._store(key, source_lang, target_lang, model, translation, latency)
+        except sqlite3.Error as e:
+            print(f"⚠️ Translation memory write failed: {e}")
+
+    def translate(self, text: str, source_lang: str, target_lang: str, model: str,
+                  translate_fn: Callable[[], str]) -> str:
+        """
+        Returns the remembered translation, or runs `translate_fn` (once per key,
+        however many callers are waiting for it) and remembers the result.
+        """
+        key = self.key(text, source_lang, target_lang, model)
+        cached = self._remembered(key)
+        if cached is not None:
+            return cached
+
+        def fetch() -> str:
+            start = time.perf_counter()
+            translation = translate_fn()
+            self._store_quietly(key, source_lang, target_lang, model, translation, time.perf_counter() - start)
+            return translation
+        return self._flight.do(key, fetch)
+
+    async def atranslate(self, text: str, source_lang: str, target_lang: str, model: str,
+                         translate_fn: Callable[[], Awaitable[Union[str, Tuple[str, str]]]],
+                         alternates: Sequence[str] = ()) -> str:
+        """
+        Async variant of translate; `translate_fn` returns a coroutine.
+        When another model may answer (a hedge or fallback), list it in
+        `alternates`: its entries are served too, and `translate_fn` returns
+        (translation, model that answered) so the result is stored under that model.
+        Neither the SQLite lookup/store nor waiting for another caller's
+        in-flight translation blocks the loop.
+        """
+        key = self.key(text, source_lang, target_lang, model)
+        keys = [key] + [self.key(text, source_lang, target_lang, m) for m in alternates]
+        cached = await run_blocking(self._remembered, *keys)
+        if cached is not None:
+            return cached
+
+        async def fetch() -> str:
+            start = time.perf_counter()
+            translation, answered_by = await translate_fn(), model
+            if isinstance(translation, tuple):
+                translation, answered_by = translation
+            await run_blocking(self._store_quietly, self.key(text, source_lang, target_lang, answered_by),
+                               source_lang, target_lang, answered_by, translation, time.perf_counter() - start)
+            return translation
+        return await self._flight.ado(key, fetch)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM translations")
+            self._conn.commit()
+            self._memory.clear()
+            self._touched.clear()
+            self._count = 0
+
+    def stats(self) -> Dict[str, Any]:
+        flight = self._flight.stats()
+        misses, shared = flight["upstream_calls"], flight["saved_calls"]
+        lookups = self.hits + misses + shared
+        return {
+            "enabled": True,
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": misses,
+            "shared_inflight": shared,
+            "hit_rate": round((self.hits + shared) / lookups, 3) if lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds + flight["saved_seconds"], 3),
+            "evictions": self.evictions,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+_memory: Optional[TranslationMemory] = None
+_memory_lock = threading.Lock()
+
+def get_translation_memory() -> Optional[TranslationMemory]:
+    """
+    Returns the process-wide translation memory, or None when disabled via TRANSLATION_MEMORY=false.
+    """
+    global _memory
+    if not TRANSLATION_MEMORY_ENABLED:
+        return None
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                _memory = TranslationMemory()
+    return _memory
+
+def get_memory_stats() -> Dict[str, Any]:
+    memory = get_translation_memory()
+    return memory.stats() if memory else {"enabled": False}
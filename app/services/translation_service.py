@@ -1,32 +1,212 @@
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 import os
+import time
+import hashlib
+import threading
+from typing import Any, Dict, List
 from dotenv import load_dotenv
+from app.services.chain_registry import chain_registry
+from app.services.language_detector import detect_local
+from app.services.translation_memory import get_translation_memory
+from app.utils.executor import run_blocking
+from app.utils.singleflight import SingleFlight, flight_key
+from app.utils.tokens import estimate_tokens
+from app.services.llm_scheduler import llm_scheduler, gemini_model, groq_model
+from app.services.stand_ins import StandInChatModel, stand_in_enabled
+from app.services.provider_router import Candidate, provider_router
 
 load_dotenv()
 
-def get_translator_llm():
-    api_key = os.getenv("GROQ_API_KEY")
+# Local detections below this confidence are re-checked with the LLM
+LANG_DETECT_MIN_CONFIDENCE = float(os.getenv("LANG_DETECT_MIN_CONFIDENCE", "0.8"))
+LANG_DETECT_LLM_FALLBACK = os.getenv("LANG_DETECT_LLM_FALLBACK", "true").lower() == "true"
+
+_detection_lock = threading.Lock()
+_detection_stats = {"local": 0, "llm_fallback": 0, "llm_errors": 0, "local_seconds": 0.0}
+
+DETECT_PROMPT = (
+    "Detect the language of this text. Return ONLY the 2-letter ISO code (e.g., en, hi, mr, ta). "
+    "If it is mixed (Hinglish), return the dominant Indian language code. "
+    "Text: {text}"
+)
+
+TO_ENGLISH_PROMPT = (
+    "Translate the following {source_lang} text to English. "
+    "Keep the meaning exact but simple. "
+    "Text: {text}"
+)
+
+TO_USER_LANG_PROMPT = (
+    "Translate this English text to {target_lang}. "
+    "IMPORTANT rules:\n"
+    "1. Return ONLY the direct translation.\n"
+    "2. Do NOT add any explanations, extra context, definitions, or conversational fillers.\n"
+    "3. PRESERVE all formatting like *bold* stars and emojis.\n"
+    "4. Do not translate technical terms like 'Premium' if commonly used.\n"
+    "Text: {text}"
+)
+
+def _build_translator_llm():
+    if stand_in_enabled("groq"):
+        return StandInChatModel(provider="groq", model=groq_model())
     return ChatGroq(
-        groq_api_key=api_key,
-        model_name="llama-3.3-70b-versatile", # Reliable model
+        groq_api_key=os.getenv("GROQ_API_KEY"),
+        model_name=groq_model(),
         temperature=0.1
     )
 
+def _translator_config():
+    return (groq_model(), os.getenv("GROQ_API_KEY"))
+
+def _gemini_llm():
+    from app.services.query_service import get_llm
+    return get_llm()
+
+def _register_chain(name: str, prompt_name: str):
+    chain_registry.register(
+        name,
+        lambda: ChatPromptTemplate.from_template(globals()[prompt_name]) | get_translator_llm(),
+        lambda: _translator_config() + (globals()[prompt_name],)
+    )
+    # The same prompt on Gemini: the provider router's alternate to Groq
+    chain_registry.register(
+        f"{name}@gemini",
+        lambda: ChatPromptTemplate.from_template(globals()[prompt_name]) | _gemini_llm(),
+        lambda: (gemini_model(), os.getenv("GOOGLE_API_KEY"), globals()[prompt_name])
+    )
+
+chain_registry.register("groq_translator", _build_translator_llm, _translator_config)
+_register_chain("detect_language", "DETECT_PROMPT")
+_register_chain("to_english", "TO_ENGLISH_PROMPT")
+_register_chain("to_user_lang", "TO_USER_LANG_PROMPT")
+
+def _memory_model(prompt: str, model: str = None) -> str:
+    # Editing a prompt must not serve translations made with the old one
+    return f"{model or groq_model()}#{hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]}"
+
+# Without the translation memory (which coalesces its own misses), identical
+# concurrent translations still share one Groq call
+_translation_flight = SingleFlight("translation")
+
+def _remembered(text: str, source_lang: str, target_lang: str, prompt: str, translate_fn) -> str:
+    memory = get_translation_memory()
+    if not text.strip():
+        return translate_fn()
+    if memory is None:
+        return _translation_flight.do(flight_key(text, source_lang, target_lang, _memory_model(prompt)), translate_fn)
+    return memory.translate(text, source_lang, target_lang, _memory_model(prompt), translate_fn)
+
+async def _aremembered(text: str, source_lang: str, target_lang: str, prompt: str, translate_fn) -> str:
+    """
+    `translate_fn` goes through the provider router and returns (translation, model
+    that answered): a Gemini hedge/fallback win is remembered as Gemini's.
+    """
+    memory = get_translation_memory()
+    if not text.strip():
+        return (await translate_fn())[0]
+    if memory is None:
+        async def translate() -> str:
+            return (await translate_fn())[0]
+        return await _translation_flight.ado(flight_key(text, source_lang, target_lang, _memory_model(prompt)), translate)
+    return await memory.atranslate(text, source_lang, target_lang, _memory_model(prompt), translate_fn,
+                                   alternates=[_memory_model(prompt, gemini_model())])
+
+async def _achain(name: str):
+    # First use builds the Groq client; keep that off the event loop
+    return await run_blocking(chain_registry.get, name)
+
+def _candidates(name: str, inputs: Dict[str, Any]) -> List[Candidate]:
+    """
+    Groq first, the same chain on Gemini as its hedge/fallback (see app.services.provider_router).
+    """
+    def call(chain_name: str):
+        async def run():
+            chain = await _achain(chain_name)
+            return await chain.ainvoke(inputs)
+        return run
+
+    return [Candidate("groq", groq_model(), call(name)),
+            Candidate("gemini", gemini_model(), call(f"{name}@gemini"))]
+
+def _translation_tokens(prompt: str, text: str) -> int:
+    # Prompt and text in, about the text again out (Indic scripts take more tokens)
+    return estimate_tokens(prompt, text) + 2 * estimate_tokens(text)
+
+def get_translator_llm():
+    """
+    Returns the shared Groq client; rebuilt only when the model or key changes.
+    """
+    return chain_registry.get("groq_translator")
+
+def _record_detection(key: str, local_seconds: float):
+    with _detection_lock:
+        _detection_stats[key] += 1
+        _detection_stats["local_seconds"] += local_seconds
+
+def detect_language_llm(text: str) -> str:
+    chain = chain_registry.get("detect_language")
+    result = llm_scheduler.call("groq", groq_model(), estimate_tokens(DETECT_PROMPT, text) + 5,
+                                lambda: chain.invoke({"text": text}))
+    return result.content.strip().lower()
+
+def _detect_locally(text: str):
+    """
+    Returns (detection, needs_llm) and records which path was taken.
+    """
+    start = time.perf_counter()
+    detection = detect_local(text)
+    elapsed = time.perf_counter() - start
+
+    if detection.confidence >= LANG_DETECT_MIN_CONFIDENCE or not LANG_DETECT_LLM_FALLBACK:
+        _record_detection("local", elapsed)
+        return detection, False
+    _record_detection("llm_fallback", elapsed)
+    return detection, True
+
+def _llm_detection_failed(detection, error: Exception) -> str:
+    print(f"⚠️ LLM language detection failed, using local guess {detection.language}: {error}")
+    _record_detection("llm_errors", 0.0)
+    return detection.language
+
 def detect_language(text: str) -> str:
     """
     Detects if the text is English or an Indian language.
     Returns: 'en', 'hi', 'mr', 'ta', etc.
+    Uses the local script + n-gram detector and only asks the LLM when the
+    local result is below LANG_DETECT_MIN_CONFIDENCE.
     """
-    llm = get_translator_llm()
-    prompt = ChatPromptTemplate.from_template(
-        "Detect the language of this text. Return ONLY the 2-letter ISO code (e.g., en, hi, mr, ta). "
-        "If it is mixed (Hinglish), return the dominant Indian language code. "
-        "Text: {text}"
-    )
-    chain = prompt | llm
-    result = chain.invoke({"text": text})
-    return result.content.strip().lower()
+    detection, needs_llm = _detect_locally(text)
+    if not needs_llm:
+        return detection.language
+    try:
+        return detect_language_llm(text)
+    except Exception as e:
+        return _llm_detection_failed(detection, e)
+
+async def adetect_language(text: str) -> str:
+    """
+    Async variant of detect_language (LLM fallback via ainvoke).
+    """
+    detection, needs_llm = _detect_locally(text)
+    if not needs_llm:
+        return detection.language
+    try:
+        result = await provider_router.acall("detect_language", _candidates("detect_language", {"text": text}),
+                                             estimate_tokens(DETECT_PROMPT, text) + 5)
+        return result.content.strip().lower()
+    except Exception as e:
+        return _llm_detection_failed(detection, e)
+
+def get_detection_stats() -> dict:
+    with _detection_lock:
+        stats = dict(_detection_stats)
+    total = stats["local"] + stats["llm_fallback"]
+    local_seconds = stats.pop("local_seconds")
+    stats["fallback_rate"] = round(stats["llm_fallback"] / total, 3) if total else 0.0
+    stats["local_mean_us"] = round(local_seconds / total * 1e6, 1) if total else 0.0
+    stats["min_confidence"] = LANG_DETECT_MIN_CONFIDENCE
+    return stats
 
 def translate_to_english(text: str, source_lang: str) -> str:
     """
@@ -35,15 +215,13 @@ def translate_to_english(text: str, source_lang: str) -> str:
     if source_lang == "en":
         return text
         
-    llm = get_translator_llm()
-    prompt = ChatPromptTemplate.from_template(
-        "Translate the following {source_lang} text to English. "
-        "Keep the meaning exact but simple. "
-        "Text: {text}"
-    )
-    chain = prompt | llm
-    result = chain.invoke({"source_lang": source_lang, "text": text})
-    return result.content.strip()
+    def translate():
+        chain = chain_registry.get("to_english")
+        result = llm_scheduler.call("groq", groq_model(), _translation_tokens(TO_ENGLISH_PROMPT, text),
+                                    lambda: chain.invoke({"source_lang": source_lang, "text": text}))
+        return result.content.strip()
+
+    return _remembered(text, source_lang, "en", TO_ENGLISH_PROMPT, translate)
 
 def translate_to_user_lang(text: str, target_lang: str) -> str:
     """
@@ -53,16 +231,38 @@ def translate_to_user_lang(text: str, target_lang: str) -> str:
     if target_lang == "en":
         return text
 
-    llm = get_translator_llm()
-    prompt = ChatPromptTemplate.from_template(
-        "Translate this English text to {target_lang}. "
-        "IMPORTANT rules:\n"
-        "1. Return ONLY the direct translation.\n"
-        "2. Do NOT add any explanations, extra context, definitions, or conversational fillers.\n"
-        "3. PRESERVE all formatting like *bold* stars and emojis.\n"
-        "4. Do not translate technical terms like 'Premium' if commonly used.\n"
-        "Text: {text}"
-    )
-    chain = prompt | llm
-    result = chain.invoke({"target_lang": target_lang, "text": text})
-    return result.content.strip()
+    def translate():
+        chain = chain_registry.get("to_user_lang")
+        result = llm_scheduler.call("groq", groq_model(), _translation_tokens(TO_USER_LANG_PROMPT, text),
+                                    lambda: chain.invoke({"target_lang": target_lang, "text": text}))
+        return result.content.strip()
+
+    return _remembered(text, "en", target_lang, TO_USER_LANG_PROMPT, translate)
+
+async def atranslate_to_english(text: str, source_lang: str) -> str:
+    """
+    Async variant of translate_to_english (ainvoke, hedged/falling back to Gemini).
+    """
+    if source_lang == "en":
+        return text
+
+    async def translate():
+        candidate, result = await provider_router.acall_candidate(
+            "to_english", _candidates("to_english", {"source_lang": source_lang, "text": text}), _translation_tokens(TO_ENGLISH_PROMPT, text))
+        return result.content.strip(), _memory_model(TO_ENGLISH_PROMPT, candidate.model)
+
+    return await _aremembered(text, source_lang, "en", TO_ENGLISH_PROMPT, translate)
+
+async def atranslate_to_user_lang(text: str, target_lang: str) -> str:
+    """
+    Async variant of translate_to_user_lang (ainvoke, hedged/falling back to Gemini).
+    """
+    if target_lang == "en":
+        return text
+
+    async def translate():
+        candidate, result = await provider_router.acall_candidate(
+            "to_user_lang", _candidates("to_user_lang", {"target_lang": target_lang, "text": text}), _translation_tokens(TO_USER_LANG_PROMPT, text))
+        return result.content.strip(), _memory_model(TO_USER_LANG_PROMPT, candidate.model)
+
+    return await _aremembered(text, "en", target_lang, TO_USER_LANG_PROMPT, translate)
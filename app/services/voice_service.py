@@ -1,13 +1,22 @@
 import os
+import re
+import uuid
 import hashlib
 import edge_tts
 import asyncio
+from typing import List
+from app.utils.executor import run_blocking
+from app.utils.singleflight import SingleFlight
+from app.services.llm_scheduler import llm_scheduler
+from app.services import stand_ins
 
 # Cache Directory (Relative to project root, assuming this runs from app context)
 # We want it to be inside app/static/voice_cache
 CACHE_DIR = os.path.join(os.path.dirname(__file__), "../static/voice_cache")
 os.makedirs(CACHE_DIR, exist_ok=True)
 
+WHISPER_MODEL = "whisper-large-v3"
+
 # Voice Mapping
 VOICE_MAP = {
     "en": "en-US-ChristopherNeural",  # Professional US Male
@@ -27,6 +36,9 @@ def transcribe_audio(file_path: str) -> str:
     (Kept synchronous as it calls an API that might be sync or we leave it as is for now)
     """
     from groq import Groq
+
+    if stand_ins.stand_in_enabled("whisper"):
+        return llm_scheduler.call("groq", WHISPER_MODEL, 0, lambda: stand_ins.transcribe(file_path))
     
     api_key = os.getenv("GROQ_API_KEY")
     if not api_key:
@@ -35,14 +47,55 @@ def transcribe_audio(file_path: str) -> str:
     client = Groq(api_key=api_key)
     
     with open(file_path, "rb") as file:
-        transcription = client.audio.transcriptions.create(
-            file=(os.path.basename(file_path), file.read()),
-            model="whisper-large-v3",
-            response_format="text"
-        )
+        content = file.read()
+    # Whisper is metered on requests (and audio seconds), not tokens
+    transcription = llm_scheduler.call("groq", WHISPER_MODEL, 0, lambda: client.audio.transcriptions.create(
+        file=(os.path.basename(file_path), content),
+        model=WHISPER_MODEL,
+        response_format="text"
+    ))
     
     return transcription
 
+_async_groq = None
+
+def _get_async_groq():
+    """
+    Shared AsyncGroq client (keeps its HTTP connection pool between calls).
+    """
+    global _async_groq
+    from groq import AsyncGroq
+
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError("GROQ_API_KEY not found in environment.")
+    if _async_groq is None or _async_groq.api_key != api_key:
+        _async_groq = AsyncGroq(api_key=api_key)
+    return _async_groq
+
+def _read_bytes(file_path: str) -> bytes:
+    with open(file_path, "rb") as file:
+        return file.read()
+
+async def atranscribe_audio(file_path: str) -> str:
+    """
+    Async variant of transcribe_audio using AsyncGroq, so the Whisper call
+    doesn't block the event loop.
+    """
+    if stand_ins.stand_in_enabled("whisper"):
+        content = await run_blocking(_read_bytes, file_path)
+        return await llm_scheduler.acall("groq", WHISPER_MODEL, 0, lambda: stand_ins.atranscribe(content))
+    client = _get_async_groq()
+    content = await run_blocking(_read_bytes, file_path)
+    return await llm_scheduler.acall("groq", WHISPER_MODEL, 0, lambda: client.audio.transcriptions.create(
+        file=(os.path.basename(file_path), content),
+        model=WHISPER_MODEL,
+        response_format="text"
+    ))
+
+# Identical replies voiced at the same time share one Edge TTS call
+_tts_flight = SingleFlight("text_to_speech")
+
 async def text_to_speech(text: str, lang: str = "en") -> str:
     """
     Converts text to speech using Microsoft Edge's Neural TTS (Free).
@@ -53,10 +106,29 @@ async def text_to_speech(text: str, lang: str = "en") -> str:
     if not text:
         return None
         
-    # 1. Generate Cache Key (MD5 of text + voice)
     voice = get_voice(lang)
+    # Keyed exactly like the audio file: flight_key normalises case and spacing,
+    # which would hand "LIC" and "lic" callers the same recording
+    return await _tts_flight.ado((text, voice), lambda: _synthesise(text, voice))
+
+def _tmp_path(file_path: str) -> str:
+    # Unique per call: concurrent writers of the same file (same process, other
+    # executor threads) must never share a temp file
+    return f"{file_path}.{uuid.uuid4().hex}.tmp"
+
+def _discard(tmp_path: str):
+    # Nothing left behind once os.replace has moved it; only failures leave a temp file
+    try:
+        os.remove(tmp_path)
+    except FileNotFoundError:
+        pass
+
+async def _synthesise(text: str, voice: str) -> str:
+    # 1. Generate Cache Key (MD5 of text + voice)
     cache_key = hashlib.md5(f"{text}_{voice}".encode()).hexdigest()
-    filename = f"{cache_key}.mp3"
+    # Stand-in (silent) audio never shadows real cached audio
+    stand_in = stand_ins.stand_in_enabled("edge_tts")
+    filename = f"stand_in_{cache_key}.mp3" if stand_in else f"{cache_key}.mp3"
     file_path = os.path.join(CACHE_DIR, filename)
     
     # 2. Check Cache
@@ -66,7 +138,49 @@ async def text_to_speech(text: str, lang: str = "en") -> str:
         
     # 3. Generate New
     print(f"🎙️ Generating new audio ({voice})...")
-    communicate = edge_tts.Communicate(text, voice)
-    await communicate.save(file_path)
+    # Write aside and rename, so a concurrent cache check never serves a partial file
+    tmp_path = _tmp_path(file_path)
+    try:
+        if stand_in:
+            await stand_ins.synthesise(text, tmp_path)
+        else:
+            await edge_tts.Communicate(text, voice).save(tmp_path)
+        os.replace(tmp_path, file_path)
+    finally:
+        _discard(tmp_path)
     
     return file_path
+
+PARAGRAPH_RE = re.compile(r"\n\s*\n")
+
+async def text_to_speech_paragraphs(text: str, lang: str = "en") -> List[str]:
+    """
+    Synthesises each paragraph of `text` concurrently (each is cached on its own,
+    so a recurring paragraph like the disclaimer is only generated once).
+    Returns the .mp3 paths in order; join them with join_audio.
+    """
+    paragraphs = [p.strip() for p in PARAGRAPH_RE.split(text) if p.strip()]
+    return list(await asyncio.gather(*(text_to_speech(p, lang) for p in paragraphs)))
+
+def join_audio(paths: List[str]) -> str:
+    """
+    Concatenates Edge TTS mp3 files (plain MPEG frames, so byte concatenation
+    plays as one track) into a cached file. Blocking: call via run_blocking.
+    """
+    paths = [p for p in paths if p]
+    if len(paths) <= 1:
+        return paths[0] if paths else None
+    cache_key = hashlib.md5("|".join(os.path.basename(p) for p in paths).encode()).hexdigest()
+    prefix = "stand_in_" if stand_ins.stand_in_enabled("edge_tts") else ""
+    file_path = os.path.join(CACHE_DIR, f"{prefix}{cache_key}.mp3")
+    if not os.path.exists(file_path):
+        tmp_path = _tmp_path(file_path)
+        try:
+            with open(tmp_path, "wb") as out:
+                for path in paths:
+                    with open(path, "rb") as part:
+                        out.write(part.read())
+            os.replace(tmp_path, file_path)
+        finally:
+            _discard(tmp_path)
+    return file_path
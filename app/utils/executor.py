@@ -0,0 +1,51 @@
+import os
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Bounded thread pool for blocking work reached from async code (SQLite, PDF
+# rendering, local embedding, SDKs without an async client). Keeping it
+# separate from the loop's default executor caps how many threads blocking
+# calls can take, and lets /api/metrics show how busy it is.
+
+BLOCKING_WORKERS = int(os.getenv("BLOCKING_WORKERS", "16"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"submitted": 0, "running": 0, "max_running": 0}
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking")
+    return _executor
+
+def _tracked(fn: Callable[[], Any]) -> Any:
+    with _stats_lock:
+        _stats["running"] += 1
+        _stats["max_running"] = max(_stats["max_running"], _stats["running"])
+    try:
+        return fn()
+    finally:
+        with _stats_lock:
+            _stats["running"] -= 1
+
+async def run_blocking(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Runs a blocking callable on the bounded pool without stalling the event loop.
+    """
+    with _stats_lock:
+        _stats["submitted"] += 1
+    call = functools.partial(fn, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), _tracked, call)
+
+def get_executor_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["workers"] = BLOCKING_WORKERS
+    return stats
@@ -0,0 +1,122 @@
+import time
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from app.utils.text import normalise_text
+
+# Request coalescing: concurrent calls with the same key share one execution.
+# The first caller (leader) runs the call; callers arriving while it is in
+# flight wait on the same concurrent.futures.Future and get its result or its
+# exception. Once the call settles the key is forgotten - this is not a cache.
+# A Future (rather than an asyncio one) lets sync callers in executor threads
+# and async callers on the event loop share a call.
+
+def flight_key(text: str, *parts: str) -> bytes:
+    """
+    Key for a call on `text` (normalised) with the given qualifiers (language, model...).
+    """
+    return hashlib.sha256("\x00".join((normalise_text(text),) + parts).encode("utf-8")).digest()
+
+class SingleFlight:
+    def __init__(self, name: str, register: bool = True):
+        self.name = name
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self.calls = 0
+        self.shared = 0
+        self.errors = 0
+        self.saved_seconds = 0.0
+        if register:
+            _flights[name] = self
+
+    def _claim(self, key: Hashable, is_async: bool) -> Tuple[Future, bool]:
+        """
+        Returns (future, is_leader). The leader must call _settle.
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            # A sync caller must not block on a call driven by an event loop:
+            # it may be that loop's own thread. It runs the call itself instead.
+            if future is not None and (is_async or not future.is_async):
+                future.followers += 1
+                self.shared += 1
+                return future, False
+            future = Future()
+            future.followers = 0
+            future.is_async = is_async
+            future.started = time.perf_counter()
+            if key not in self._inflight:
+                self._inflight[key] = future
+            self.calls += 1
+            return future, True
+
+    def _settle(self, key: Hashable, future: Future, result: Any = None, error: BaseException = None):
+        latency = time.perf_counter() - future.started
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            if error is None:
+                # Each caller that joined in flight saved one upstream call
+                self.saved_seconds += latency * future.followers
+            else:
+                self.errors += 1
+        if error is None:
+            future.set_result(result)
+        else:
+            future.set_exception(error)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Runs `fn` unless an identical call is in flight, in which case waits for its result.
+        """
+        future, leader = self._claim(key, is_async=False)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result)
+        return result
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Async variant of do; `fn` returns a coroutine. The call runs as its own task,
+        so cancelling the leader (e.g. a dropped request) doesn't fail the followers.
+        """
+        future, leader = self._claim(key, is_async=True)
+        if not leader:
+            return await asyncio.wrap_future(future)
+
+        task = asyncio.ensure_future(fn())
+
+        def settle(done: asyncio.Task):
+            if done.cancelled():
+                self._settle(key, future, error=asyncio.CancelledError())
+            elif done.exception() is not None:
+                self._settle(key, future, error=done.exception())
+            else:
+                self._settle(key, future, done.result())
+        task.add_done_callback(settle)
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self.calls + self.shared
+            return {
+                "upstream_calls": self.calls,
+                "saved_calls": self.shared,
+                "coalesced_rate": round(self.shared / requests, 3) if requests else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3),
+                "errors": self.errors,
+                "inflight": len(self._inflight),
+            }
+
+_flights: Dict[str, SingleFlight] = {}
+
+def get_singleflight_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: flight.stats() for name, flight in _flights.items()}
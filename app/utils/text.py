@@ -0,0 +1,11 @@
+import re
+import unicodedata
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def normalise_text(text: str) -> str:
+    """
+    NFC, trimmed, whitespace collapsed and case-folded: "Haan " and "haan" compare equal.
+    Used to key caches and coalesced calls on user/LLM text.
+    """
+    return _WHITESPACE_RE.sub(" ", unicodedata.normalize("NFC", text)).strip().casefold()
@@ -0,0 +1,36 @@
+import os
+import threading
+
+# Token estimates for rate limiting. Neither Gemini nor Llama (Groq) ships a
+# local tokenizer we can use, so cl100k_base is the yardstick: close enough to
+# budget per-minute token limits. If tiktoken or its encoding file is not
+# available (the file is downloaded on first use), fall back to ~4 chars/token.
+
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "cl100k_base")
+CHARS_PER_TOKEN = 4
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+                except Exception as e:
+                    print(f"⚠️ tiktoken encoding {TOKEN_ENCODING} unavailable ({type(e).__name__}); estimating tokens from length")
+                _encoding_loaded = True
+    return _encoding
+
+def estimate_tokens(*texts: str) -> int:
+    """
+    Estimated token count of the given texts together.
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return sum(len(encoding.encode(text, disallowed_special=())) for text in texts if text)
+    return sum(len(text) for text in texts if text) // CHARS_PER_TOKEN + 1
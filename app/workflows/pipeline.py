@@ -0,0 +1,185 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from app.utils.metrics import summarize_latencies
+
+# Stage graph for one request through AgentService.process_message.
+# A stage is an async callable started as soon as the stages it depends on
+# have finished, so independent stages (session load and audio download, answer
+# translation and disclaimer TTS, PDF rendering and voice reply) overlap.
+# Speculative stages are started before we know whether their result is needed;
+# any not consumed by the time the request finishes are cancelled.
+# Every stage records when it ran, and close() walks back from the last stage
+# to find the critical path: the chain of stages that set the request latency.
+
+STATS_WINDOW = 1000
+
+class StageGraph:
+    def __init__(self):
+        self._t0 = time.perf_counter()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._speculative = set()
+        self._consumed = set()
+        # Stages whose results the request body has already waited for: any stage
+        # added later can only have started after them.
+        self._awaited: List[str] = []
+        # name -> {"start", "end", "status", "after"}
+        self._timings: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, name: str, fn: Callable[..., Awaitable[Any]], after: Iterable[str] = (),
+            speculative: bool = False) -> asyncio.Task:
+        """
+        Schedules stage `name`. Once every stage in `after` has finished, runs
+        `fn(*their results)`. A speculative stage that nobody asks for is cancelled by close().
+        """
+        if name in self._tasks:
+            raise ValueError(f"Stage {name!r} already added")
+        after = tuple(after)
+        timing = {"start": None, "end": None, "status": "pending", "after": after + tuple(self._awaited)}
+        self._timings[name] = timing
+
+        async def run():
+            inputs = [await self._tasks[dep] for dep in after]
+            timing["start"] = time.perf_counter()
+            timing["status"] = "running"
+            try:
+                result = await fn(*inputs)
+            except asyncio.CancelledError:
+                timing["status"] = "cancelled"
+                raise
+            except Exception:
+                timing["status"] = "failed"
+                raise
+            finally:
+                timing["end"] = time.perf_counter()
+            timing["status"] = "done"
+            return result
+
+        task = asyncio.create_task(run())
+        self._tasks[name] = task
+        if speculative:
+            self._speculative.add(name)
+        return task
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tasks
+
+    async def result(self, name: str) -> Any:
+        """
+        Waits for stage `name` and returns its result (or raises its exception).
+        """
+        self._consumed.add(name)
+        try:
+            return await self._tasks[name]
+        finally:
+            if name not in self._awaited:
+                self._awaited.append(name)
+
+    async def run(self, name: str, fn: Callable[..., Awaitable[Any]], after: Iterable[str] = ()) -> Any:
+        """
+        Adds a stage and waits for it: a step on the request's main line.
+        """
+        self.add(name, fn, after)
+        return await self.result(name)
+
+    def cancel(self, name: str):
+        """
+        Drops a stage whose result turned out not to be needed.
+        """
+        task = self._tasks.get(name)
+        if task is not None and not task.done():
+            task.cancel()
+            if self._timings[name]["start"] is None:
+                self._timings[name]["status"] = "cancelled"
+
+    async def close(self) -> Dict[str, Any]:
+        """
+        Cancels speculative stages nobody consumed, waits for the rest and
+        returns the request's stage timings (also recorded in pipeline stats).
+        """
+        for name in self._speculative - self._consumed:
+            self.cancel(name)
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        timings = self.timings()
+        _stats.record(timings, self._speculative, self._consumed)
+        return timings
+
+    def _critical_path(self) -> List[str]:
+        finished = {name: t for name, t in self._timings.items() if t["end"] is not None and t["status"] == "done"}
+        if not finished:
+            return []
+        path = [max(finished, key=lambda name: finished[name]["end"])]
+        while True:
+            timing = finished[path[-1]]
+            # The predecessor is whichever dependency finished last before this stage started
+            preds = [dep for dep in timing["after"] if dep in finished and finished[dep]["end"] <= timing["start"]]
+            if not preds:
+                break
+            path.append(max(preds, key=lambda dep: finished[dep]["end"]))
+        return path[::-1]
+
+    def timings(self) -> Dict[str, Any]:
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return None if seconds is None else round(seconds * 1000, 1)
+
+        stages = {}
+        for name, t in self._timings.items():
+            stages[name] = {
+                "status": t["status"],
+                "start_ms": ms(t["start"] - self._t0) if t["start"] else None,
+                "duration_ms": ms(t["end"] - t["start"]) if t["start"] and t["end"] else None,
+            }
+        path = self._critical_path()
+        return {
+            "stages": stages,
+            "critical_path": path,
+            "critical_path_ms": round(sum(stages[name]["duration_ms"] for name in path), 1),
+            "total_ms": ms(time.perf_counter() - self._t0),
+        }
+
+class PipelineStats:
+    """
+    Rolling per-stage and critical-path latencies across requests, for /api/metrics.
+    """
+    def __init__(self, window: int = STATS_WINDOW):
+        self._lock = threading.Lock()
+        self.window = window
+        self.requests = 0
+        self.critical_path = deque(maxlen=window)
+        self.total = deque(maxlen=window)
+        self.stages: Dict[str, deque] = {}
+        self.on_critical_path: Dict[str, int] = {}
+        self.speculative = {"started": 0, "used": 0, "cancelled": 0}
+
+    def record(self, timings: Dict[str, Any], speculative: set, consumed: set):
+        with self._lock:
+            self.requests += 1
+            self.critical_path.append(timings["critical_path_ms"] / 1000)
+            self.total.append(timings["total_ms"] / 1000)
+            for name, stage in timings["stages"].items():
+                if stage["duration_ms"] is not None and stage["status"] == "done":
+                    self.stages.setdefault(name, deque(maxlen=self.window)).append(stage["duration_ms"] / 1000)
+            for name in timings["critical_path"]:
+                self.on_critical_path[name] = self.on_critical_path.get(name, 0) + 1
+            self.speculative["started"] += len(speculative)
+            self.speculative["used"] += len(speculative & consumed)
+            self.speculative["cancelled"] += len(speculative - consumed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "critical_path": summarize_latencies(self.critical_path),
+                "total": summarize_latencies(self.total),
+                "stages": {name: summarize_latencies(values) for name, values in self.stages.items()},
+                "on_critical_path": dict(self.on_critical_path),
+                "speculative": dict(self.speculative),
+            }
+
+_stats = PipelineStats()
+
+def get_pipeline_stats() -> Dict[str, Any]:
+    return _stats.stats()
@@ -0,0 +1,176 @@
+"""
+Admin dashboard query benchmark at scale.
+
+Usage:
+    python scripts/bench_admin_queries.py [--sessions 1000000] [--pages 10] [--page-size 50]
+
+Seeds a temp sessions database (never sessions.db) in the original
+three-column schema with a mix of finished and half-finished surveys. It then
+migrates it as a deployment would: init_db (instant columns), then
+session_db.migrate() while a writer thread keeps updating sessions
+(write-through, so its latency shows every wait on the migration). Finally it
+times one dashboard render both ways:
+  legacy     get_all_sessions() + the per-row dicts (and pandas DataFrame, if
+             installed) that show_admin_dashboard used to build
+  aggregated get_lead_stats() + the first page of list_leads(), then walking
+             --pages pages with the keyset cursor, with and without filters
+Reported: migration time, writer p99/max latency and errors during it, and
+wall time and peak Python heap (tracemalloc) per render.
+Results are written to bench_results/admin_queries.json.
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+import tracemalloc
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.db import session_db
+from app.utils.metrics import summarize_latencies
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "../bench_results")
+OCCUPATIONS = ["Farmer", "Shopkeeper", "Driver", "Teacher", "Labourer", "Tailor"]
+
+def session_row(i: int, rng: random.Random):
+    # Roughly half the users finish; the rest stop somewhere in the survey
+    stop = len(session_db.SURVEY_STEPS) - 1 if rng.random() < 0.5 else rng.randrange(1, len(session_db.SURVEY_STEPS) - 1)
+    step = session_db.SURVEY_STEPS[stop]
+    data = {"language": rng.choice(["en", "hi", "mr"])}
+    answers = [("name", f"User {i}"), ("gender", "Female"), ("age", str(18 + i % 60)),
+               ("occupation", rng.choice(OCCUPATIONS)), ("family", "Husband and two children"),
+               ("worry", "Crop failure because of drought")]
+    data.update(answers[:stop - 1])
+    if step == "completed":
+        data["recommendation"] = "Pradhan Mantri Fasal Bima Yojana covers crop loss from natural calamities. " * 4
+    return f"user_{i}", step, json.dumps(data)
+
+def seed(path: str, n: int):
+    rng = random.Random(0)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS sessions (user_id TEXT PRIMARY KEY, step TEXT, data TEXT)")
+    conn.executemany("INSERT INTO sessions VALUES (?, ?, ?)", (session_row(i, rng) for i in range(n)))
+    conn.commit()
+    conn.close()
+
+def migrate_under_load(n_sessions: int) -> dict:
+    session_db.SESSION_CACHE = False
+    session_db.init_db()
+    latencies, errors = [], []
+    done = threading.Event()
+
+    def writer():
+        rng = random.Random(1)
+        while not done.is_set():
+            user_id, step, payload = session_row(rng.randrange(n_sessions), rng)
+            start = time.perf_counter()
+            try:
+                session_db.update_session(user_id, step, json.loads(payload))
+            except sqlite3.OperationalError as e:
+                errors.append(str(e))
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.001)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        stats = session_db.migrate(pause=0.05)
+    finally:
+        done.set()
+        thread.join()
+    session_db.SESSION_CACHE = True
+    return {**stats, "writes": len(latencies), "write_latency": summarize_latencies(latencies),
+            "write_max_ms": round(max(latencies, default=0) * 1000, 1), "write_errors": len(errors)}
+
+def legacy_render():
+    sessions = session_db.get_all_sessions()
+    data_list = []
+    for s in sessions:
+        user_data = s["data"]
+        if not user_data:
+            continue
+        data_list.append({
+            "User ID": s["user_id"], "Status": s["step"],
+            "Name": user_data.get("name", "N/A"), "Age": user_data.get("age", "N/A"),
+            "Occupation": user_data.get("occupation", "N/A"), "Family": user_data.get("family", "N/A"),
+            "Worry": user_data.get("worry", "N/A"), "Recommendation": user_data.get("recommendation", "Pending"),
+        })
+    try:
+        import pandas as pd
+    except ImportError:
+        return len(data_list)
+    df = pd.DataFrame(data_list)
+    return len(df[df["Status"] == "completed"])
+
+def aggregated_render(pages: int, page_size: int, **filters):
+    stats = session_db.get_lead_stats()
+    cursor, rows = None, 0
+    for _ in range(pages):
+        page = session_db.list_leads(limit=page_size, cursor=cursor, **filters)
+        rows += len(page["leads"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    return stats["completed"], rows
+
+def measure(fn, *args, **kwargs) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": round(elapsed, 3), "peak_heap_mb": round(peak / (1024 * 1024), 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1000000)
+    parser.add_argument("--pages", type=int, default=10, help="Lead pages walked per render")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--skip-legacy", action="store_true", help="Skip the full-table render (slow at 1M)")
+    args = parser.parse_args()
+
+    session_db.DB_PATH = os.path.join(tempfile.mkdtemp(prefix="bench_admin_queries_"), "sessions.db")
+    print(f"🌱 Seeding {args.sessions} sessions...")
+    start = time.perf_counter()
+    seed(session_db.DB_PATH, args.sessions)
+    print(f"   done in {time.perf_counter() - start:.1f}s "
+          f"({os.path.getsize(session_db.DB_PATH) / (1024 * 1024):.0f} MB)")
+
+    print("🔧 Migrating with a live writer...")
+    migration = migrate_under_load(args.sessions)
+    print(f"   {migration['seconds']:.1f}s, {migration['backfilled']} rows backfilled in {migration['batches']} batches; "
+          + ", ".join(f"{i['name']} {i['seconds']:.1f}s" for i in migration["indexes"]))
+    print(f"   writer: {migration['writes']} writes, p99 {migration['write_latency']['p99_ms']:.1f} ms, "
+          f"max {migration['write_max_ms']:.0f} ms, {migration['write_errors']} errors")
+
+    runs = {
+        "aggregated": lambda: measure(aggregated_render, args.pages, args.page_size),
+        "aggregated, step filter": lambda: measure(aggregated_render, args.pages, args.page_size, step="ask_family"),
+        "aggregated, occupation + language": lambda: measure(aggregated_render, args.pages, args.page_size,
+                                                             occupation="Tailor", language="mr"),
+    }
+    if not args.skip_legacy:
+        runs["legacy"] = lambda: measure(legacy_render)
+
+    results = {}
+    print(f"\n{'render':<36} {'seconds':>8} {'peak heap MB':>13}")
+    for name, run in runs.items():
+        results[name] = run()
+        print(f"{name:<36} {results[name]['seconds']:>8.3f} {results[name]['peak_heap_mb']:>13.1f}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, "admin_queries.json")
+    with open(out_path, "w") as f:
+        json.dump({"config": vars(args), "migration": migration, "results": results}, f, indent=2)
+    print(f"\n💾 Results written to {out_path}")
+
+if __name__ == "__main__":
+    main()
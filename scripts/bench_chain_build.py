@@ -0,0 +1,63 @@
+"""
+Measures what the chain registry saves per request: building the LLM clients
+and prompt/retrieval chains from scratch vs fetching them from the registry.
+
+Usage:
+    python scripts/bench_chain_build.py [--iterations 50]
+
+No API call is made (clients and chains are only constructed), so dummy keys
+are used when GOOGLE_API_KEY / GROQ_API_KEY are not set. The retriever needs
+the vector store, which is loaded once before timing starts.
+"""
+import os
+import sys
+import time
+import argparse
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+os.environ.setdefault("GOOGLE_API_KEY", "bench-dummy-key")
+os.environ.setdefault("GROQ_API_KEY", "bench-dummy-key")
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+CHAINS = ["query", "recommend", "detect_language", "to_english", "to_user_lang"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+
+    from app.rag import registry
+    from app.services import query_service, translation_service  # noqa: F401 (registers chains)
+    from app.services.chain_registry import chain_registry
+    from app.utils.metrics import summarize_latencies
+
+    registry.get_vectorstore()
+
+    print(f"\n{'chain':<16} {'cold p50 ms':>12} {'warm p50 ms':>12} {'speedup':>9}")
+    for name in CHAINS:
+        factory = chain_registry._factories[name]
+        cold = []
+        for _ in range(args.iterations):
+            # Rebuild the client as well: that is what every request paid before
+            chain_registry.reload()
+            start = time.perf_counter()
+            factory()
+            cold.append(time.perf_counter() - start)
+
+        chain_registry.get(name)
+        warm = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            chain_registry.get(name)
+            warm.append(time.perf_counter() - start)
+
+        cold_ms = summarize_latencies(cold)["p50_ms"]
+        warm_ms = summarize_latencies(warm)["p50_ms"]
+        speedup = f"{cold_ms / warm_ms:.0f}x" if warm_ms else "-"
+        print(f"{name:<16} {cold_ms:>12} {warm_ms:>12} {speedup:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Prompt-size benchmark for context packing (app/rag/context_packing.py). No LLM
+or embedding model is needed.
+
+Usage:
+    python scripts/bench_context_packing.py [--k 3] [--budget 1500]
+
+The data/ corpus is split exactly as ingestion does. For every query in
+scripts/retrieval_queries.json, the top-k chunks come from a BM25 index
+built over those chunks (a stand-in for the hybrid retriever), in rank
+order with their scores. The script reports the context tokens before and
+after packing, the chunks merged, the sentences dropped and the packing
+latency. Results are written to bench_results/context_packing.json.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_core.documents import Document
+
+from app.rag.ingestion import load_file, split_documents, chunk_ids
+from app.rag.lexical_index import BM25Index
+from app.rag.context_packing import pack_documents
+from app.utils.metrics import summarize_latencies
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "../data")
+QUERIES_PATH = os.path.join(os.path.dirname(__file__), "retrieval_queries.json")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "../bench_results")
+
+def build_index(data_dir: str) -> BM25Index:
+    chunks = []
+    for name in sorted(os.listdir(data_dir)):
+        chunks.extend(split_documents(load_file(os.path.join(data_dir, name))))
+    index = BM25Index()
+    for doc_id, chunk in zip(chunk_ids(chunks), chunks):
+        index.add(doc_id, chunk.page_content, chunk.metadata)
+    print(f"📚 {len(chunks)} chunks from {data_dir}")
+    return index
+
+def retrieve(index: BM25Index, question: str, k: int):
+    docs = []
+    for doc_id, score in index.search(question, k):
+        entry = index.docs[doc_id]
+        docs.append(Document(page_content=entry["text"], metadata={**entry["metadata"], "retrieval_score": score}))
+    return docs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--budget", type=int, default=None, help="Token budget (default RAG_CONTEXT_TOKENS)")
+    parser.add_argument("--queries", default=QUERIES_PATH)
+    args = parser.parse_args()
+
+    index = build_index(DATA_DIR)
+    with open(args.queries, encoding="utf-8") as f:
+        questions = [q["question"] for q in json.load(f)["queries"]]
+
+    reports = []
+    latencies = []
+    for question in questions:
+        docs = retrieve(index, question, args.k)
+        if not docs:
+            continue
+        start = time.perf_counter()
+        packed = pack_documents(docs, args.budget)
+        latencies.append(time.perf_counter() - start)
+        reports.append(packed.report)
+
+    tokens_in = sum(r["tokens_in"] for r in reports)
+    tokens_out = sum(r["tokens_out"] for r in reports)
+    result = {
+        "timestamp": time.time(),
+        "k": args.k,
+        "budget": args.budget,
+        "queries": len(reports),
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "saved_ratio": round(1 - tokens_out / tokens_in, 3) if tokens_in else 0.0,
+        "mean_tokens_in": round(tokens_in / len(reports), 1) if reports else 0.0,
+        "mean_tokens_out": round(tokens_out / len(reports), 1) if reports else 0.0,
+        "chunks_in": sum(r["chunks_in"] for r in reports),
+        "passages_out": sum(r["chunks_out"] for r in reports),
+        "sentences_dropped": sum(r["sentences_dropped"] for r in reports),
+        "truncated": sum(r["truncated"] for r in reports),
+        "pack_latency": summarize_latencies(latencies),
+    }
+
+    print(f"\n{result['queries']} queries, top-{args.k} chunks each")
+    print(f"   context tokens: {result['mean_tokens_in']} -> {result['mean_tokens_out']} per request "
+          f"({result['saved_ratio'] * 100:.1f}% saved)")
+    print(f"   chunks -> passages: {result['chunks_in']} -> {result['passages_out']}, "
+          f"sentences dropped: {result['sentences_dropped']}, truncated: {result['truncated']}")
+    print(f"   packing p50 {result['pack_latency']['p50_ms']} ms, p95 {result['pack_latency']['p95_ms']} ms")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, "context_packing.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"\n💾 Results written to {out_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Ingestion throughput (chunks/s) by number of embedding workers.
+
+Usage:
+    python scripts/bench_embed_workers.py [--workers 1 2 4] [--copies 20] [--batch-size 64] [--repeat 2]
+
+The data/ corpus is split as ingestion does and repeated --copies times (each
+copy under its own source name, so nothing is deduplicated) to get a workload
+that takes seconds, not milliseconds. Every worker count then streams it
+through ingestion.index_stream into a fresh temp NumPy store, with the real
+embedding model (EMBEDDING_MODEL) and no embedding cache. With several
+workers, index_stream gives each one cpu_count // workers torch threads.
+Reported: chunks/s and MB/s per worker count (best of --repeat runs) and the
+speed-up over one worker. EMBED_WORKERS should only be raised above 1 on a
+host where this shows a gain.
+Results are written to bench_results/embed_workers.json.
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_core.documents import Document
+
+from app.rag import registry, ingestion
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "../data")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "../bench_results")
+
+def corpus(copies: int):
+    chunks = []
+    for name in sorted(os.listdir(DATA_DIR)):
+        if name.endswith(ingestion.SUPPORTED_EXTENSIONS):
+            chunks.extend(ingestion.split_documents(ingestion.load_file(os.path.join(DATA_DIR, name))))
+    workload = []
+    for copy in range(copies):
+        for chunk in chunks:
+            metadata = dict(chunk.metadata, source=f"copy{copy}_{chunk.metadata['source']}")
+            workload.append(Document(page_content=chunk.page_content, metadata=metadata))
+    return workload
+
+def run(chunks, workers: int, batch_size: int) -> dict:
+    root = tempfile.mkdtemp(prefix="bench_embed_workers_")
+    registry.VECTOR_BACKEND = "numpy"
+    registry.NUMPY_DB_PATH = os.path.join(root, "numpy_db")
+    registry.DB_PATH = root
+    registry.LEXICAL_INDEX_PATH = os.path.join(root, "bm25_index.json")
+    registry.INDEX_VERSION_FILE = os.path.join(root, "index_version")
+    registry._vectorstore = None
+    registry._lexical_index = None
+    return ingestion.index_stream(zip(ingestion.chunk_ids(chunks), chunks), batch_size=batch_size, workers=workers)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--copies", type=int, default=20, help="Times the data/ corpus is repeated")
+    parser.add_argument("--batch-size", type=int, default=ingestion.EMBED_BATCH_SIZE)
+    parser.add_argument("--repeat", type=int, default=2, help="Runs per worker count (best is kept)")
+    args = parser.parse_args()
+
+    # Every run must hit the model, not the persistent cache
+    registry.EMBEDDING_CACHE_ENABLED = False
+    chunks = corpus(args.copies)
+    print(f"📚 {len(chunks)} chunks ({args.copies} copies of data/), {os.cpu_count()} CPU(s)")
+    registry.get_embeddings().embed_query("warm up")
+
+    results = []
+    print(f"\n{'workers':>7} {'chunks/s':>9} {'MB/s':>7} {'speed-up':>9}")
+    for workers in args.workers:
+        best = max((run(chunks, workers, args.batch_size) for _ in range(args.repeat)),
+                   key=lambda r: r["chunks_per_sec"])
+        baseline = results[0]["chunks_per_sec"] if results else best["chunks_per_sec"]
+        best["speedup"] = round(best["chunks_per_sec"] / baseline, 2) if baseline else 0.0
+        results.append(best)
+        print(f"{workers:>7} {best['chunks_per_sec']:>9} {best['mb_per_sec']:>7} {best['speedup']:>8.2f}x")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, "embed_workers.json")
+    with open(out_path, "w") as f:
+        json.dump({"config": vars(args), "cpus": os.cpu_count(), "embedding_model": registry.EMBEDDING_MODEL,
+                   "chunks": len(chunks), "results": results}, f, indent=2)
+    print(f"\n💾 Results written to {out_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Accuracy + latency benchmark for language detection.
+
+Usage:
+    python scripts/bench_language_detection.py [--repeat 20] [--min-confidence 0.8] [--with-llm]
+
+Runs the local detector (app.services.language_detector) over the labelled
+sample in scripts/language_samples.json and reports:
+  - accuracy per language and overall, plus the confusion pairs
+  - how many inputs fall below the confidence threshold (LLM fallbacks), and
+    the accuracy of the confident remainder
+  - p50/p95/p99 latency of local detection
+With --with-llm the Groq detector is run over the same sample for comparison
+(needs GROQ_API_KEY; one API call per sample).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from collections import Counter, defaultdict
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.language_detector import detect_local, get_detector
+from app.utils.metrics import summarize_latencies
+
+SAMPLES_PATH = os.path.join(os.path.dirname(__file__), "language_samples.json")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "../bench_results")
+
+def accuracy_report(samples, predictions) -> dict:
+    per_language = defaultdict(lambda: [0, 0])
+    confusion = Counter()
+    for sample, predicted in zip(samples, predictions):
+        expected = sample["language"]
+        per_language[expected][1] += 1
+        if predicted == expected:
+            per_language[expected][0] += 1
+        else:
+            confusion[f"{expected}->{predicted}"] += 1
+    correct = sum(c for c, _ in per_language.values())
+    return {
+        "accuracy": round(correct / len(samples), 4),
+        "per_language": {lang: round(c / n, 4) for lang, (c, n) in sorted(per_language.items())},
+        "confusion": dict(confusion.most_common()),
+    }
+
+def run_local(samples, repeat: int, min_confidence: float) -> dict:
+    get_detector()  # model training is a one-off startup cost, keep it out of timings
+    detections = [detect_local(s["text"]) for s in samples]
+
+    timings = []
+    for _ in range(repeat):
+        for sample in samples:
+            start = time.perf_counter()
+            detect_local(sample["text"])
+            timings.append(time.perf_counter() - start)
+
+    confident = [(s, d) for s, d in zip(samples, detections) if d.confidence >= min_confidence]
+    report = accuracy_report(samples, [d.language for d in detections])
+    report["min_confidence"] = min_confidence
+    report["llm_fallbacks"] = len(samples) - len(confident)
+    report["confident_accuracy"] = round(
+        sum(d.language == s["language"] for s, d in confident) / len(confident), 4
+    ) if confident else 0.0
+    report["latency"] = summarize_latencies(timings)
+    report["low_confidence"] = [
+        {"text": s["text"], "expected": s["language"], "predicted": d.language, "confidence": d.confidence}
+        for s, d in zip(samples, detections) if d.confidence < min_confidence
+    ]
+    return report
+
+def run_llm(samples) -> dict:
+    from app.services.translation_service import detect_language_llm
+
+    predictions, timings = [], []
+    for sample in samples:
+        start = time.perf_counter()
+        predictions.append(detect_language_llm(sample["text"]))
+        timings.append(time.perf_counter() - start)
+    report = accuracy_report(samples, predictions)
+    report["latency"] = summarize_latencies(timings)
+    return report
+
+def print_report(name: str, report: dict):
+    print(f"\n📊 {name}: accuracy {report['accuracy']:.4f}")
+    for lang, acc in report["per_language"].items():
+        print(f"   {lang:<4} {acc:.4f}")
+    if report["confusion"]:
+        print(f"   confusion: {report['confusion']}")
+    if "llm_fallbacks" in report:
+        print(f"   below {report['min_confidence']}: {report['llm_fallbacks']} → LLM, "
+              f"confident accuracy {report['confident_accuracy']:.4f}")
+    latency = report["latency"]
+    print(f"   latency p50 {latency['p50_ms'] * 1000:.1f} µs, p95 {latency['p95_ms'] * 1000:.1f} µs, "
+          f"p99 {latency['p99_ms'] * 1000:.1f} µs")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default=SAMPLES_PATH)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--min-confidence", type=float, default=float(os.getenv("LANG_DETECT_MIN_CONFIDENCE", "0.8")))
+    parser.add_argument("--with-llm", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.samples, encoding="utf-8") as f:
+        samples = json.load(f)["samples"]
+
+    result = {"timestamp": time.time(), "samples": len(samples), "local": run_local(samples, args.repeat, args.min_confidence)}
+    print_report("local detector", result["local"])
+    if args.with_llm:
+        result["llm"] = run_llm(samples)
+        print_report("LLM detector", result["llm"])
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, "language_detection.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Results written to {out_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Retrieval quality + latency benchmark over the data/ corpus. No LLM is called.
+
+Usage:
+    python scripts/bench_retrieval.py [--k 3] [--repeat 5] [--label hybrid-chroma]
+                                      [--compare bench_results/retrieval_<...>.json]
+
+For every labelled query in scripts/retrieval_queries.json it reports:
+  - recall@k: share of the expected source files found in the top-k chunks
+  - MRR: 1 / rank of the first chunk from an expected source
+  - p50/p95/p99 latency of query embedding, vector search, BM25 search and
+    end-to-end get_retriever().invoke
+Results are written as JSON to bench_results/ so runs with different
+backends / settings (VECTOR_BACKEND, RETRIEVAL_MODE, ...) can be compared.
+
+The embedding cache is bypassed unless --with-embedding-cache is given, so
+embedding latency reflects the model. The model is loaded from the local
+Hugging Face cache; pass --allow-download on a machine that has never run ingestion.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+QUERIES_PATH = os.path.join(os.path.dirname(__file__), "retrieval_queries.json")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "../bench_results")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes over the query set")
+    parser.add_argument("--queries", default=QUERIES_PATH)
+    parser.add_argument("--label", default=None, help="Name for this run (defaults to backend + mode)")
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--compare", default=None, help="Earlier results file to diff against")
+    parser.add_argument("--with-embedding-cache", action="store_true")
+    parser.add_argument("--allow-download", action="store_true")
+    return parser.parse_args()
+
+def _source(doc) -> str:
+    return os.path.basename(doc.metadata.get("source", ""))
+
+def score_query(docs, expected) -> dict:
+    sources = [_source(doc) for doc in docs]
+    expected = set(expected)
+    found = expected & set(sources)
+    first_hit = next((rank for rank, source in enumerate(sources, start=1) if source in expected), None)
+    return {
+        "retrieved": sources,
+        "recall": len(found) / len(expected),
+        "reciprocal_rank": 1.0 / first_hit if first_hit else 0.0,
+    }
+
+def run(args) -> dict:
+    from app.rag import registry
+    from app.rag import retrieval
+    from app.utils.metrics import summarize_latencies
+
+    with open(args.queries, encoding="utf-8") as f:
+        queries = json.load(f)["queries"]
+
+    embeddings = registry.get_embeddings()
+    model = getattr(embeddings, "inner", embeddings)
+    vectorstore = registry.get_vectorstore()
+    lexical_index = registry.get_lexical_index()
+    retriever = retrieval.get_retriever(k=args.k)
+
+    # Untimed warm-up pass; also the quality pass (results are deterministic)
+    per_query = []
+    for item in queries:
+        docs = retriever.invoke(item["question"])
+        per_query.append(dict(question=item["question"], expected=item["expected_sources"],
+                              **score_query(docs, item["expected_sources"])))
+
+    timings = {"embed": [], "vector_search": [], "bm25_search": [], "end_to_end": []}
+    for _ in range(args.repeat):
+        for item in queries:
+            question = item["question"]
+
+            start = time.perf_counter()
+            vector = model.embed_query(question)
+            timings["embed"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            vectorstore.similarity_search_by_vector(vector, k=args.k)
+            timings["vector_search"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            lexical_index.search(question, args.k)
+            timings["bm25_search"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            retriever.invoke(question)
+            timings["end_to_end"].append(time.perf_counter() - start)
+
+    n = len(per_query)
+    return {
+        "label": args.label or f"{registry.VECTOR_BACKEND}-{retrieval.RETRIEVAL_MODE}",
+        "timestamp": time.time(),
+        "config": {
+            "k": args.k,
+            "repeat": args.repeat,
+            "vector_backend": registry.VECTOR_BACKEND,
+            "retrieval_mode": retrieval.RETRIEVAL_MODE,
+            "embedding_model": registry.EMBEDDING_MODEL,
+            "embedding_cache": registry.EMBEDDING_CACHE_ENABLED,
+            "queries": n,
+        },
+        "quality": {
+            f"recall@{args.k}": round(sum(q["recall"] for q in per_query) / n, 4),
+            "mrr": round(sum(q["reciprocal_rank"] for q in per_query) / n, 4),
+        },
+        "latency": {stage: summarize_latencies(values) for stage, values in timings.items()},
+        "per_query": per_query,
+    }
+
+def print_report(result: dict, baseline: dict = None):
+    print(f"\n📊 {result['label']} ({result['config']['queries']} queries, k={result['config']['k']})")
+    for metric, value in result["quality"].items():
+        delta = ""
+        if baseline and metric in baseline.get("quality", {}):
+            delta = f"  ({value - baseline['quality'][metric]:+.4f})"
+        print(f"   {metric:<10} {value:.4f}{delta}")
+
+    print(f"\n   {'stage':<14} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for stage, stats in result["latency"].items():
+        line = f"   {stage:<14} {stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}"
+        if baseline and stage in baseline.get("latency", {}):
+            line += f"  (p50 {stats['p50_ms'] - baseline['latency'][stage]['p50_ms']:+.3f})"
+        print(line)
+
+    misses = [q for q in result["per_query"] if q["recall"] < 1.0]
+    if misses:
+        print("\n   Missed:")
+        for q in misses:
+            print(f"   - {q['question']!r}: expected {q['expected']}, got {q['retrieved']}")
+
+def main():
+    args = parse_args()
+    if not args.with_embedding_cache:
+        os.environ["EMBEDDING_CACHE"] = "false"
+    if not args.allow_download:
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+    result = run(args)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = args.output or os.path.join(
+        RESULTS_DIR, f"retrieval_{result['label']}_{time.strftime('%Y%m%d%H%M%S')}.json"
+    )
+    with open(out_path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\n💾 Results written to {out_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Concurrency benchmark for the session store (app/db/session_db.py).
+
+Usage:
+    python scripts/bench_session_db.py [--threads 1 8 32 64] [--duration 3] [--sessions 10000]
+
+Each thread is a user hitting the store as process_message does. Three
+workloads run at each thread count:
+  read   get_session only
+  write  update_session only
+  mixed  one get_session then one update_session per "message"
+Three stores are compared on copies of the same seeded database (temp
+files, never sessions.db):
+  legacy  the previous implementation: a new connection per call, rollback journal
+  pooled  session_db with SESSION_CACHE=false: pooled WAL connections with tuned pragmas
+  cached  session_db as deployed: the write-behind session cache over the pool
+The cached store's run ends with a flush, so its figures include writing
+every acknowledged update to disk.
+Reported: reads/s and writes/s, p50/p95 operation latency, the number of
+"database is locked" errors and, for the cache, its hit rate and flush
+latency. Results are written to bench_results/session_db.json.
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.db import session_db
+from app.utils.metrics import summarize_latencies
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "../bench_results")
+
+def session_data(i: int) -> dict:
+    # A completed survey: the JSON blob every turn reads and rewrites
+    return {
+        "language": random.choice(["en", "hi", "mr"]),
+        "name": f"User {i}", "gender": "Female", "age": str(20 + i % 50),
+        "occupation": random.choice(["Farmer", "Shopkeeper", "Driver", "Teacher"]),
+        "family": "Husband and two children", "worry": "Crop failure because of drought",
+        "recommendation": "Pradhan Mantri Fasal Bima Yojana covers crop loss from natural calamities. " * 8,
+    }
+
+class LegacyStore:
+    """
+    The session_db functions as they were: connect, one statement, close.
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+    def activate(self):
+        pass
+
+    def finish(self) -> dict:
+        return {}
+
+    def get_session(self, user_id: str):
+        conn = sqlite3.connect(self.path)
+        row = conn.execute("SELECT step, data FROM sessions WHERE user_id = ?", (user_id,)).fetchone()
+        conn.close()
+        return {"step": row[0], "data": json.loads(row[1])} if row else {"step": "welcome", "data": {}}
+
+    def update_session(self, user_id: str, step: str, data: dict):
+        conn = sqlite3.connect(self.path)
+        conn.execute("INSERT OR REPLACE INTO sessions (user_id, step, data) VALUES (?, ?, ?)",
+                     (user_id, step, json.dumps(data)))
+        conn.commit()
+        conn.close()
+
+class PooledStore:
+    def __init__(self, path: str, cached: bool):
+        self.path = path
+        self.cached = cached
+
+    def activate(self):
+        # A fresh (cold) cache per run, so its stats cover this run only
+        session_db.close_sessions()
+        session_db.SESSION_CACHE = self.cached
+        session_db.DB_PATH = self.path
+        session_db.init_db()
+
+    def finish(self) -> dict:
+        if not self.cached:
+            return {}
+        session_db.flush_sessions()
+        stats = session_db.get_cache().stats()
+        return {"cache": {k: stats[k] for k in ("hit_rate", "flushes", "flushed_rows", "coalesced", "avg_batch", "flush_latency")}}
+
+    def get_session(self, user_id: str):
+        return session_db.get_session(user_id)
+
+    def update_session(self, user_id: str, step: str, data: dict):
+        session_db.update_session(user_id, step, data)
+
+def seed(path: str, n: int, wal: bool):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=" + ("WAL" if wal else "DELETE"))
+    conn.execute("CREATE TABLE IF NOT EXISTS sessions (user_id TEXT PRIMARY KEY, step TEXT, data TEXT)")
+    conn.executemany("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+                     ((f"user_{i}", "completed", json.dumps(session_data(i))) for i in range(n)))
+    conn.commit()
+    conn.close()
+
+def run(store, workload: str, threads: int, duration: float, n_sessions: int) -> dict:
+    reads, writes = [], []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def user(seed_value: int):
+        rng = random.Random(seed_value)
+        my_reads, my_writes, my_errors = [], [], 0
+        while time.perf_counter() < deadline:
+            user_id = f"user_{rng.randrange(n_sessions)}"
+            try:
+                if workload in ("read", "mixed"):
+                    start = time.perf_counter()
+                    session = store.get_session(user_id)
+                    my_reads.append(time.perf_counter() - start)
+                else:
+                    session = {"step": "completed", "data": session_data(rng.randrange(n_sessions))}
+                if workload in ("write", "mixed"):
+                    session["data"]["last_message"] = rng.random()
+                    start = time.perf_counter()
+                    store.update_session(user_id, session["step"], session["data"])
+                    my_writes.append(time.perf_counter() - start)
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                my_errors += 1
+        with lock:
+            reads.extend(my_reads)
+            writes.extend(my_writes)
+            errors[0] += my_errors
+
+    store.activate()
+    workers = [threading.Thread(target=user, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    extra = store.finish()
+    wall = time.perf_counter() - start
+    return {
+        "reads_per_s": round(len(reads) / wall),
+        "writes_per_s": round(len(writes) / wall),
+        "read_latency": summarize_latencies(reads),
+        "write_latency": summarize_latencies(writes),
+        "locked_errors": errors[0],
+        **extra,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per run")
+    parser.add_argument("--sessions", type=int, default=10000, help="Sessions seeded in the database")
+    parser.add_argument("--workloads", nargs="+", default=["read", "write", "mixed"], choices=["read", "write", "mixed"])
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_session_db_")
+    legacy_path = os.path.join(tmp, "legacy.db")
+    pooled_path = os.path.join(tmp, "pooled.db")
+    cached_path = os.path.join(tmp, "cached.db")
+    random.seed(0)
+    seed(legacy_path, args.sessions, wal=False)
+    seed(pooled_path, args.sessions, wal=True)
+    seed(cached_path, args.sessions, wal=True)
+    stores = {"legacy": LegacyStore(legacy_path), "pooled": PooledStore(pooled_path, cached=False),
+              "cached": PooledStore(cached_path, cached=True)}
+
+    results = []
+    print(f"\n{'store':<7} {'workload':<8} {'threads':>7} {'reads/s':>9} {'writes/s':>9} "
+          f"{'read p95 ms':>12} {'write p95 ms':>13} {'locked':>7}")
+    for workload in args.workloads:
+        for threads in args.threads:
+            for name, store in stores.items():
+                r = run(store, workload, threads, args.duration, args.sessions)
+                results.append({"store": name, "workload": workload, "threads": threads, **r})
+                cache = r.get("cache")
+                note = (f"  hit rate {cache['hit_rate']:.0%}, {cache['flushes']} flushes of {cache['avg_batch']:.0f} rows, "
+                        f"flush p95 {cache['flush_latency']['p95_ms']:.1f} ms") if cache else ""
+                print(f"{name:<7} {workload:<8} {threads:>7} {r['reads_per_s']:>9} {r['writes_per_s']:>9} "
+                      f"{r['read_latency']['p95_ms']:>12.2f} {r['write_latency']['p95_ms']:>13.2f} {r['locked_errors']:>7}{note}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, "session_db.json")
+    with open(out_path, "w") as f:
+        json.dump({"config": vars(args), "session_db": session_db.get_session_db_stats(), "results": results}, f, indent=2)
+    print(f"\n💾 Results written to {out_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Write throughput of the sharded session store (SESSION_SHARDS).
+
+Usage:
+    python scripts/bench_session_shards.py [--shards 1 2 4 8] [--threads 32] [--duration 3] [--commit-ms 0 2]
+
+Threads act as users ending their turn with update_session, write-through
+(SESSION_CACHE=false, so every update is a commit), against fresh temp shard
+files (never sessions.db). Two storage models run at each shard count:
+  commit-ms 0  update_session as is: the device's real commit cost
+  commit-ms N  each write holds its shard's write lock N ms longer before
+               committing. This stands in for a device whose fsync takes N ms
+               (synchronous=FULL on network or busy disks). The write goes
+               through the same shard pool, as session_db does.
+A shard's writes are serialised by its write lock, so once the commit (and not
+the CPU) is the bottleneck, throughput grows with the number of shards.
+Reported: writes/s, p50/p95 write latency, and the speed-up over one shard.
+Results are written to bench_results/session_shards.json.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.db import session_db
+from app.utils.metrics import summarize_latencies
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "../bench_results")
+DATA = {
+    "language": "hi", "name": "User", "gender": "Female", "age": "34", "occupation": "Farmer",
+    "family": "Husband and two children", "worry": "Crop failure because of drought",
+    "recommendation": "Pradhan Mantri Fasal Bima Yojana covers crop loss from natural calamities. " * 8,
+}
+
+def slow_commit_write(user_id: str, commit_ms: float):
+    payload = json.dumps(DATA)
+    with session_db.shard_for(user_id).pool.connection() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(session_db.UPSERT_SESSION, (user_id, "completed", payload, time.time()))
+        time.sleep(commit_ms / 1000)
+        conn.commit()
+
+def run(shards: int, threads: int, duration: float, commit_ms: float, users: int) -> dict:
+    session_db.DB_PATH = os.path.join(tempfile.mkdtemp(prefix="bench_session_shards_"), "sessions.db")
+    session_db.SESSION_SHARDS = shards
+    session_db.init_db()
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def user(seed_value: int):
+        rng = random.Random(seed_value)
+        mine = []
+        while time.perf_counter() < deadline:
+            user_id = f"user_{rng.randrange(users)}"
+            start = time.perf_counter()
+            if commit_ms:
+                slow_commit_write(user_id, commit_ms)
+            else:
+                session_db.update_session(user_id, "completed", DATA)
+            mine.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(mine)
+
+    workers = [threading.Thread(target=user, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    wall = time.perf_counter() - start
+    return {"writes_per_s": round(len(latencies) / wall), "write_latency": summarize_latencies(latencies)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per run")
+    parser.add_argument("--commit-ms", type=float, nargs="+", default=[0, 2], help="Extra write-lock hold per commit")
+    parser.add_argument("--users", type=int, default=100000)
+    args = parser.parse_args()
+    session_db.SESSION_CACHE = False
+
+    results = []
+    print(f"\n{'commit ms':>9} {'shards':>6} {'writes/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'speed-up':>9}")
+    for commit_ms in args.commit_ms:
+        baseline = None
+        for shards in args.shards:
+            r = run(shards, args.threads, args.duration, commit_ms, args.users)
+            baseline = baseline or r["writes_per_s"]
+            r["speedup"] = round(r["writes_per_s"] / baseline, 2) if baseline else 0.0
+            results.append({"commit_ms": commit_ms, "shards": shards, **r})
+            print(f"{commit_ms:>9g} {shards:>6} {r['writes_per_s']:>9} {r['write_latency']['p50_ms']:>8.2f} "
+                  f"{r['write_latency']['p95_ms']:>8.2f} {r['speedup']:>8.2f}x")
+    session_db.close_sessions()
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, "session_shards.json")
+    with open(out_path, "w") as f:
+        json.dump({"config": vars(args), "cpus": os.cpu_count(), "results": results}, f, indent=2)
+    print(f"\n💾 Results written to {out_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Compares query latency and memory of the Chroma store (chroma_db/) against the
+in-process NumPy exact-search backend (app.rag.numpy_store).
+
+Usage:
+    python scripts/bench_vector_backends.py [--queries 500] [--k 3]
+
+The Chroma collection is exported once into a NumPy index with the same vectors,
+then each backend is measured in its own subprocess so RSS figures don't mix.
+Query embeddings are computed before timing starts: only the search is measured.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.metrics import current_rss_mb, summarize_latencies
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "../bench_results")
+
+SAMPLE_QUESTIONS = [
+    "What is PMFBY?",
+    "How do I claim crop insurance?",
+    "What is the premium for Kharif crops?",
+    "Who is eligible for Ayushman Bharat?",
+    "How much hospital cover does Ayushman Bharat give?",
+    "What is the maturity benefit of Jeevan Anand?",
+    "What is a sum assured?",
+    "Explain LIC Micro Bachat",
+    "What does a nominee mean?",
+    "Is flood damage covered?",
+]
+
+def run_backend(backend: str, numpy_dir: str, n_queries: int, k: int) -> dict:
+    from langchain_community.vectorstores import Chroma
+    from app.rag import registry
+    from app.rag.numpy_store import NumpyVectorStore
+
+    embeddings = registry.get_embeddings()
+    query_vectors = embeddings.embed_documents(SAMPLE_QUESTIONS)
+
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    if backend == "numpy":
+        store = NumpyVectorStore(persist_directory=numpy_dir, embedding_function=embeddings)
+    else:
+        store = Chroma(persist_directory=registry.DB_PATH, embedding_function=embeddings)
+    open_seconds = time.perf_counter() - start
+
+    timings = []
+    for i in range(n_queries):
+        vector = query_vectors[i % len(query_vectors)]
+        start = time.perf_counter()
+        store.similarity_search_by_vector(vector, k=k)
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "backend": backend,
+        "open_ms": round(open_seconds * 1000, 2),
+        "rss_delta_mb": round(current_rss_mb() - rss_before, 1),
+        "rss_total_mb": round(current_rss_mb(), 1),
+        "query": summarize_latencies(timings),
+    }
+
+def export_numpy(numpy_dir: str) -> int:
+    from app.rag import registry
+    from app.rag.numpy_store import NumpyVectorStore
+
+    chroma = registry.get_vectorstore() if registry.VECTOR_BACKEND == "chroma" else None
+    if chroma is None:
+        raise SystemExit("Run with VECTOR_BACKEND=chroma so the Chroma store can be exported.")
+    store = NumpyVectorStore.from_chroma(chroma, numpy_dir, registry.get_embeddings())
+    return len(store)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--backend", choices=["chroma", "numpy"], help=argparse.SUPPRESS)
+    parser.add_argument("--numpy-dir", help="Reuse an exported NumPy index instead of a fresh temp export")
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(run_backend(args.backend, args.numpy_dir, args.queries, args.k)))
+        return
+
+    numpy_dir = args.numpy_dir or tempfile.mkdtemp(prefix="numpy_db_")
+    if not args.numpy_dir:
+        print(f"📤 Exporting Chroma collection to {numpy_dir}...")
+        print(f"   {export_numpy(numpy_dir)} chunks exported.")
+
+    results = []
+    for backend in ("chroma", "numpy"):
+        print(f"⏱️ Benchmarking {backend}...")
+        output = subprocess.run(
+            [sys.executable, __file__, "--backend", backend, "--numpy-dir", numpy_dir,
+             "--queries", str(args.queries), "--k", str(args.k)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"\n{'backend':<8} {'open ms':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'+RSS MB':>8}")
+    for r in results:
+        q = r["query"]
+        print(f"{r['backend']:<8} {r['open_ms']:>9} {q['p50_ms']:>8} {q['p95_ms']:>8} {q['p99_ms']:>8} {r['rss_delta_mb']:>8}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, "vector_backends.json")
+    with open(out_path, "w") as f:
+        json.dump({"timestamp": time.time(), "queries": args.queries, "k": args.k, "results": results}, f, indent=2)
+    print(f"\n💾 Results written to {out_path}")
+
+if __name__ == "__main__":
+    main()
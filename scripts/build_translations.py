@@ -0,0 +1,124 @@
+"""
+Builds app/models/prompts/translations.json: every fixed message in
+app/models/prompts/messages.py translated into every supported language.
+
+Usage:
+    python scripts/build_translations.py [--languages hi mr ta] [--force] [--check]
+
+Only missing entries and entries whose English source changed are translated
+(one LLM call each, needs GROQ_API_KEY); reviewed translations already in the
+table are kept. `{placeholders}` are swapped for opaque tokens before
+translation and must come back intact, otherwise the entry is skipped and the
+runtime falls back to live translation for it.
+--check only reports missing/stale entries and exits non-zero if there are any.
+"""
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.models.prompts.messages import MESSAGES, SUPPORTED_LANGUAGES, source_hash
+from app.services.message_catalog import TRANSLATIONS_PATH, TABLE_SCHEMA_VERSION
+
+PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+
+def load_table(path: str) -> dict:
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            table = json.load(f)
+        if table.get("schema_version") == TABLE_SCHEMA_VERSION:
+            return table
+        print(f"⚠️ Schema changed ({table.get('schema_version')} -> {TABLE_SCHEMA_VERSION}); rebuilding from scratch.")
+    return {"schema_version": TABLE_SCHEMA_VERSION, "languages": {}}
+
+def table_version(languages: dict) -> str:
+    """
+    Content hash of the table, so a deployed build can be matched to its source.
+    """
+    digest = hashlib.sha256()
+    for lang in sorted(languages):
+        for key in sorted(languages[lang]):
+            entry = languages[lang][key]
+            digest.update(f"{lang}\x00{key}\x00{entry['source_hash']}\x00{entry['text']}\x00".encode("utf-8"))
+    return digest.hexdigest()[:12]
+
+def pending_entries(table: dict, languages, force: bool):
+    for lang in languages:
+        entries = table["languages"].get(lang, {})
+        for key, text in MESSAGES.items():
+            entry = entries.get(key)
+            if force or entry is None or entry.get("source_hash") != source_hash(text):
+                yield lang, key, text
+
+def translate_template(text: str, lang: str) -> str:
+    from app.services.translation_service import translate_to_user_lang
+
+    names = PLACEHOLDER_RE.findall(text)
+    protected = text
+    for i, name in enumerate(names):
+        protected = protected.replace(f"{{{name}}}", f"[[{i}]]")
+
+    translated = translate_to_user_lang(protected, lang)
+    for i, name in enumerate(names):
+        if f"[[{i}]]" not in translated:
+            raise ValueError(f"placeholder {{{name}}} lost in translation")
+        translated = translated.replace(f"[[{i}]]", f"{{{name}}}")
+    return translated
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--languages", nargs="+", default=list(SUPPORTED_LANGUAGES))
+    parser.add_argument("--output", default=TRANSLATIONS_PATH)
+    parser.add_argument("--force", action="store_true", help="Re-translate every entry")
+    parser.add_argument("--check", action="store_true", help="Report missing/stale entries without translating")
+    args = parser.parse_args()
+
+    table = load_table(args.output)
+    pending = list(pending_entries(table, args.languages, args.force))
+
+    if args.check:
+        for lang, key, _ in pending:
+            print(f"   missing/stale: {lang} {key}")
+        print(f"{'❌' if pending else '✅'} {len(pending)} entries need translating (table version {table.get('version')})")
+        sys.exit(1 if pending else 0)
+
+    from app.services.llm_scheduler import groq_model
+    from app.services.llm_scheduler import llm_priority, BACKGROUND
+
+    print(f"🌐 Translating {len(pending)} entries into {', '.join(args.languages)}...")
+    failed = 0
+    for lang, key, text in pending:
+        try:
+            # Yield to live chat traffic if run against the production keys
+            with llm_priority(BACKGROUND):
+                translated = translate_template(text, lang)
+        except Exception as e:
+            print(f"   ❌ {lang} {key}: {e}")
+            failed += 1
+            continue
+        table["languages"].setdefault(lang, {})[key] = {
+            "text": translated,
+            "source_hash": source_hash(text),
+            "translator": groq_model(),
+        }
+        print(f"   ✅ {lang} {key}")
+
+    # Drop entries for messages that no longer exist
+    for entries in table["languages"].values():
+        for key in [k for k in entries if k not in MESSAGES]:
+            del entries[key]
+
+    table["version"] = table_version(table["languages"])
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(table, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write("\n")
+    print(f"💾 Wrote {args.output} (version {table['version']}, {failed} failed)")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -1,60 +1,47 @@
-
 import os
 import sys
+import time
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from app.rag.ingestion import split_documents, index_documents
-from langchain_community.document_loaders import TextLoader, PyPDFLoader
+from app.rag.ingestion import sync_directory
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "../data")
 
 def ingest_folder():
     print(f"📂 Scanning for documents in: {DATA_DIR}")
-    
+
     if not os.path.exists(DATA_DIR):
         print(f"❌ Data directory not found: {DATA_DIR}")
         return
 
     files = [f for f in os.listdir(DATA_DIR) if f.endswith(".txt") or f.endswith(".pdf")]
-    
+
     if not files:
+        # Still sync: documents that were deleted must leave the index too
         print("⚠️ No documents found.")
-        return
 
-    all_chunks = []
-    
-    for filename in files:
-        filepath = os.path.join(DATA_DIR, filename)
-        print(f"📄 Processing: {filename}...")
-        
-        try:
-            if filename.endswith(".pdf"):
-                loader = PyPDFLoader(filepath)
-            else:
-                loader = TextLoader(filepath, encoding='utf-8')
-            
-            docs = loader.load()
-            print(f"   - Loaded {len(docs)} pages/sections.")
-            
-            # Add metadata if missing
-            for doc in docs:
-                doc.metadata["source"] = filename
-            
-            chunks = split_documents(docs)
-            print(f"   - Split into {len(chunks)} chunks.")
-            all_chunks.extend(chunks)
-            
-        except Exception as e:
-            print(f"❌ Error reading {filename}: {e}")
-
-    if all_chunks:
-        print(f"💾 Indexing {len(all_chunks)} total chunks to ChromaDB...")
-        count = index_documents(all_chunks)
-        print(f"✅ Success! Indexed {count} new knowledge chunks.")
+    # Only new/changed content is embedded; see app.rag.ingestion.sync_directory
+    start = time.perf_counter()
+    report = sync_directory(DATA_DIR)
+    elapsed = time.perf_counter() - start
+
+    for filename in report["new_files"]:
+        print(f"🆕 New: {filename}")
+    for filename in report["changed_files"]:
+        print(f"✏️ Changed: {filename}")
+    for filename in report["deleted_files"]:
+        print(f"🗑️ Deleted: {filename}")
+    for filename in report["failed_files"]:
+        print(f"❌ Failed: {filename}")
+    print(f"⏭️ Unchanged: {len(report['unchanged_files'])} file(s)")
+
+    if report["chunks_added"] or report["chunks_removed"] or report["chunks_moved"]:
+        print(f"✅ Index updated in {elapsed:.2f}s: +{report['chunks_added']} / -{report['chunks_removed']} chunks "
+              f"({report['chunks_kept']} kept, {report['chunks_moved']} moved).")
     else:
-        print("⚠️ No chunks created.")
+        print(f"✅ Index already up to date ({report['chunks_kept']} chunks, {elapsed:.2f}s).")
 
 if __name__ == "__main__":
     ingest_folder()
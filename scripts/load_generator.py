@@ -0,0 +1,354 @@
+"""
+End-to-end load generator for the API server (app/api/server.py).
+
+Usage:
+    # 1. Start the server against the provider stand-ins (app/services/stand_ins.py)
+    PROVIDER_STAND_INS=all STAND_IN_TWILIO_CALLBACK=http://127.0.0.1:8765/twilio \\
+        uvicorn app.api.server:app --port 8000
+    # 2. Replay traffic against it
+    python scripts/load_generator.py [--url http://127.0.0.1:8000] [--users 16] [--duration 60]
+                                     [--mix survey=3,rag=5,voice=2] [--whatsapp 0.3] [--hindi 0.3]
+                                     [--think 1.0] [--callback-port 8765] [--seed 7]
+
+Each virtual user is a closed loop (send, wait for the reply, think, repeat)
+running one of three scenarios, picked by the --mix weights:
+  survey  a new session answers the whole survey (7 turns, the last one
+          triggers the recommendation and PDF report)
+  rag     1-3 questions on a session that finished the survey
+  voice   a voice-note question on a finished session
+Sessions that finish a survey are reused by later rag/voice scenarios; when
+none is free the user runs a survey first.
+A --whatsapp share of the users talks through /webhook (text in Body, voice
+notes as stand-in Twilio media URLs) instead of /api/chat and /api/audio.
+The webhook only acknowledges; the reply comes back through the stand-in
+Twilio client, which POSTs it to STAND_IN_TWILIO_CALLBACK. This script
+listens there (--callback-port) and reports the time from webhook to reply
+as "/webhook (reply)".
+
+Reported: requests, errors, throughput and p50/p95/p99 latency per endpoint;
+per-stage latencies and critical-path share from the stage_timings of the web
+replies; the server's own pipeline stats (webhook turns included) and the
+stand-in provider stats from /api/metrics.
+The server keeps its provider rate limits (GROQ_RPM, GEMINI_RPM...), so the
+scheduler queues calls as it would in production; raise them on the server to
+measure the service without the quota.
+Results are written to bench_results/load_generator.json.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import threading
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.metrics import summarize_latencies
+from app.services.stand_ins import media_url, voice_note_bytes
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "../bench_results")
+
+# (English, Hindi) answers, one per survey turn from "welcome" to "ask_worry"
+SURVEY_ANSWERS = [
+    ("Hi", "नमस्ते"),
+    ("Ramesh Patil", "रमेश पाटिल"),
+    ("Male", "पुरुष"),
+    ("I am 42 years old", "मेरी उम्र 42 साल है"),
+    ("Farmer", "मैं किसान हूँ"),
+    ("Wife and two children", "पत्नी और दो बच्चे"),
+    ("Crop failure because of drought", "सूखे की वजह से फसल खराब होना"),
+]
+RAG_QUESTIONS = [
+    ("What does PMFBY cover?", "प्रधानमंत्री फसल बीमा योजना में क्या कवर होता है?"),
+    ("How do I claim crop insurance after a flood?", "बाढ़ के बाद फसल बीमा का दावा कैसे करें?"),
+    ("What is the premium for term life insurance?", "टर्म लाइफ बीमा का प्रीमियम कितना है?"),
+    ("Is there accident cover for farm labourers?", "क्या खेत मजदूरों के लिए दुर्घटना बीमा है?"),
+    ("Which documents do I need to enrol?", "नामांकन के लिए कौन से दस्तावेज़ चाहिए?"),
+]
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.stages = defaultdict(list)
+        self.on_critical_path = Counter()
+        self.turns_with_timings = 0
+        self.scenarios = Counter()
+
+    def request(self, endpoint: str, seconds: float, ok: bool):
+        with self._lock:
+            if ok:
+                self.latencies[endpoint].append(seconds)
+            else:
+                self.errors[endpoint] += 1
+
+    def timings(self, timings: dict):
+        with self._lock:
+            self.turns_with_timings += 1
+            for name, stage in timings.get("stages", {}).items():
+                if stage.get("status") == "done" and stage.get("duration_ms") is not None:
+                    self.stages[name].append(stage["duration_ms"] / 1000)
+            self.on_critical_path.update(timings.get("critical_path", []))
+
+    def report(self, wall: float) -> dict:
+        with self._lock:
+            endpoints = {}
+            for endpoint in sorted(set(self.latencies) | set(self.errors)):
+                values = self.latencies[endpoint]
+                endpoints[endpoint] = {
+                    "requests": len(values) + self.errors[endpoint],
+                    "errors": self.errors[endpoint],
+                    "throughput_rps": round(len(values) / wall, 2),
+                    "latency": summarize_latencies(values),
+                }
+            stages = {
+                name: {**summarize_latencies(values),
+                       "critical_path_share": round(self.on_critical_path[name] / self.turns_with_timings, 3)}
+                for name, values in sorted(self.stages.items(), key=lambda item: -sum(item[1]))
+            }
+            return {"wall_s": round(wall, 1), "scenarios": dict(self.scenarios), "endpoints": endpoints, "stages": stages}
+
+class WhatsAppInbox:
+    """
+    Receives the messages the stand-in Twilio client sends, and hands each to
+    the virtual user waiting on that number.
+    """
+    def __init__(self, port: int):
+        self.port = port
+        self._waiting = {}
+        self._lock = threading.Lock()
+        self.loop = None
+        self.server = None
+
+    def expect(self, number: str) -> asyncio.Future:
+        future = self.loop.create_future()
+        with self._lock:
+            self._waiting[number] = future
+        return future
+
+    def deliver(self, message: dict):
+        with self._lock:
+            future = self._waiting.pop(message.get("to"), None)
+        if future is not None:
+            self.loop.call_soon_threadsafe(lambda: future.done() or future.set_result(message))
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        inbox = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self.send_response(204)
+                self.end_headers()
+                inbox.deliver(json.loads(body or b"{}"))
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+
+class VirtualUser:
+    def __init__(self, n: int, client: httpx.AsyncClient, args, recorder: Recorder, inbox: WhatsAppInbox,
+                 completed: dict, rng: random.Random):
+        self.client = client
+        self.args = args
+        self.recorder = recorder
+        self.inbox = inbox
+        self.completed = completed
+        self.rng = rng
+        self.channel = "whatsapp" if rng.random() < args.whatsapp else "web"
+        self.hindi = rng.random() < args.hindi
+        self.n = n
+
+    def _pick(self, pair) -> str:
+        return pair[1] if self.hindi else pair[0]
+
+    def _new_session(self) -> str:
+        if self.channel == "whatsapp":
+            return f"whatsapp:+91{self.rng.randrange(10**9, 10**10)}"
+        return f"load_{self.n}_{uuid.uuid4().hex[:8]}"
+
+    async def _timed(self, endpoint: str, send):
+        start = time.perf_counter()
+        try:
+            response = await send()
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.recorder.request(endpoint, time.perf_counter() - start, ok)
+        return response if ok else None
+
+    async def _web_reply(self, endpoint: str, send):
+        response = await self._timed(endpoint, send)
+        if response is not None:
+            timings = response.json().get("stage_timings")
+            if timings:
+                self.recorder.timings(timings)
+
+    async def _whatsapp(self, session_id: str, form: dict):
+        reply = self.inbox.expect(session_id)
+        start = time.perf_counter()
+        ack = await self._timed("/webhook", lambda: self.client.post("/webhook", data={"From": session_id, **form}))
+        if ack is None:
+            reply.cancel()
+            return
+        try:
+            await asyncio.wait_for(reply, timeout=self.args.reply_timeout)
+            self.recorder.request("/webhook (reply)", time.perf_counter() - start, True)
+        except asyncio.TimeoutError:
+            self.recorder.request("/webhook (reply)", time.perf_counter() - start, False)
+
+    async def say(self, session_id: str, text: str):
+        if self.channel == "whatsapp":
+            await self._whatsapp(session_id, {"Body": text})
+        else:
+            await self._web_reply("/api/chat", lambda: self.client.post(
+                "/api/chat", json={"session_id": session_id, "message": text}))
+
+    async def speak(self, session_id: str, transcript: str):
+        if self.channel == "whatsapp":
+            await self._whatsapp(session_id, {"MediaUrl0": media_url(transcript), "MediaContentType0": "audio/ogg"})
+        else:
+            await self._web_reply("/api/audio", lambda: self.client.post(
+                "/api/audio", data={"session_id": session_id},
+                files={"file": ("voice_note.wav", voice_note_bytes(transcript), "audio/wav")}))
+
+    async def think(self):
+        if self.args.think > 0:
+            await asyncio.sleep(self.rng.expovariate(1 / self.args.think))
+
+    async def survey(self) -> str:
+        self.recorder.scenarios["survey"] += 1
+        session_id = self._new_session()
+        for answer in SURVEY_ANSWERS:
+            await self.say(session_id, self._pick(answer))
+            await self.think()
+        return session_id
+
+    async def finished_session(self) -> str:
+        pool = self.completed[(self.channel, self.hindi)]
+        if pool:
+            return pool.pop(self.rng.randrange(len(pool)))
+        return await self.survey()
+
+    async def run(self, deadline: float):
+        mix = self.args.mix
+        while time.monotonic() < deadline:
+            scenario = self.rng.choices(list(mix), weights=list(mix.values()))[0]
+            if scenario == "survey":
+                session_id = await self.survey()
+            else:
+                session_id = await self.finished_session()
+                self.recorder.scenarios[scenario] += 1
+                if scenario == "rag":
+                    for _ in range(self.rng.randint(1, 3)):
+                        await self.say(session_id, self._pick(self.rng.choice(RAG_QUESTIONS)))
+                        await self.think()
+                else:
+                    await self.speak(session_id, self._pick(self.rng.choice(RAG_QUESTIONS)))
+                    await self.think()
+            self.completed[(self.channel, self.hindi)].append(session_id)
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("survey", "rag", "voice"):
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+def print_report(result: dict):
+    print(f"\n{'endpoint':<18} {'reqs':>6} {'errors':>6} {'req/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for endpoint, r in result["endpoints"].items():
+        lat = r["latency"]
+        print(f"{endpoint:<18} {r['requests']:>6} {r['errors']:>6} {r['throughput_rps']:>7} "
+              f"{lat['p50_ms']:>9.0f} {lat['p95_ms']:>9.0f} {lat['p99_ms']:>9.0f}")
+
+    if result["stages"]:
+        print(f"\n{'stage (web replies)':<20} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'on crit. path':>14}")
+        for name, s in result["stages"].items():
+            print(f"{name:<20} {s['count']:>6} {s['p50_ms']:>9.0f} {s['p95_ms']:>9.0f} {s['critical_path_share']:>14.0%}")
+
+    server = result.get("server", {})
+    pipeline = server.get("pipeline")
+    if pipeline:
+        print(f"\nServer pipeline ({pipeline['requests']} turns incl. webhook): "
+              f"critical path p50 {pipeline['critical_path']['p50_ms']:.0f} ms, "
+              f"p95 {pipeline['critical_path']['p95_ms']:.0f} ms")
+    stand_ins = server.get("stand_ins", {})
+    if not stand_ins.get("enabled"):
+        print("⚠️ The server is calling the real providers (PROVIDER_STAND_INS not set).")
+    for name, p in stand_ins.get("providers", {}).items():
+        print(f"  stand-in {name:<9} calls {p['calls']:>5}  errors {p['errors']:>4}  429s {p['rate_limited']:>4}  "
+              f"p50 {p['latency']['p50_ms']:.0f} ms  p95 {p['latency']['p95_ms']:.0f} ms")
+
+async def main_async(args) -> dict:
+    inbox = WhatsAppInbox(args.callback_port)
+    if args.whatsapp > 0:
+        inbox.start(asyncio.get_running_loop())
+
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    completed = defaultdict(list)
+    limits = httpx.Limits(max_connections=args.users * 2)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.reply_timeout, limits=limits) as client:
+        users = [VirtualUser(n, client, args, recorder, inbox, completed, random.Random(rng.random()))
+                 for n in range(args.users)]
+        print(f"🚀 {args.users} users ({sum(u.channel == 'whatsapp' for u in users)} on WhatsApp) "
+              f"for {args.duration}s against {args.url}, mix {args.mix}")
+        start = time.perf_counter()
+        deadline = time.monotonic() + args.duration
+        await asyncio.gather(*(user.run(deadline) for user in users))
+        result = recorder.report(time.perf_counter() - start)
+        try:
+            metrics = (await client.get("/api/metrics")).json()
+            result["server"] = {"pipeline": metrics.get("pipeline"), "stand_ins": metrics.get("stand_ins"),
+                                "llm_scheduler": metrics.get("llm_scheduler")}
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"⚠️ Could not read /api/metrics: {e}")
+    inbox.stop()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=16, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to keep starting scenarios")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("survey=3,rag=5,voice=2"),
+                        help="Scenario weights, e.g. survey=3,rag=5,voice=2")
+    parser.add_argument("--whatsapp", type=float, default=0.3, help="Share of users on the /webhook channel")
+    parser.add_argument("--hindi", type=float, default=0.3, help="Share of users writing in Hindi")
+    parser.add_argument("--think", type=float, default=1.0, help="Mean think time between turns (s)")
+    parser.add_argument("--reply-timeout", type=float, default=120, help="Seconds to wait for a reply")
+    parser.add_argument("--callback-port", type=int, default=8765, help="Port for STAND_IN_TWILIO_CALLBACK")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    result = asyncio.run(main_async(args))
+    result["config"] = vars(args)
+    print_report(result)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, "load_generator.json")
+    with open(out_path, "w") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Results written to {out_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Concurrency load test for AgentService.process_message.
+
+Usage:
+    python scripts/load_test_agent.py [--latency 0.5] [--concurrency 1 4 16 32] [--requests 32] [--identical]
+
+The Gemini/Groq chains are swapped (through the chain registry) for stand-ins
+that wait --latency seconds per call, so the test needs no API keys and
+measures only how the service schedules its upstream calls. Each request is a
+RAG turn for a Hindi session: translate to English, answer, translate back
+(3 upstream calls).
+
+Two modes are compared at each concurrency level:
+  blocking  the sync service functions called from the coroutine, as
+            process_message did before (each call freezes the event loop)
+  async     AgentService.process_message (ainvoke / executor)
+Reported: wall time, throughput, p50/p95 request latency and the worst event
+loop stall seen by a 10 ms heartbeat. With async calls the throughput grows
+with concurrency; blocking calls serialise everything on the loop.
+--identical sends the same question from every session (a campaign blast), so
+concurrent requests coalesce (see app.utils.singleflight).
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# Every call must reach the stand-in upstreams
+os.environ["SEMANTIC_CACHE"] = "false"
+os.environ["TRANSLATION_MEMORY"] = "false"
+os.environ.setdefault("GOOGLE_API_KEY", "load-test-dummy-key")
+os.environ.setdefault("GROQ_API_KEY", "load-test-dummy-key")
+# The stand-ins have no provider limits; don't let the scheduler pace them
+for limit in ("GROQ_RPM", "GROQ_TPM", "GEMINI_RPM", "GEMINI_TPM"):
+    os.environ.setdefault(limit, "100000000")
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from app.db import session_db
+from app.services import query_service
+from app.utils.metrics import summarize_latencies
+
+def install_stand_ins(latency: float):
+    """
+    Registers fake chains with the same input/output shapes as the real ones.
+    """
+    from app.services.chain_registry import chain_registry
+
+    def translation(inputs):
+        time.sleep(latency)
+        return AIMessage(content=f"translated: {inputs['text']}")
+
+    async def atranslation(inputs):
+        await asyncio.sleep(latency)
+        return AIMessage(content=f"translated: {inputs['text']}")
+
+    def answer(inputs):
+        time.sleep(latency)
+        return {"input": inputs["input"], "context": [], "answer": "PMFBY covers crop loss."}
+
+    async def aanswer(inputs):
+        await asyncio.sleep(latency)
+        return "PMFBY covers crop loss."
+
+    async def aretrieve(question):
+        return []
+
+    for name in ("to_english", "to_user_lang", "detect_language"):
+        chain_registry.register(name, lambda: RunnableLambda(translation, afunc=atranslation))
+    # The sync path runs the whole RAG chain; the async one retrieves, then runs the answer chain
+    chain_registry.register("query", lambda: RunnableLambda(answer))
+    chain_registry.register("query_answer", lambda: RunnableLambda(aanswer))
+    query_service.aretrieve = aretrieve
+
+async def blocking_turn(session_id: str, text: str):
+    """
+    The pre-async call pattern: sync services awaited from nowhere.
+    """
+    from app.services.translation_service import translate_to_english, translate_to_user_lang
+    from app.services.query_service import query_agent
+
+    english = translate_to_english(text, "hi")
+    answer = query_agent(english)["answer"]
+    return translate_to_user_lang(answer, "hi")
+
+async def async_turn(agent, session_id: str, text: str):
+    return await agent.process_message(session_id, text=text)
+
+async def heartbeat(stop: asyncio.Event, stalls: list):
+    interval = 0.01
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - start - interval)
+
+async def run_level(mode: str, agent, concurrency: int, n_requests: int, identical: bool = False) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            session_id = f"load_{mode}_{concurrency}_{i}"
+            text = "mujhe fasal bima ke baare mein batao" + ("" if identical else f" {i}")
+            start = time.perf_counter()
+            if mode == "async":
+                await async_turn(agent, session_id, text)
+            else:
+                await blocking_turn(session_id, text)
+            latencies.append(time.perf_counter() - start)
+
+    stop = asyncio.Event()
+    stalls = []
+    beat = asyncio.create_task(heartbeat(stop, stalls))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n_requests)))
+    wall = time.perf_counter() - start
+    stop.set()
+    await beat
+
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(n_requests / wall, 2),
+        "latency": summarize_latencies(latencies),
+        "max_loop_stall_ms": round(max(stalls, default=0.0) * 1000, 1),
+    }
+
+def seed_sessions(modes, levels, n_requests):
+    # Completed Hindi sessions: every turn is translate -> RAG -> translate
+    for mode in modes:
+        for concurrency in levels:
+            for i in range(n_requests):
+                session_db.update_session(f"load_{mode}_{concurrency}_{i}", "completed", {"language": "hi"})
+
+async def main_async(args):
+    from app.services.agent_service import AgentService
+
+    install_stand_ins(args.latency)
+    agent = AgentService()
+    seed_sessions(args.modes, args.concurrency, args.requests)
+
+    print(f"\n{'mode':<9} {'conc':>5} {'wall s':>8} {'req/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'max stall ms':>13}")
+    for mode in args.modes:
+        for concurrency in args.concurrency:
+            r = await run_level(mode, agent, concurrency, args.requests, args.identical)
+            print(f"{mode:<9} {concurrency:>5} {r['wall_s']:>8} {r['throughput_rps']:>7} "
+                  f"{r['latency']['p50_ms']:>9} {r['latency']['p95_ms']:>9} {r['max_loop_stall_ms']:>13}")
+
+    if "async" in args.modes:
+        from app.workflows.pipeline import get_pipeline_stats
+        stats = get_pipeline_stats()
+        print(f"\nCritical path p50 {stats['critical_path']['p50_ms']} ms; stages on it: {stats['on_critical_path']}")
+        from app.utils.singleflight import get_singleflight_stats
+        for name, flight in get_singleflight_stats().items():
+            print(f"{name}: {flight['upstream_calls']} upstream calls, {flight['saved_calls']} saved")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per stand-in upstream call")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--identical", action="store_true", help="Every session asks the same question")
+    parser.add_argument("--modes", nargs="+", default=["blocking", "async"], choices=["blocking", "async"])
+    args = parser.parse_args()
+
+    # Keep load-test sessions out of the real sessions.db
+    session_db.DB_PATH = os.path.join(tempfile.mkdtemp(prefix="load_test_"), "sessions.db")
+    session_db.init_db()
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main()
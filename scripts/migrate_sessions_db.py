@@ -0,0 +1,66 @@
+"""
+Migrates a sessions database to the current schema in place, while the
+server keeps using it.
+
+Usage:
+    python scripts/migrate_sessions_db.py [--db sessions.db ...] [--batch-size 5000] [--pause 0.05]
+
+Adds updated_at and the survey answers (name, age, occupation, family, worry,
+recommendation, language) as generated columns, backfills updated_at in
+small batches and builds the step/occupation/language/updated_at indexes
+(see session_db.migrate). Every step commits on its own, so live writers
+only ever wait for one batch or one index build. --pause leaves them a gap
+between steps. Safe to interrupt and re-run. The server migrates small
+databases (up to session_db.INLINE_MIGRATION_ROWS) by itself at startup.
+"""
+import os
+import sys
+import time
+import sqlite3
+import argparse
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.db import session_db
+
+def migrate_file(path: str, batch_size: int, pause: float):
+    conn = session_db.get_connection(path)
+    version = session_db.schema_version(conn)
+    conn.close()
+    if version >= session_db.SCHEMA_VERSION:
+        print(f"✅ {path} is already at schema version {version}")
+        return
+
+    print(f"🔧 Migrating {path} from schema version {version} to {session_db.SCHEMA_VERSION}...")
+    last_report = [0.0]
+
+    def progress(message: str):
+        # Backfill batches report at most once a second; other steps always
+        if not message.startswith("backfilled") or time.perf_counter() - last_report[0] > 1:
+            last_report[0] = time.perf_counter()
+            print(f"   {message}")
+
+    try:
+        stats = session_db.migrate(path, batch_size=batch_size, pause=pause, progress=progress)
+    except sqlite3.OperationalError as e:
+        sys.exit(f"❌ Migration stopped ({e}); re-run to continue where it left off")
+    print(f"✅ Done in {stats['seconds']:.1f}s: {stats['backfilled']} rows backfilled in {stats['batches']} batches, "
+          f"{len(stats['indexes'])} indexes built")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", nargs="+", default=session_db.shard_paths(),
+                        help="Sessions database file(s) (default: the app's sessions.db, or all its shards with SESSION_SHARDS)")
+    parser.add_argument("--batch-size", type=int, default=session_db.MIGRATION_BATCH, help="Rows per backfill transaction")
+    parser.add_argument("--pause", type=float, default=0.05, help="Seconds to sleep between batches and index builds")
+    args = parser.parse_args()
+
+    missing = [path for path in args.db if not os.path.exists(path)]
+    if missing:
+        sys.exit(f"❌ {', '.join(missing)} does not exist")
+    for path in args.db:
+        migrate_file(path, args.batch_size, args.pause)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Offline re-shard of the session store: moves every session from N shard files
+to M by the same user_id hash the app uses (session_db.shard_index).
+
+Usage:
+    python scripts/reshard_sessions.py --to 4 [--from 1] [--db sessions.db] [--batch-size 5000] [--force]
+
+Stop the server (and anything else writing sessions) first: updates made
+while this runs would be missed. Sources are read a batch at a time and left
+untouched. Targets (sessions.0-of-M.db ... next to --db, or --db itself
+for M=1) are created with the current schema, and their indexes are built
+after loading. Once the row counts check out, start the server with
+SESSION_SHARDS=M and delete the old files when you are satisfied.
+"""
+import os
+import sys
+import time
+import argparse
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.db import session_db
+
+SELECT_BATCH = "SELECT rowid, user_id, step, data, updated_at FROM sessions WHERE rowid > ? ORDER BY rowid LIMIT ?"
+# A user present in two source shards (should not happen) keeps its latest write
+INSERT_SESSION = (
+    "INSERT INTO sessions (user_id, step, data, updated_at) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(user_id) DO UPDATE SET step = excluded.step, data = excluded.data, updated_at = excluded.updated_at "
+    "WHERE excluded.updated_at > sessions.updated_at"
+)
+
+def count(path: str) -> int:
+    conn = session_db.get_connection(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+    finally:
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=session_db.DB_PATH, help="Base sessions database path (default: the app's sessions.db)")
+    parser.add_argument("--from", dest="source", type=int, default=session_db.SESSION_SHARDS, help="Current shard count")
+    parser.add_argument("--to", dest="target", type=int, required=True, help="New shard count")
+    parser.add_argument("--batch-size", type=int, default=session_db.MIGRATION_BATCH)
+    parser.add_argument("--force", action="store_true", help="Overwrite target files that already hold sessions")
+    args = parser.parse_args()
+
+    if args.source == args.target or min(args.source, args.target) < 1:
+        sys.exit("❌ --from and --to must be different positive shard counts")
+    sources = session_db.shard_paths(args.db, args.source)
+    targets = session_db.shard_paths(args.db, args.target)
+    missing = [p for p in sources if not os.path.exists(p)]
+    if missing:
+        sys.exit(f"❌ Missing source shard(s): {', '.join(missing)}")
+    occupied = [p for p in targets if os.path.exists(p) and count(p)]
+    if occupied and not args.force:
+        sys.exit(f"❌ Target file(s) already hold sessions: {', '.join(occupied)} (use --force to replace them)")
+
+    start = time.perf_counter()
+    for path in targets:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    out = [session_db.get_connection(path) for path in targets]
+    for conn in out:
+        session_db.create_schema(conn)
+
+    print(f"🔀 Resharding {args.source} -> {args.target} shard(s)...")
+    copied = 0
+    per_target = [0] * args.target
+    try:
+        for path in sources:
+            # Sources from before the schema change need updated_at (offline, so migrate in one go)
+            conn = session_db.get_connection(path)
+            if session_db.schema_version(conn) < session_db.SCHEMA_VERSION:
+                conn.close()
+                session_db.migrate(path, batch_size=args.batch_size)
+                conn = session_db.get_connection(path)
+            last = 0
+            try:
+                while True:
+                    rows = conn.execute(SELECT_BATCH, (last, args.batch_size)).fetchall()
+                    if not rows:
+                        break
+                    last = rows[-1][0]
+                    buckets = [[] for _ in targets]
+                    for _, user_id, step, data, updated_at in rows:
+                        buckets[session_db.shard_index(user_id, args.target)].append((user_id, step, data, updated_at))
+                    for i, bucket in enumerate(buckets):
+                        if bucket:
+                            out[i].executemany(INSERT_SESSION, bucket)
+                            out[i].commit()
+                            per_target[i] += len(bucket)
+                    copied += len(rows)
+            finally:
+                conn.close()
+            print(f"   {os.path.basename(path)}: done ({copied} sessions so far)")
+    finally:
+        for conn in out:
+            conn.close()
+
+    for path in targets:
+        session_db.migrate(path, batch_size=args.batch_size)
+
+    expected = sum(count(path) for path in sources)
+    written = sum(count(path) for path in targets)
+    if written != expected:
+        sys.exit(f"❌ Row counts differ: {expected} in the sources, {written} in the targets")
+    print(f"✅ {written} sessions in {time.perf_counter() - start:.1f}s: "
+          + ", ".join(f"{os.path.basename(p)} {n}" for p, n in zip(targets, per_target)))
+    print(f"   Start the server with SESSION_SHARDS={args.target}; the old files are left in place.")
+
+if __name__ == "__main__":
+    main()
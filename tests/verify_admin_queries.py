@@ -0,0 +1,57 @@
+import sys
+import os
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.db import session_db
+
+def seed():
+    session_db.DB_PATH = os.path.join(tempfile.mkdtemp(prefix="verify_admin_queries_"), "sessions.db")
+    session_db.init_db()
+    for n in range(30):
+        occupation = "Farmer" if n % 3 else "Driver"
+        session_db.update_session(f"done_{n}", "completed", {"name": f"User {n}", "occupation": occupation,
+                                                             "language": "hi" if n % 2 else "en",
+                                                             "recommendation": "PMFBY"})
+    for n in range(10):
+        session_db.update_session(f"half_{n}", "ask_family", {"name": f"Half {n}", "occupation": "Tailor"})
+    session_db.update_session("new_user", "ask_name", {"language": "mr"})
+    session_db.update_session("reset_user", "welcome", {})
+
+def test_aggregates():
+    seed()
+    stats = session_db.get_lead_stats()
+    assert stats["total"] == 41 and stats["completed"] == 30
+    assert stats["by_step"] == {"completed": 30, "ask_family": 10, "ask_name": 1}
+    assert stats["top_occupations"][0] == {"occupation": "Farmer", "count": 20}
+    assert session_db.list_occupations() == ["Driver", "Farmer", "Tailor"]
+    funnel = {stage["step"]: stage["reached"] for stage in stats["funnel"]}
+    assert funnel["ask_name"] == 41 and funnel["ask_family"] == 40 and funnel["completed"] == 30
+    print("✅ Lead counts, top occupation and funnel are computed in SQL (empty sessions excluded)")
+
+def test_keyset_pagination_and_filters():
+    seed()
+    seen, cursor = [], None
+    while True:
+        page = session_db.list_leads(limit=7, cursor=cursor)
+        seen.extend(lead["user_id"] for lead in page["leads"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == len(set(seen)) == 41 and seen[0] == "new_user"
+
+    # A session that is updated moves to the front
+    session_db.update_session("done_0", "completed", {"name": "User 0", "occupation": "Driver"})
+    assert session_db.list_leads(limit=1)["leads"][0]["user_id"] == "done_0"
+
+    assert [lead["user_id"] for lead in session_db.iter_leads(batch_size=3, step="ask_family")] == \
+        [f"half_{n}" for n in reversed(range(10))]
+    hindi_farmers = list(session_db.iter_leads(occupation="Farmer", language="hi"))
+    assert len(hindi_farmers) == 10 and all(l["name"].startswith("User") and l["language"] == "hi" for l in hindi_farmers)
+    print("✅ Leads page with a keyset cursor, newest first, with step/occupation/language filters")
+
+if __name__ == "__main__":
+    test_aggregates()
+    test_keyset_pagination_and_filters()
@@ -0,0 +1,67 @@
+import sys
+import os
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.rag.context_packing import pack_documents, merge_chunks, get_packing_stats
+
+PAGE = " ".join(
+    f"Clause {i}: under PMFBY the farmer pays {i % 3 + 1.5}% of the sum insured as premium for crop number {i}."
+    for i in range(40)
+)
+
+def _chunks(add_start_index: bool):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, add_start_index=add_start_index)
+    return splitter.split_documents([Document(page_content=PAGE, metadata={"source": "pmfby.pdf", "page": 3})])
+
+def test_overlapping_chunks_merge():
+    for add_start_index in (True, False):
+        chunks = _chunks(add_start_index)[:3]
+        passages = merge_chunks(chunks)
+        assert len(passages) == 1, (add_start_index, len(passages))
+        text = passages[0][0].page_content
+        # Each clause appears once: the 200-character overlaps are gone
+        assert all(text.count(f"Clause {i}:") == 1 for i in range(12))
+    print("✅ Overlapping chunks of one page merge into a single passage (with and without start_index)")
+
+def test_stale_offsets_never_cut_text():
+    first, second = _chunks(True)[:2]
+    # An offset left over from an older version of the file claims 600 characters of overlap
+    stale = Document(page_content=PAGE[3000:3900], metadata={**second.metadata, "start_index": first.metadata["start_index"] + 400})
+    passages = merge_chunks([first, stale])
+    text = "".join(doc.page_content for doc, _ in passages)
+    assert first.page_content in text and stale.page_content in text
+    print("✅ A stale start_index keeps both chunks whole instead of dropping text")
+
+def test_near_duplicates_dropped_and_budget_kept():
+    chunks = _chunks(True)
+    other = Document(
+        page_content="Clause 2: under PMFBY, the farmer pays 3.5% of the sum insured as premium for crop number 2! "
+                     "Claims are settled within two months of harvest.",
+        metadata={"source": "faq.pdf", "page": 1, "retrieval_score": 0.01},
+    )
+    docs = [chunks[0], other, chunks[1]]
+    for doc, score in zip(docs, (0.03, 0.01, 0.02)):
+        doc.metadata.setdefault("retrieval_score", score)
+
+    packed = pack_documents(docs, budget=10_000)
+    report = packed.report
+    assert report["sentences_dropped"] >= 1 and report["tokens_saved"] > 0
+    assert "Claims are settled" in packed[-1].page_content and "Clause 2:" not in packed[-1].page_content
+    assert packed[0].metadata["source"] == "pmfby.pdf"
+
+    small = pack_documents(docs, budget=120)
+    assert small.report["truncated"] and small.report["tokens_out"] <= 120
+    assert small[0].page_content.endswith(".")
+    assert get_packing_stats()["requests"] >= 2
+    print(f"✅ Repeated sentences dropped, context fits its budget "
+          f"({report['tokens_in']} -> {report['tokens_out']} tokens; 120-token budget -> {small.report['tokens_out']})")
+
+if __name__ == "__main__":
+    test_overlapping_chunks_merge()
+    test_stale_offsets_never_cut_text()
+    test_near_duplicates_dropped_and_budget_kept()
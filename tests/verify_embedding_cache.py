@@ -0,0 +1,92 @@
+import sys
+import os
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from app.rag.embedding_cache import CachedEmbeddings
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    calls: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.calls += 1
+        return super().embed_query(text)
+
+def test_hits_skip_the_model():
+    inner = CountingEmbeddings(size=16)
+    db_path = os.path.join(tempfile.mkdtemp(), "embedding_cache.db")
+    cache = CachedEmbeddings(inner, "model-a", db_path=db_path)
+
+    first = cache.embed_documents(["PMFBY premium", "Ayushman card", "PMFBY premium"])
+    second = cache.embed_documents(["PMFBY premium", "Ayushman card"])
+    assert inner.calls == 2
+    assert second == first[:2]
+
+    # A fresh process reads the vectors back from disk
+    reopened = CachedEmbeddings(inner, "model-a", db_path=db_path)
+    reopened.embed_query("how do I claim")
+    reopened.embed_query("how do I claim")
+    reopened.embed_documents(["Ayushman card"])
+    assert inner.calls == 3
+    assert reopened.stats()["hit_rate"] > 0.5
+    print("✅ Cached embeddings are reused across calls and restarts")
+
+def test_model_change_and_eviction():
+    inner = CountingEmbeddings(size=16)
+    db_path = os.path.join(tempfile.mkdtemp(), "embedding_cache.db")
+    CachedEmbeddings(inner, "model-a", db_path=db_path).embed_documents(["a", "b"])
+    switched = CachedEmbeddings(inner, "model-b", db_path=db_path)
+    assert switched.stats()["entries"] == 0
+
+    small = CachedEmbeddings(inner, "model-b", db_path=db_path, max_entries=10, memory_entries=0)
+    small.embed_documents([f"text {i}" for i in range(25)])
+    assert small.stats()["entries"] <= 10
+    assert small.stats()["evictions"] > 0
+    print("✅ Model change invalidates and the store stays size-bounded")
+
+def test_hits_batch_their_access_times():
+    inner = CountingEmbeddings(size=16)
+    db_path = os.path.join(tempfile.mkdtemp(), "embedding_cache.db")
+    cache = CachedEmbeddings(inner, "model-a", db_path=db_path, memory_entries=0)
+    cache.embed_documents(["PMFBY premium", "Ayushman card"])
+    cache.embed_query("how do I claim")
+
+    writes = cache._conn.total_changes
+    for _ in range(20):
+        cache.embed_query("how do I claim")
+        cache.embed_documents(["PMFBY premium", "Ayushman card"])
+    assert cache._conn.total_changes == writes and not cache._conn.in_transaction
+
+    # Written with the next store, so eviction still sees the hits
+    cache.embed_documents(["new chunk"])
+    assert cache._conn.total_changes == writes + 3 + 1 and not cache._touched
+
+    cache.touch_interval = 0
+    cache.embed_documents(["Ayushman card"])
+    assert cache._conn.total_changes == writes + 5 and not cache._conn.in_transaction
+    print("✅ Cache hits stay read-only; access times are written in batches")
+
+def test_replaced_rows_are_not_counted():
+    inner = CountingEmbeddings(size=16)
+    cache = CachedEmbeddings(inner, "model-a", db_path=os.path.join(tempfile.mkdtemp(), "embedding_cache.db"))
+    cache.embed_documents(["PMFBY premium", "Ayushman card"])
+    # What a concurrent miss for the same text stores after the first one landed
+    key = cache._key("doc", "PMFBY premium")
+    with cache._lock:
+        cache._store({key: inner.embed_query("PMFBY premium"), cache._key("doc", "new"): inner.embed_query("new")})
+    assert cache.stats()["entries"] == 3
+    assert cache._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] == 3
+    print("✅ Re-storing an existing key does not inflate the entry count")
+
+if __name__ == "__main__":
+    test_hits_skip_the_model()
+    test_model_change_and_eviction()
+    test_hits_batch_their_access_times()
+    test_replaced_rows_are_not_counted()
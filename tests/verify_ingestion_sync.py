@@ -0,0 +1,54 @@
+import sys
+import os
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from app.rag import registry, ingestion
+
+PARAGRAPHS = [f"Section {n}. " + f"PMFBY clause {n} covers crop loss from drought and flood. " * 12 for n in range(4)]
+
+def _use_temp_index():
+    root = tempfile.mkdtemp(prefix="verify_ingestion_sync_")
+    registry.reset()
+    registry.VECTOR_BACKEND = "numpy"
+    registry.DB_PATH = root
+    registry.NUMPY_DB_PATH = os.path.join(root, "numpy_db")
+    registry.LEXICAL_INDEX_PATH = os.path.join(root, "bm25_index.json")
+    registry.INDEX_VERSION_FILE = os.path.join(root, "index_version")
+    registry._embeddings = DeterministicFakeEmbedding(size=16)
+    data_dir = os.path.join(root, "data")
+    os.makedirs(data_dir)
+    return data_dir, os.path.join(root, "ingest_manifest.json")
+
+def _write(path: str, text: str):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    # Size alone may not change; make sure the mtime fast path can't skip the edit
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+
+def test_edit_before_kept_chunks_moves_their_offsets():
+    data_dir, manifest = _use_temp_index()
+    path = os.path.join(data_dir, "PMFBY_Scheme.txt")
+    _write(path, "\n\n".join(PARAGRAPHS))
+    ingestion.sync_directory(data_dir, manifest)
+
+    _write(path, "New preface on enrolment deadlines. " * 10 + "\n\n" + "\n\n".join(PARAGRAPHS))
+    report = ingestion.sync_directory(data_dir, manifest)
+    assert report["chunks_added"] >= 1 and report["chunks_moved"] >= 1
+
+    text = open(path, encoding="utf-8").read()
+    stored = registry.get_vectorstore().get()
+    lexical = registry.get_lexical_index()
+    assert len(stored["ids"]) == len(lexical)
+    for cid, chunk, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"]):
+        start = metadata["start_index"]
+        assert text[start:start + len(chunk)] == chunk, cid
+        assert metadata.get("page") is None
+        assert lexical.docs[cid]["metadata"]["start_index"] == start
+    print("✅ Kept chunks get their new start_index/page after an edit above them")
+
+if __name__ == "__main__":
+    test_edit_before_kept_chunks_moves_their_offsets()
@@ -0,0 +1,94 @@
+import sys
+import os
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_core.documents import Document
+
+from app.rag import registry
+from app.rag.lexical_index import BM25Index
+from app.rag.retrieval import HybridRetriever, reciprocal_rank_fusion
+
+def _build_index():
+    index = BM25Index()
+    index.add("pmfby:1", "PMFBY is the crop insurance scheme for farmers.", {"source": "PMFBY_Scheme.txt"})
+    index.add("ab:1", "Ayushman Bharat covers hospital costs up to 5 lakh.", {"source": "Ayushman_Bharat.txt"})
+    index.add("lic:1", "LIC New Jeevan Anand is an endowment plan with whole life cover.", {"source": "LIC_New_Jeevan_Anand.txt"})
+    return index
+
+def test_acronym_ranks_first():
+    index = _build_index()
+    assert index.search("What is PMFBY?", 3)[0][0] == "pmfby:1"
+    assert index.search("jeevan anand", 3)[0][0] == "lic:1"
+    assert index.is_exact_term_query("PMFBY")
+    assert not index.is_exact_term_query("How does the hospital claim process work for my family?")
+    print("✅ Acronyms and scheme names rank first")
+
+def _build_corpus():
+    # "premium" and "claim" are everywhere, as in the real scheme documents
+    index = _build_index()
+    for i in range(20):
+        index.add(f"glossary:{i}", f"Term {i}: the premium you pay and how to claim the sum assured.",
+                  {"source": "Insurance_Glossary.txt"})
+    index.add("lic:2", "LIC plan 915 pays a bonus at maturity.", {"source": "LIC_New_Jeevan_Anand.txt"})
+    return index
+
+def test_exact_term_queries_need_rare_terms_or_codes():
+    index = _build_corpus()
+    for query in ("PMFBY", "Jeevan Anand", "plan 915", "LIC"):
+        assert index.is_exact_term_query(query), query
+    for query in ("what is premium", "how do I claim", "HOW DO I CLAIM", "LIC premium"):
+        assert not index.is_exact_term_query(query), query
+    print("✅ Only scheme names, acronyms and codes count as exact-term lookups")
+
+class _DenseStub:
+    def __init__(self):
+        self.queries = []
+
+    def similarity_search(self, query, k):
+        self.queries.append(query)
+        return [Document(page_content="Premium is the amount you pay for cover.", metadata={"source": "dense"})]
+
+def test_common_word_query_still_runs_dense_search():
+    original = registry.get_lexical_index
+    registry.get_lexical_index = _build_corpus
+    try:
+        dense = _DenseStub()
+        retriever = HybridRetriever(vectorstore=dense, k=3)
+        retriever.invoke("PMFBY")
+        assert dense.queries == []
+        docs = retriever.invoke("what is premium")
+        assert dense.queries == ["what is premium"]
+        assert "dense" in [doc.metadata["source"] for doc in docs]
+    finally:
+        registry.get_lexical_index = original
+    print("✅ Common-word questions keep dense recall; exact lookups skip it")
+
+def test_incremental_update_and_reload():
+    index = _build_index()
+    index.remove("pmfby:1")
+    assert index.search("PMFBY") == []
+    index.add("pmfby:2", "PMFBY premium is 2% for Kharif crops.", {"source": "PMFBY_Scheme.txt"})
+    index.remove_source("Ayushman_Bharat.txt")
+    assert "ab:1" not in index.docs
+
+    path = os.path.join(tempfile.mkdtemp(), "bm25_index.json")
+    index.save(path)
+    reloaded = BM25Index.load(path)
+    assert reloaded.search("kharif premium")[0][0] == "pmfby:2"
+    assert reloaded.total_length == index.total_length
+    print("✅ Incremental updates survive save/load")
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], k=60)
+    assert [key for key, _ in fused] == ["a", "c", "b"]
+    print("✅ Reciprocal rank fusion orders by combined rank")
+
+if __name__ == "__main__":
+    test_acronym_ranks_first()
+    test_exact_term_queries_need_rare_terms_or_codes()
+    test_common_word_query_still_runs_dense_search()
+    test_incremental_update_and_reload()
+    test_reciprocal_rank_fusion()
@@ -0,0 +1,78 @@
+import sys
+import os
+import time
+import asyncio
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.llm_scheduler import LLMScheduler, SchedulerBusy, INTERACTIVE, BACKGROUND, llm_priority
+
+def test_requests_are_paced_not_rejected():
+    # 600 requests/min = one every 0.1 s once the 2 left in the bucket are used
+    scheduler = LLMScheduler({"groq": (600, 1_000_000)})
+    scheduler._limiter("groq", "m").requests.level = 2
+
+    start = time.perf_counter()
+    for _ in range(5):
+        scheduler.call("groq", "m", 10, lambda: None)
+    elapsed = time.perf_counter() - start
+
+    stats = scheduler.stats()["groq/m"]
+    assert 0.25 <= elapsed < 0.6 and stats["granted"] == 5 and stats["rejected"] == 0
+    print(f"✅ Calls over the request budget wait for the bucket ({elapsed:.2f}s for 5 calls at 10/s)")
+
+def test_interactive_calls_go_first():
+    scheduler = LLMScheduler({"gemini": (600, 1_000_000)})
+    scheduler._limiter("gemini", "m").requests.level = 0
+    order = []
+
+    async def call(name, priority):
+        async def send():
+            order.append(name)
+        await scheduler.acall("gemini", "m", 10, send, priority=priority)
+
+    async def run():
+        background = [asyncio.ensure_future(call(f"report{i}", BACKGROUND)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        with llm_priority(INTERACTIVE):
+            interactive = [asyncio.ensure_future(call(f"chat{i}", None)) for i in range(2)]
+        await asyncio.gather(*background, *interactive)
+
+    asyncio.run(run())
+    assert order[:2] == ["chat0", "chat1"], order
+    print(f"✅ Queued interactive calls overtake background work: {order}")
+
+def test_backpressure_and_throttle():
+    # 2 requests/min with the bucket empty: the call could only start in 30 s
+    scheduler = LLMScheduler({"groq": (2, 1_000_000)})
+    scheduler._limiter("groq", "m").requests.level = 0
+    # 6000 tokens/min with 100 left: a 5000-token call could only start in ~49 s
+    scheduler.limits["gemini"] = (1000, 6000)
+    scheduler._limiter("gemini", "m").tokens.level = 100
+    for provider, tokens in (("groq", 10), ("gemini", 5000)):
+        try:
+            scheduler.call(provider, "m", tokens, lambda: None)
+            raise AssertionError("expected SchedulerBusy")
+        except SchedulerBusy:
+            pass
+    assert scheduler.stats()["gemini/m"]["rejected"] == 1
+
+    class RateLimitError(Exception):
+        pass
+
+    def rejected_by_provider():
+        raise RateLimitError("429")
+    scheduler = LLMScheduler({"groq": (1000, 1_000_000)})
+    try:
+        scheduler.call("groq", "m", 10, rejected_by_provider)
+    except RateLimitError:
+        pass
+    stats = scheduler.stats()["groq/m"]
+    assert stats["throttled"] == 1 and scheduler._limiter("groq", "m").requests.level <= 0.1
+    print("✅ Calls that would wait past their deadline fail fast; a 429 empties the buckets")
+
+if __name__ == "__main__":
+    test_requests_are_paced_not_rejected()
+    test_interactive_calls_go_first()
+    test_backpressure_and_throttle()
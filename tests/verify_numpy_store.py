@@ -0,0 +1,70 @@
+import sys
+import os
+import tempfile
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from app.rag.numpy_store import NumpyVectorStore
+
+def test_exact_search_and_persistence():
+    embeddings = DeterministicFakeEmbedding(size=32)
+    path = tempfile.mkdtemp()
+    store = NumpyVectorStore(persist_directory=path, embedding_function=embeddings)
+    store.add_texts(
+        ["PMFBY crop insurance", "Ayushman Bharat hospital cover", "Jeevan Anand endowment plan"],
+        metadatas=[{"source": "a.txt"}, {"source": "b.txt"}, {"source": "c.txt"}],
+        ids=["a", "b", "c"],
+    )
+
+    # Identical text embeds to the identical vector, so it must come back first
+    doc, score = store.similarity_search_with_score("Ayushman Bharat hospital cover", k=1)[0]
+    assert doc.metadata["source"] == "b.txt" and score > 0.999
+
+    store.delete(ids=["b"])
+    store.add_texts(["PMFBY premium rates"], metadatas=[{"source": "a.txt"}], ids=["a"])
+    reopened = NumpyVectorStore(persist_directory=path, embedding_function=embeddings)
+    assert len(reopened) == 2
+    assert reopened.similarity_search("PMFBY premium rates", k=1)[0].page_content == "PMFBY premium rates"
+
+    reopened.delete(where={"source": "a.txt"})
+    assert reopened.get()["ids"] == ["c"]
+    print("✅ NumPy store search, upsert, delete and reload work")
+
+def test_writes_batched_until_persist_and_seen_by_readers():
+    embeddings = DeterministicFakeEmbedding(size=32)
+    path = tempfile.mkdtemp()
+    writer = NumpyVectorStore(persist_directory=path, embedding_function=embeddings)
+    reader = NumpyVectorStore(persist_directory=path, embedding_function=embeddings)
+    for batch in range(5):
+        ids = [f"{batch}-{i}" for i in range(4)]
+        texts = [f"scheme {batch} clause {i}" for i in range(4)]
+        writer.upsert(ids, embeddings.embed_documents(texts), texts)
+    # Repeated id within one batch keeps the last vector
+    writer.upsert(["x", "x"], embeddings.embed_documents(["old", "new"]), ["old", "new"])
+    assert not os.listdir(path), "upsert must not write to disk"
+    assert writer.similarity_search("scheme 3 clause 2", k=1)[0].page_content == "scheme 3 clause 2"
+    assert writer.similarity_search("new", k=1)[0].page_content == "new"
+
+    assert writer.persist() and not writer.persist()
+    assert reader.reload_if_changed()
+    assert len(reader) == 21 and reader.similarity_search("scheme 4 clause 0", k=1)[0].page_content == "scheme 4 clause 0"
+
+    writer.update_metadata(["x"], [{"source": "x.txt"}])
+    writer.persist()
+    assert reader.reload_if_changed() and reader.get()["metadatas"][-1] == {"source": "x.txt"}
+    print("✅ NumPy store writes once per persist() and other instances reload the new files")
+
+def test_retriever_interface():
+    embeddings = DeterministicFakeEmbedding(size=32)
+    store = NumpyVectorStore(persist_directory=tempfile.mkdtemp(), embedding_function=embeddings)
+    store.add_texts(["one", "two", "three", "four"], metadatas=[{"source": f"{i}.txt"} for i in range(4)])
+    docs = store.as_retriever(search_kwargs={"k": 3}).invoke("two")
+    assert len(docs) == 3 and docs[0].page_content == "two"
+    print("✅ NumPy store works behind as_retriever")
+
+if __name__ == "__main__":
+    test_exact_search_and_persistence()
+    test_writes_batched_until_persist_and_seen_by_readers()
+    test_retriever_interface()
@@ -0,0 +1,68 @@
+import sys
+import os
+import time
+import asyncio
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.workflows.pipeline import StageGraph, get_pipeline_stats
+
+def _sleep(seconds, value=None):
+    async def stage(*inputs):
+        await asyncio.sleep(seconds)
+        return value
+    return stage
+
+def test_independent_stages_overlap():
+    async def run():
+        graph = StageGraph()
+        graph.add("session", _sleep(0.2, "s"))
+        graph.add("download", _sleep(0.2, "d"))
+        graph.add("joined", lambda s, d: _sleep(0.05, s + d)(), after=("session", "download"))
+        start = time.perf_counter()
+        joined = await graph.result("joined")
+        elapsed = time.perf_counter() - start
+        timings = await graph.close()
+        return joined, elapsed, timings
+
+    joined, elapsed, timings = asyncio.run(run())
+    assert joined == "sd" and elapsed < 0.35
+    assert timings["critical_path"][-1] == "joined" and len(timings["critical_path"]) == 2
+    print(f"✅ Independent stages overlap ({elapsed * 1000:.0f} ms for 0.45 s of work)")
+
+def test_unused_speculation_is_cancelled():
+    async def run():
+        graph = StageGraph()
+        graph.add("retrieve", _sleep(5, ["doc"]), speculative=True)
+        await graph.run("translate_in", _sleep(0.05, "different query"))
+        graph.cancel("retrieve")
+        await graph.run("rag", _sleep(0.05, "answer"))
+        start = time.perf_counter()
+        timings = await graph.close()
+        return time.perf_counter() - start, timings
+
+    before = get_pipeline_stats()["speculative"]["cancelled"]
+    close_seconds, timings = asyncio.run(run())
+    assert close_seconds < 0.5 and timings["stages"]["retrieve"]["status"] == "cancelled"
+    assert timings["critical_path"] == ["translate_in", "rag"]
+    assert get_pipeline_stats()["speculative"]["cancelled"] == before + 1
+    print("✅ Unneeded speculative stage is cancelled and kept off the critical path")
+
+def test_used_speculation_shortens_the_path():
+    async def run():
+        graph = StageGraph()
+        graph.add("retrieve", _sleep(0.2, ["doc"]), speculative=True)
+        await graph.run("detect_language", _sleep(0.2, "en"))
+        docs = await graph.result("retrieve")
+        timings = await graph.close()
+        return docs, timings
+
+    docs, timings = asyncio.run(run())
+    assert docs == ["doc"] and timings["total_ms"] < 350
+    print("✅ Speculative retrieval overlaps language detection")
+
+if __name__ == "__main__":
+    test_independent_stages_overlap()
+    test_unused_speculation_is_cancelled()
+    test_used_speculation_shortens_the_path()
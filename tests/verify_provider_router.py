@@ -0,0 +1,136 @@
+import sys
+import os
+import time
+import asyncio
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+for limit in ("GROQ_RPM", "GROQ_TPM", "GEMINI_RPM", "GEMINI_TPM"):
+    os.environ[limit] = "100000000"
+os.environ["HEDGE_DEFAULT_DELAY"] = "0.1"
+os.environ["HEDGE_MIN_DELAY"] = "0.01"
+os.environ["BREAKER_COOLDOWN"] = "0.2"
+
+from app.services.provider_router import Candidate, CircuitProbing, ProviderRouter, OPEN, CLOSED
+
+def fake(provider: str, delay: float, answer: str = None, calls: list = None, fail: bool = False):
+    async def call():
+        if calls is not None:
+            calls.append(provider)
+        await asyncio.sleep(delay)
+        if fail:
+            raise RuntimeError(f"{provider} is down")
+        return answer or provider
+    return Candidate(provider, "m", call)
+
+def test_slow_primary_is_hedged_and_cancelled():
+    router = ProviderRouter()
+    start = time.perf_counter()
+    result = asyncio.run(router.acall("answer", [fake("gemini", 2.0), fake("groq", 0.05)], 10))
+    elapsed = time.perf_counter() - start
+
+    stats = router.stats()
+    assert result == "groq" and elapsed < 0.5, (result, elapsed)
+    assert stats["routes"]["answer"]["hedge_wins"] == 1 and stats["providers"]["gemini/m"]["cancelled"] == 1
+    print(f"✅ A stalled call is hedged to the alternate and cancelled ({elapsed:.2f}s instead of 2s)")
+
+def test_fast_primary_is_not_hedged():
+    router = ProviderRouter()
+    calls = []
+    result = asyncio.run(router.acall("answer", [fake("gemini", 0.01, calls=calls), fake("groq", 0.01, calls=calls)], 10))
+    assert result == "gemini" and calls == ["gemini"] and router.stats()["routes"]["answer"]["hedged"] == 0
+    print("✅ Calls answered within the hedge delay go to one provider only")
+
+def test_hedge_delay_follows_rolling_percentile():
+    router = ProviderRouter()
+    primary = fake("gemini", 0.02)
+
+    async def run():
+        for _ in range(25):
+            await router.acall("answer", [primary, fake("groq", 0.01)], 10)
+    asyncio.run(run())
+    delay = router.hedge_delay("answer", primary)
+    assert 0.02 <= delay < 0.1, delay
+    assert router.stats()["providers"]["gemini/m"]["latency"]["count"] == 25
+    print(f"✅ Hedge delay tracks the route's rolling p95 ({delay * 1000:.0f} ms)")
+
+def test_failures_fall_back_and_open_the_circuit():
+    router = ProviderRouter()
+    calls = []
+    candidates = [fake("gemini", 0.0, calls=calls, fail=True), fake("groq", 0.0, calls=calls)]
+
+    async def run(n):
+        return [await router.acall("translate", candidates, 10) for _ in range(n)]
+
+    assert asyncio.run(run(5)) == ["groq"] * 5
+    assert router.stats()["providers"]["gemini/m"]["circuit"] == OPEN
+    calls.clear()
+    assert asyncio.run(run(3)) == ["groq"] * 3 and calls == ["groq"] * 3
+    print("✅ Failing calls fall back at once; after 5 failures the provider is skipped")
+
+    # After the cooldown one call tries it again; a success closes the circuit
+    time.sleep(0.25)
+    healthy = [fake("gemini", 0.0, calls=calls), fake("groq", 0.0, calls=calls)]
+    assert asyncio.run(router.acall("translate", healthy, 10)) == "gemini"
+    assert router.stats()["providers"]["gemini/m"]["circuit"] == CLOSED
+    print("✅ The circuit half-opens after the cooldown and closes on success")
+
+def test_half_open_circuit_sends_one_probe():
+    router = ProviderRouter()
+    down = [fake("gemini", 0.0, fail=True), fake("groq", 0.0)]
+
+    async def open_circuit():
+        for _ in range(5):
+            await router.acall("translate", down, 10)
+    asyncio.run(open_circuit())
+    time.sleep(0.25)
+
+    calls = []
+    candidates = [fake("gemini", 0.05, calls=calls), fake("groq", 0.0, calls=calls)]
+    alone = [fake("gemini", 0.05, calls=calls)]
+
+    async def burst():
+        probe = asyncio.create_task(router.acall("translate", candidates, 10))
+        await asyncio.sleep(0)
+        others = await asyncio.gather(*(router.acall("translate", candidates, 10) for _ in range(4)))
+        try:
+            await router.acall("translate", alone, 10)
+            failed_fast = False
+        except CircuitProbing:
+            failed_fast = True
+        return await probe, others, failed_fast
+
+    probe, others, failed_fast = asyncio.run(burst())
+    assert probe == "gemini" and others == ["groq"] * 4 and failed_fast
+    assert calls.count("gemini") == 1
+    assert router.stats()["providers"]["gemini/m"]["circuit"] == CLOSED
+    print("✅ A half-open circuit lets one probe through; other calls fall back or fail fast")
+
+def test_stream_races_on_first_chunk():
+    router = ProviderRouter()
+
+    def streaming(provider: str, first_delay: float):
+        async def call():
+            await asyncio.sleep(first_delay)
+            for word in ("crop ", "cover ", provider):
+                yield word
+        return Candidate(provider, "m", call)
+
+    async def run():
+        return [chunk async for chunk in router.astream("answer_stream", [streaming("gemini", 2.0), streaming("groq", 0.05)], 10)]
+
+    start = time.perf_counter()
+    chunks = asyncio.run(run())
+    assert chunks == ["crop ", "cover ", "groq"] and time.perf_counter() - start < 0.5
+    print("✅ Streams are hedged on time to first chunk")
+
+if __name__ == "__main__":
+    test_slow_primary_is_hedged_and_cancelled()
+    test_fast_primary_is_not_hedged()
+    test_hedge_delay_follows_rolling_percentile()
+    test_failures_fall_back_and_open_the_circuit()
+    test_half_open_circuit_sends_one_probe()
+    test_stream_races_on_first_chunk()
@@ -0,0 +1,59 @@
+import sys
+import os
+import tempfile
+import numpy as np
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.semantic_cache import SemanticCache
+
+def _unit(*values):
+    v = np.array(values, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+def _make_cache(version, **kwargs):
+    db_path = os.path.join(tempfile.mkdtemp(), "semantic_cache.db")
+    return SemanticCache(db_path=db_path, version_fn=lambda: version["value"], **kwargs)
+
+def test_similar_question_hits():
+    version = {"value": "1"}
+    cache = _make_cache(version, threshold=0.9)
+    cache.put("How do I claim?", _unit(1, 0, 0), {"answer": "Visit the bank.", "sources": ["PMFBY_Scheme.txt (Page N/A)"]})
+
+    hit = cache.get(_unit(1, 0.1, 0))
+    assert hit and hit["answer"] == "Visit the bank."
+    assert cache.get(_unit(0, 1, 0)) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    print("✅ Similar question served from cache")
+
+def test_lru_eviction_and_persistence():
+    version = {"value": "1"}
+    cache = _make_cache(version, max_entries=2)
+    cache.put("a", _unit(1, 0, 0), {"answer": "A", "sources": []})
+    cache.put("b", _unit(0, 1, 0), {"answer": "B", "sources": []})
+    cache.get(_unit(1, 0, 0))  # touch "a" so "b" is least recently used
+    cache.put("c", _unit(0, 0, 1), {"answer": "C", "sources": []})
+
+    assert cache.get(_unit(0, 1, 0)) is None
+    reopened = SemanticCache(db_path=cache.db_path, version_fn=lambda: version["value"])
+    assert reopened.get(_unit(0, 0, 1))["answer"] == "C"
+    print("✅ LRU eviction and disk tier work")
+
+def test_ttl_and_index_invalidation():
+    version = {"value": "1"}
+    cache = _make_cache(version, ttl_seconds=0)
+    cache.put("a", _unit(1, 0, 0), {"answer": "A", "sources": []})
+    assert cache.get(_unit(1, 0, 0)) is None
+
+    cache = _make_cache(version)
+    cache.put("a", _unit(1, 0, 0), {"answer": "A", "sources": []})
+    version["value"] = "2"
+    assert cache.get(_unit(1, 0, 0)) is None
+    assert cache.stats()["invalidations"] == 1
+    print("✅ TTL expiry and index invalidation work")
+
+if __name__ == "__main__":
+    test_similar_question_hits()
+    test_lru_eviction_and_persistence()
+    test_ttl_and_index_invalidation()
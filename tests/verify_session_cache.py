@@ -0,0 +1,109 @@
+import sys
+import os
+import json
+import sqlite3
+import tempfile
+import subprocess
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+os.environ["SESSION_CACHE_FLUSH_INTERVAL"] = "60"
+
+from app.db import session_db
+from app.db.session_cache import SessionCache
+
+def use_temp_db() -> str:
+    session_db.DB_PATH = os.path.join(tempfile.mkdtemp(prefix="verify_session_cache_"), "sessions.db")
+    session_db.init_db()
+    return session_db.DB_PATH
+
+def on_disk(path: str, user_id: str):
+    conn = sqlite3.connect(path)
+    row = conn.execute("SELECT step, data FROM sessions WHERE user_id = ?", (user_id,)).fetchone()
+    conn.close()
+    return (row[0], json.loads(row[1])) if row else None
+
+def test_reads_are_served_from_memory_and_isolated():
+    use_temp_db()
+    session_db.update_session("asha", "ask_age", {"name": "Asha"})
+    session = session_db.get_session("asha")
+    session["data"]["name"] = "changed by the caller"
+    assert session_db.get_session("asha")["data"] == {"name": "Asha"}
+    stats = session_db.get_cache().stats()
+    assert stats["hits"] == 2 and stats["misses"] == 0 and stats["dirty"] == 1
+    print("✅ Updated sessions are read back from memory, as copies")
+
+def test_updates_are_batched_and_coalesced():
+    path = use_temp_db()
+    for turn in range(5):
+        for n in range(20):
+            session_db.update_session(f"user_{n}", "ask_worry", {"turn": turn})
+    assert on_disk(path, "user_0") is None
+
+    assert session_db.flush_sessions() == 20
+    assert on_disk(path, "user_7") == ("ask_worry", {"turn": 4})
+    stats = session_db.get_cache().stats()
+    assert stats["flushes"] == 1 and stats["flushed_rows"] == 20 and stats["coalesced"] == 80
+    assert stats["flush_latency"]["count"] == 1
+    print("✅ 100 updates to 20 sessions were written as 20 rows in one transaction")
+
+def test_admin_listing_sees_unflushed_updates():
+    use_temp_db()
+    session_db.update_session("ravi", "completed", {"occupation": "Farmer"})
+    assert [s["user_id"] for s in session_db.get_all_sessions()] == ["ravi"]
+    print("✅ get_all_sessions flushes first")
+
+def test_eviction_keeps_dirty_sessions_and_failed_flushes_retry():
+    writes, fail = [], [True]
+
+    def store(rows):
+        if fail[0]:
+            fail[0] = False
+            raise sqlite3.OperationalError("disk I/O error")
+        writes.extend(rows)
+
+    cache = SessionCache("memory", load=lambda user_id: None, store=store,
+                         max_entries=2, flush_interval=60, max_dirty=1000)
+    for n in range(5):
+        cache.put(f"user_{n}", "ask_name", "{}")
+    assert cache.get("user_0") == ("ask_name", "{}") and cache.stats()["evictions"] == 3
+
+    try:
+        cache.flush()
+        assert False, "flush should have raised"
+    except sqlite3.OperationalError:
+        pass
+    cache.put("user_0", "ask_gender", "{}")
+    cache.close()
+    assert sorted(row[:3] for row in writes) == \
+        [("user_0", "ask_gender", "{}")] + [(f"user_{n}", "ask_name", "{}") for n in range(1, 5)]
+    assert cache.stats()["flush_errors"] == 1
+    print("✅ Evicted and failed-to-flush updates are kept and written later")
+
+def test_graceful_exit_flushes_acknowledged_updates():
+    path = os.path.join(tempfile.mkdtemp(prefix="verify_session_cache_"), "sessions.db")
+    script = (
+        "from app.db import session_db\n"
+        f"session_db.DB_PATH = {path!r}\n"
+        "session_db.init_db()\n"
+        "for n in range(200):\n"
+        "    session_db.update_session(f'user_{n}', 'completed', {'n': n})\n"
+        "assert session_db.get_cache().stats()['flushes'] == 0\n"
+    )
+    env = dict(os.environ, SESSION_CACHE_FLUSH_INTERVAL="60")
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    subprocess.run([sys.executable, "-c", script], cwd=root, env=env, check=True)
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 200
+    conn.close()
+    assert on_disk(path, "user_199") == ("completed", {"n": 199})
+    print("✅ All 200 acknowledged updates were on disk after the process exited")
+
+if __name__ == "__main__":
+    test_reads_are_served_from_memory_and_isolated()
+    test_updates_are_batched_and_coalesced()
+    test_admin_listing_sees_unflushed_updates()
+    test_eviction_keeps_dirty_sessions_and_failed_flushes_retry()
+    test_graceful_exit_flushes_acknowledged_updates()
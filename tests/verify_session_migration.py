@@ -0,0 +1,82 @@
+import sys
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.db import session_db
+
+def legacy_db(rows: int) -> str:
+    """A sessions.db as the original three-column schema left it."""
+    path = os.path.join(tempfile.mkdtemp(prefix="verify_session_migration_"), "sessions.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE sessions (user_id TEXT PRIMARY KEY, step TEXT, data TEXT)")
+    conn.executemany("INSERT INTO sessions VALUES (?, ?, ?)", (
+        (f"old_{n}", "completed", json.dumps({"name": f"Old {n}", "age": str(30 + n % 40),
+                                              "occupation": "Farmer", "language": "hi"}))
+        for n in range(rows)))
+    conn.commit()
+    conn.close()
+    return path
+
+def test_small_database_is_migrated_at_startup():
+    session_db.DB_PATH = legacy_db(100)
+    session_db.init_db()
+    with session_db.get_pool().connection() as conn:
+        assert session_db.schema_version(conn) == session_db.SCHEMA_VERSION
+        row = conn.execute("SELECT name, age, occupation, language, updated_at > 0 FROM sessions "
+                           "WHERE user_id = 'old_7'").fetchone()
+        plan = " ".join(r[3] for r in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT user_id FROM sessions WHERE data != '{}' AND step = ? "
+            "ORDER BY updated_at DESC, rowid DESC LIMIT 10", ("completed",)))
+    assert row == ("Old 7", 37, "Farmer", "hi", 1)
+    assert "idx_sessions_step" in plan and "TEMP B-TREE" not in plan, plan
+    print("✅ Survey answers are typed columns and the step filter walks its index")
+
+def test_large_database_is_migrated_online():
+    session_db.DB_PATH = legacy_db(3000)
+    session_db.INLINE_MIGRATION_ROWS = 1000
+    session_db.init_db()
+    with session_db.get_pool().connection() as conn:
+        assert session_db.schema_version(conn) == 1
+    # Sessions keep working on the un-indexed schema
+    session_db.update_session("new_user", "ask_age", {"name": "New", "language": "mr"})
+    assert session_db.list_leads(limit=1)["leads"][0]["user_id"] == "new_user"
+
+    errors, live = [], set()
+    done = threading.Event()
+
+    def writer():
+        n = 0
+        while not done.is_set():
+            try:
+                session_db.update_session(f"live_{n % 50}", "ask_name", {"language": "en"})
+                session_db.flush_sessions()
+                live.add(f"live_{n % 50}")
+            except sqlite3.Error as e:
+                errors.append(e)
+            n += 1
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    stats = session_db.migrate(batch_size=500)
+    done.set()
+    thread.join()
+
+    assert not errors and stats["batches"] == 7 and len(stats["indexes"]) == len(session_db.SESSION_INDEXES)
+    leads = list(session_db.iter_leads(batch_size=400))
+    assert live and len(leads) == 3001 + len(live) and all(lead["updated_at"] > 0 for lead in leads)
+    # Rows from before the migration sort behind every row written since
+    assert leads[-1]["user_id"].startswith("old_") and leads[0]["user_id"] in live
+    print(f"✅ 3000 legacy rows migrated in {stats['batches']} batches alongside a live writer")
+
+    assert session_db.migrate()["backfilled"] == 0
+    print("✅ Re-running the migration is a no-op")
+
+if __name__ == "__main__":
+    test_small_database_is_migrated_at_startup()
+    test_large_database_is_migrated_online()
@@ -0,0 +1,78 @@
+import sys
+import os
+import sqlite3
+import tempfile
+import threading
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.db import session_db
+
+# These exercise the pool itself, not the write-behind cache in front of it
+session_db.SESSION_CACHE = False
+
+def use_temp_db() -> str:
+    session_db.DB_PATH = os.path.join(tempfile.mkdtemp(prefix="verify_session_pool_"), "sessions.db")
+    session_db.init_db()
+    return session_db.DB_PATH
+
+def test_wal_and_pragmas():
+    use_temp_db()
+    with session_db.get_pool().connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == session_db.BUSY_TIMEOUT_MS
+    print("✅ Session DB runs in WAL mode with synchronous=NORMAL and a busy timeout")
+
+def test_concurrent_writers_share_a_bounded_pool():
+    use_temp_db()
+    errors = []
+
+    def user(n: int):
+        try:
+            for turn in range(50):
+                session = session_db.get_session(f"user_{n}")
+                session["data"]["turns"] = turn + 1
+                session_db.update_session(f"user_{n}", "completed", session["data"])
+        except sqlite3.Error as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=user, args=(n,)) for n in range(32)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = session_db.get_pool().stats()
+    assert not errors, errors[:3]
+    assert all(session_db.get_session(f"user_{n}")["data"]["turns"] == 50 for n in range(32))
+    assert stats["open"] <= session_db.POOL_SIZE and stats["checkouts"] >= 32 * 100
+    print(f"✅ 32 threads x 50 turns with no lock errors over {stats['open']} pooled connections")
+
+def test_failed_block_rolls_back_and_returns_connection():
+    use_temp_db()
+    pool = session_db.get_pool()
+    try:
+        with pool.connection() as conn:
+            conn.execute(session_db.UPSERT_SESSION, ("half_written", "ask_name", "{}", 0))
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert session_db.get_session("half_written")["step"] == "welcome"
+    assert pool.stats()["idle"] == pool.stats()["open"]
+    print("✅ A failed block is rolled back and its connection goes back to the pool")
+
+def test_pool_follows_db_path():
+    first = use_temp_db()
+    session_db.update_session("moved", "ask_age", {"name": "Asha"})
+    second = use_temp_db()
+    assert session_db.get_pool().path == second != first
+    assert session_db.get_session("moved")["step"] == "welcome"
+    print("✅ Pointing DB_PATH elsewhere re-creates the pool")
+
+if __name__ == "__main__":
+    test_wal_and_pragmas()
+    test_concurrent_writers_share_a_bounded_pool()
+    test_failed_block_rolls_back_and_returns_connection()
+    test_pool_follows_db_path()
@@ -0,0 +1,76 @@
+import sys
+import os
+import time
+import asyncio
+import threading
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.singleflight import SingleFlight, flight_key
+
+def test_threads_share_one_call():
+    flight = SingleFlight("test_threads", register=False)
+    calls = []
+
+    def slow_answer():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"answer": "PMFBY"}
+
+    results = []
+    key = flight_key("What is PMFBY?", "gemini")
+    threads = [threading.Thread(target=lambda: results.append(flight.do(key, slow_answer))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1 and results == [{"answer": "PMFBY"}] * 5
+    assert flight.stats()["saved_calls"] == 4 and flight.stats()["inflight"] == 0
+    assert flight_key("  what is pmfby? ", "gemini") == key != flight_key("What is PMFBY?", "other-model")
+    print("✅ Concurrent identical calls from threads share one upstream call")
+
+def test_async_followers_survive_leader_cancel():
+    flight = SingleFlight("test_async", register=False)
+    calls = []
+
+    async def slow_tts():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return "voice.mp3"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.ado("k", slow_tts))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(flight.ado("k", slow_tts)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        return await asyncio.gather(*followers)
+
+    assert asyncio.run(run()) == ["voice.mp3"] * 3 and len(calls) == 1
+    print("✅ Async followers get the result even if the leader's request is cancelled")
+
+def test_errors_reach_followers_and_are_not_kept():
+    flight = SingleFlight("test_errors", register=False)
+
+    async def failing():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("rate limited")
+
+    async def run():
+        return await asyncio.gather(*(flight.ado("k", failing) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.stats()["errors"] == 1 and flight.stats()["upstream_calls"] == 1
+
+    async def ok():
+        return "fine"
+    assert asyncio.run(flight.ado("k", ok)) == "fine"
+    print("✅ A failed call fails its followers once, then the key is free again")
+
+if __name__ == "__main__":
+    test_threads_share_one_call()
+    test_async_followers_survive_leader_cancel()
+    test_errors_reach_followers_and_are_not_kept()
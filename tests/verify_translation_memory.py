@@ -0,0 +1,155 @@
+import sys
+import os
+import time
+import asyncio
+import tempfile
+import threading
+
+# Add project root to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.translation_memory import TranslationMemory
+
+def _make_memory(**kwargs):
+    return TranslationMemory(db_path=os.path.join(tempfile.mkdtemp(), "translation_memory.db"), **kwargs)
+
+def test_normalised_hits_and_persistence():
+    memory = _make_memory()
+    calls = []
+    translate = lambda: calls.append(1) or "yes"
+
+    assert memory.translate("haan", "hi", "en", "m", translate) == "yes"
+    assert memory.translate("  Haan ", "hi", "en", "m", translate) == "yes"
+    assert memory.translate("haan", "hi", "en", "other-model", translate) == "yes"
+    assert len(calls) == 2  # the model is part of the key
+
+    reopened = TranslationMemory(db_path=memory.db_path)
+    assert reopened.get("HAAN", "hi", "en", "m") == "yes"
+    assert memory.stats()["hits"] == 1 and memory.stats()["misses"] == 2
+    print("✅ Normalised text hits, model separates entries, store survives reopen")
+
+def test_ttl_and_size_cap():
+    memory = _make_memory(ttl_seconds=0, max_entries=10)
+    memory.translate("kheti", "hi", "en", "m", lambda: "farming")
+    time.sleep(0.01)
+    assert memory.get("kheti", "hi", "en", "m") is None
+
+    memory = _make_memory(max_entries=10)
+    for i in range(25):
+        memory.translate(f"text {i}", "hi", "en", "m", lambda: "x")
+    assert memory.stats()["entries"] <= 10 and memory.stats()["evictions"] > 0
+    print("✅ Expired entries miss and the store stays under its cap")
+
+def test_hits_batch_their_access_times_and_replaces_are_not_counted():
+    memory = _make_memory()
+    memory.translate("haan", "hi", "en", "m", lambda: "yes")
+    memory.translate("nahi", "hi", "en", "m", lambda: "no")
+
+    writes = memory._conn.total_changes
+    for _ in range(20):
+        assert memory.translate("haan", "hi", "en", "m", lambda: "?") == "yes"
+        assert memory.get("nahi", "hi", "en", "m") == "no"
+    assert memory._conn.total_changes == writes and not memory._conn.in_transaction
+
+    # Written with the next store; storing an existing key replaces the row without adding one
+    memory._store(memory.key("haan", "hi", "en", "m"), "hi", "en", "m", "yes", 0.1)
+    assert memory._conn.total_changes == writes + 2 + 1 and not memory._touched
+    assert memory.stats()["entries"] == 2
+
+    memory.touch_interval = 0
+    memory.get("haan", "hi", "en", "m")
+    assert memory._conn.total_changes == writes + 4 and not memory._conn.in_transaction
+    print("✅ Hits stay read-only, access times are written in batches, replaced rows are not recounted")
+
+def test_concurrent_requests_share_one_call():
+    memory = _make_memory()
+    calls = []
+
+    def slow_translate():
+        calls.append(1)
+        time.sleep(0.2)
+        return "hospital expenses"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(
+            memory.translate("hospital kharcha", "hi", "en", "m", slow_translate)))
+        for _ in range(5)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1 and results == ["hospital expenses"] * 5
+    stats = memory.stats()
+    assert stats["shared_inflight"] == 4 and stats["saved_seconds"] >= 0.8
+    print("✅ Concurrent identical requests share one in-flight translation")
+
+def test_async_requests_share_one_call():
+    memory = _make_memory()
+    calls = []
+
+    async def slow_translate():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return "crop insurance"
+
+    async def run():
+        return await asyncio.gather(*(
+            memory.atranslate("fasal bima", "hi", "en", "m", slow_translate) for _ in range(5)
+        ))
+
+    assert asyncio.run(run()) == ["crop insurance"] * 5 and len(calls) == 1
+    assert memory.translate("fasal bima", "hi", "en", "m", lambda: "unused") == "crop insurance"
+    print("✅ Async callers share one in-flight translation without blocking the loop")
+
+def test_async_result_is_stored_under_the_answering_model():
+    memory = _make_memory()
+    calls = []
+
+    async def hedged():
+        calls.append(1)
+        return "crop loss", "gemini"
+
+    async def run():
+        first = await memory.atranslate("fasal nuksan", "hi", "en", "groq", hedged, alternates=["gemini"])
+        again = await memory.atranslate("fasal nuksan", "hi", "en", "groq", hedged, alternates=["gemini"])
+        return first, again
+
+    assert asyncio.run(run()) == ("crop loss", "crop loss") and len(calls) == 1
+    assert memory.get("fasal nuksan", "hi", "en", "gemini") == "crop loss"
+    assert memory.get("fasal nuksan", "hi", "en", "groq") is None
+    print("✅ A hedge winner's translation is remembered under its own model")
+
+def test_async_sqlite_io_runs_off_the_loop():
+    memory = _make_memory()
+    threads = []
+    for name in ("_remembered", "_store_quietly"):
+        original = getattr(memory, name)
+        def tracked(*args, _original=original):
+            threads.append(threading.current_thread())
+            return _original(*args)
+        setattr(memory, name, tracked)
+
+    async def translate():
+        return "claim"
+
+    async def run():
+        loop_thread = threading.current_thread()
+        await memory.atranslate("dava", "hi", "en", "m", translate)
+        await memory.atranslate("dava", "hi", "en", "m", translate)
+        return loop_thread
+
+    loop_thread = asyncio.run(run())
+    assert len(threads) == 3 and loop_thread not in threads
+    print("✅ Async lookups and stores run SQLite on the executor, not the event loop")
+
+if __name__ == "__main__":
+    test_normalised_hits_and_persistence()
+    test_ttl_and_size_cap()
+    test_hits_batch_their_access_times_and_replaces_are_not_counted()
+    test_concurrent_requests_share_one_call()
+    test_async_requests_share_one_call()
+    test_async_result_is_stored_under_the_answering_model()
+    test_async_sqlite_io_runs_off_the_loop()